@@ -1,22 +1,38 @@
 from __future__ import annotations
 
+import json
+from typing import Any, Dict, List, Optional
+
 import pulumi
 import pulumi_aws as aws
 
 # =========================
 # Streaming layer
 # =========================
-from components.streaming.kinesis import create_stock_stream
+from components.streaming.kinesis import (
+    create_stock_stream,
+    create_fan_out_consumers,
+    StreamConsumerArgs,
+    PROCESSOR_CONSUMER_NAME,
+)
+from components.streaming.firehose import create_raw_archive_delivery_stream
 
 # =========================
 # Security layer
 # =========================
-from components.security.iam import create_lambda_execution_role
+from components.security.iam import (
+    create_lambda_execution_role,
+    create_firehose_delivery_role,
+)
 
 # =========================
 # Storage layer
 # =========================
-from components.storage.dynamoDB import create_stock_table
+from components.storage.dynamoDB import (
+    create_stock_table,
+    create_latest_quote_table,
+    create_processor_checkpoint_table,
+)
 from components.storage.s3 import (
     create_raw_data_bucket,
     create_athena_results_bucket,
@@ -28,10 +44,19 @@ from components.storage.s3 import (
 from components.compute.lambda_kinesis_processor import (
     create_kinesis_processor_lambda,
     create_kinesis_event_source_mapping,
+    create_fan_out_event_source_mapping,
+)
+from components.compute.layers import create_pipeline_core_layer
+from components.compute.profiles import (
+    PROFILES,
+    LambdaPerformanceProfile,
+    create_live_alias,
+    resolve_profile,
 )
 from components.compute.lambda_trend_alert import (
     create_trend_alert_lambda,
     create_dynamodb_stream_event_source_mapping,
+    create_trend_schedule,
     TrendAlertLambdaArgs,
 )
 
@@ -41,8 +66,12 @@ from components.compute.lambda_trend_alert import (
 from components.analytics.glue import (
     create_glue_database,
     create_glue_table,
+    create_parquet_glue_table,
+)
+from components.analytics.athena import (
+    create_athena_workgroup,
+    create_athena_named_queries,
 )
-from components.analytics.athena import create_athena_workgroup
 
 # ============================================================
 # Messaging layer
@@ -50,6 +79,107 @@ from components.analytics.athena import create_athena_workgroup
 from components.messaging.sns import create_stock_trend_topic
 
 
+# ============================================================
+# Stack configuration
+# ============================================================
+config = pulumi.Config()
+
+# "symbol" (hash key = symbol) or "sharded" (hash key = symbol#day#shard).
+# Each scheme has its own table. When switching, set dynamoLegacyKeyScheme
+# (and dynamoLegacyWriteShards) to the previous layout: its table is kept
+# and dual-read by the trend Lambda until its ticks have expired; unset it
+# afterwards and the old table is released from the stack (retained in AWS).
+dynamo_key_scheme: str = config.get("dynamoKeyScheme") or "symbol"
+dynamo_write_shards: int = config.get_int("dynamoWriteShards") or 1
+dynamo_legacy_key_scheme: str = config.get("dynamoLegacyKeyScheme") or dynamo_key_scheme
+dynamo_legacy_write_shards: int = config.get_int("dynamoLegacyWriteShards") or dynamo_write_shards
+
+# Hours a tick stays in DynamoDB before TTL removes it (0 = forever)
+_hot_window: Optional[int] = config.get_int("dynamoHotWindowHours")
+dynamo_hot_window_hours: int = 48 if _hot_window is None else _hot_window
+
+# "iso" (timestamp S) or "epoch_ms" (ts N, table stock-market-data-v2).
+# While migrating, dynamoKeepLegacyTable keeps the iso table alive and the
+# trend Lambda reads both (dual-read window) until the backfill is done.
+# It defaults to true with epoch_ms, so switching the format never drops
+# the legacy table; setting it to false afterwards only releases it from
+# the stack (retain_on_delete), the data stays in AWS.
+dynamo_sort_key_format: str = config.get("dynamoSortKeyFormat") or "iso"
+_keep_legacy: Optional[bool] = config.get_bool("dynamoKeepLegacyTable")
+dynamo_keep_legacy_table: bool = (
+    dynamo_sort_key_format == "epoch_ms" if _keep_legacy is None else _keep_legacy
+)
+
+# Lambda logging: level and fraction of per-record detail lines written
+log_level: str = config.get("logLevel") or "INFO"
+_log_sample_rate: Optional[float] = config.get_float("logSampleRate")
+log_sample_rate: float = 0.01 if _log_sample_rate is None else _log_sample_rate
+
+# CloudWatch namespace of the EMF metrics emitted by the Lambdas
+metrics_namespace: str = config.get("metricsNamespace") or "StockMarketPipeline"
+
+# Raw archive: "lambda" (processor puts one JSON object per record) or
+# "firehose" (delivery stream buffers, converts to Parquet and partitions by
+# symbol/day; the processor drops its S3 sink)
+raw_archive_mode: str = config.get("rawArchiveMode") or "lambda"
+if raw_archive_mode not in ("lambda", "firehose"):
+    raise ValueError(f"rawArchiveMode must be lambda or firehose, got {raw_archive_mode!r}")
+firehose_buffer_seconds: int = config.get_int("firehoseBufferSeconds") or 300
+firehose_buffer_mb: int = config.get_int("firehoseBufferMb") or 128
+
+# Lambda performance profiles (components/compute/profiles.py): a preset
+# name ("throughput", "low-latency") or an object such as
+# {"preset": "throughput", "provisionedConcurrency": 1, "reservedConcurrency": 20}
+def _profile_config(key: str, default: LambdaPerformanceProfile) -> LambdaPerformanceProfile:
+    raw: Optional[str] = config.get(key)
+    if raw is None:
+        return default
+    return resolve_profile(json.loads(raw) if raw.lstrip().startswith("{") else raw, default)
+
+
+processor_profile: LambdaPerformanceProfile = _profile_config(
+    "processorProfile", PROFILES["processor-default"]
+)
+trend_profile: LambdaPerformanceProfile = _profile_config("trendProfile", PROFILES["trend-default"])
+
+# Trend evaluation: "stream" runs the trend Lambda for every DynamoDB insert;
+# "scheduled" runs it every trendEvaluationSeconds (a divisor of 60, or
+# whole minutes) over the latest window of all symbols. Prefer "scheduled"
+# once the tick rate means several invocations per second.
+trend_mode: str = config.get("trendMode") or "stream"
+if trend_mode not in ("stream", "scheduled"):
+    raise ValueError(f"trendMode must be stream or scheduled, got {trend_mode!r}")
+trend_evaluation_seconds: int = config.get_int("trendEvaluationSeconds") or 60
+# Scheduled mode: a window is evaluated trendSettleSeconds after it ends
+# (keep it above the processor's usual iterator age); ticks written later
+# are picked up by the next pass if at most trendLateTickLookbackSeconds old
+trend_settle_seconds: Optional[int] = config.get_int("trendSettleSeconds")
+trend_late_tick_lookback_seconds: Optional[int] = config.get_int("trendLateTickLookbackSeconds")
+
+# Ship pipeline_core (precompiled) as a shared, versioned Lambda layer
+# instead of bundling a copy into each function package
+_pipeline_core_layer: Optional[bool] = config.get_bool("pipelineCoreLayer")
+use_pipeline_core_layer: bool = True if _pipeline_core_layer is None else _pipeline_core_layer
+
+# Enhanced fan-out. kinesisProcessorFanOut moves the processor to its own
+# consumer. kinesisFanOutConsumers registers more readers, each with dedicated
+# throughput, e.g.:
+#   [{"name": "indicators", "functionName": "indicator-lambda", "batchSize": 100},
+#    {"name": "feature-service"}]   # no functionName: SubscribeToShard client
+kinesis_processor_fan_out: bool = config.get_bool("kinesisProcessorFanOut") or False
+_fan_out_config: List[Dict[str, Any]] = config.get_object("kinesisFanOutConsumers") or []
+fan_out_consumers: List[StreamConsumerArgs] = [
+    StreamConsumerArgs(
+        name=entry["name"],
+        function_name=entry.get("functionName"),
+        batch_size=int(entry.get("batchSize", 100)),
+        starting_position=entry.get("startingPosition", "LATEST"),
+    )
+    for entry in _fan_out_config
+]
+if kinesis_processor_fan_out:
+    fan_out_consumers.insert(0, StreamConsumerArgs(name=PROCESSOR_CONSUMER_NAME))
+
 
 
 
@@ -59,6 +189,11 @@ from components.messaging.sns import create_stock_trend_topic
 # ============================================================
 stock_stream: aws.kinesis.Stream = create_stock_stream()
 
+stream_consumers: Dict[str, aws.kinesis.StreamConsumer] = create_fan_out_consumers(
+    stream_arn=stock_stream.arn,
+    consumers=fan_out_consumers,
+)
+
 # ============================================================
 # 2. Create IAM Role for Lambda
 # ============================================================
@@ -67,7 +202,26 @@ lambda_execution_role: aws.iam.Role = create_lambda_execution_role()
 # ============================================================
 # 3. Create DynamoDB Table
 # ============================================================
-stock_table: aws.dynamodb.Table = create_stock_table()
+stock_table: aws.dynamodb.Table = create_stock_table(
+    key_scheme=dynamo_key_scheme,
+    hot_window_hours=dynamo_hot_window_hours,
+    sort_key_format=dynamo_sort_key_format,
+)
+# Previous layout still being read: the iso table during the timestamp
+# migration and/or the table of the previous key scheme
+dynamo_legacy_sort_key_format: str = (
+    "iso" if dynamo_sort_key_format == "epoch_ms" and dynamo_keep_legacy_table
+    else dynamo_sort_key_format
+)
+legacy_stock_table: Optional[aws.dynamodb.Table] = None
+if (dynamo_legacy_sort_key_format, dynamo_legacy_key_scheme) != (dynamo_sort_key_format, dynamo_key_scheme):
+    legacy_stock_table = create_stock_table(
+        key_scheme=dynamo_legacy_key_scheme,
+        hot_window_hours=dynamo_hot_window_hours,
+        sort_key_format=dynamo_legacy_sort_key_format,
+    )
+latest_quote_table: aws.dynamodb.Table = create_latest_quote_table()
+processor_checkpoint_table: aws.dynamodb.Table = create_processor_checkpoint_table()
 
 # ============================================================
 # 4. Create S3 Buckets
@@ -78,23 +232,60 @@ athena_results_bucket: aws.s3.Bucket = create_athena_results_bucket()
 # ============================================================
 # 5. Create Lambda Function for Kinesis Processing
 # ============================================================
+pipeline_core_layers: Optional[List[pulumi.Input[str]]] = (
+    [create_pipeline_core_layer().arn] if use_pipeline_core_layer else None
+)
+
 kinesis_processor_lambda: aws.lambda_.Function = (
     create_kinesis_processor_lambda(
         kinesis_stream_arn=stock_stream.arn,
         dynamo_table_name=stock_table.name,
         raw_bucket_name=raw_data_bucket.bucket,
         role_arn=lambda_execution_role.arn,
+        key_scheme=dynamo_key_scheme,
+        write_shards=dynamo_write_shards,
+        hot_window_hours=dynamo_hot_window_hours,
+        latest_table_name=latest_quote_table.name,
+        sort_key_format=dynamo_sort_key_format,
+        checkpoint_table_name=processor_checkpoint_table.name,
+        log_level=log_level,
+        log_sample_rate=log_sample_rate,
+        metrics_namespace=metrics_namespace,
+        archive_raw_to_s3=raw_archive_mode == "lambda",
+        profile=processor_profile,
+        layers=pipeline_core_layers,
     )
 )
+# "live" alias with provisioned concurrency, when the profile asks for it
+kinesis_processor_alias: Optional[aws.lambda_.Alias] = create_live_alias(
+    resource_prefix="kinesisProcessor",
+    function=kinesis_processor_lambda,
+    profile=processor_profile,
+)
 
 # ============================================================
 # 6. Create Event Source Mapping from Kinesis to Lambda
 # ============================================================
 kinesis_lambda_mapping = create_kinesis_event_source_mapping(
     kinesis_stream_arn=stock_stream.arn,
-    lambda_function_name=kinesis_processor_lambda.name,
+    lambda_function_name=(
+        kinesis_processor_alias.arn if kinesis_processor_alias else kinesis_processor_lambda.name
+    ),
+    consumer_arn=(
+        stream_consumers[PROCESSOR_CONSUMER_NAME].arn if kinesis_processor_fan_out else None
+    ),
 )
 
+# Additional fan-out readers backed by a Lambda
+fan_out_mappings: Dict[str, aws.lambda_.EventSourceMapping] = {
+    consumer.name: create_fan_out_event_source_mapping(
+        consumer=consumer,
+        consumer_arn=stream_consumers[consumer.name].arn,
+    )
+    for consumer in fan_out_consumers
+    if consumer.function_name is not None
+}
+
 # ============================================================
 # 7. Create Glue Database and Table
 # ============================================================
@@ -106,6 +297,29 @@ glue_table = create_glue_table(
     raw_data_bucket_name=raw_data_bucket.bucket,
 )
 
+# ============================================================
+# 7b. Firehose raw archive (Parquet, partitioned by symbol/day)
+# ============================================================
+raw_archive_stream: Optional[aws.kinesis.FirehoseDeliveryStream] = None
+if raw_archive_mode == "firehose":
+    firehose_role: aws.iam.Role = create_firehose_delivery_role(
+        stream_arn=stock_stream.arn,
+        bucket_arn=raw_data_bucket.arn,
+    )
+    parquet_glue_table = create_parquet_glue_table(
+        database_name=glue_database.name,
+        raw_data_bucket_name=raw_data_bucket.bucket,
+    )
+    raw_archive_stream = create_raw_archive_delivery_stream(
+        stream_arn=stock_stream.arn,
+        bucket_arn=raw_data_bucket.arn,
+        role_arn=firehose_role.arn,
+        glue_database_name=glue_database.name,
+        glue_table_name=glue_table.name,
+        buffer_interval_seconds=firehose_buffer_seconds,
+        buffer_size_mb=firehose_buffer_mb,
+    )
+
 # ============================================================
 # 8. Create Athena WorkGroup
 # ============================================================
@@ -113,6 +327,11 @@ athena_workgroup = create_athena_workgroup(
     results_bucket_name=athena_results_bucket.bucket,
 )
 
+athena_named_queries = create_athena_named_queries(
+    database_name=glue_database.name,
+    workgroup_name=athena_workgroup.name,
+)
+
 # ============================================================
 # 9. SNS Topic + Trend Lambda (DynamoDB Streams -> Lambda -> SNS)
 # ============================================================
@@ -127,14 +346,46 @@ trend_lambda: aws.lambda_.Function = create_trend_alert_lambda(
         table_name=stock_table.name,
         dynamodb_stream_arn=stock_table.stream_arn,
         sns_topic_arn=sns_topic.arn,
-    )   
+        key_scheme=dynamo_key_scheme,
+        write_shards=dynamo_write_shards,
+        sort_key_format=dynamo_sort_key_format,
+        legacy_table_name=legacy_stock_table.name if legacy_stock_table else None,
+        legacy_key_scheme=dynamo_legacy_key_scheme,
+        legacy_write_shards=dynamo_legacy_write_shards,
+        legacy_sort_key_format=dynamo_legacy_sort_key_format,
+        log_level=log_level,
+        log_sample_rate=log_sample_rate,
+        metrics_namespace=metrics_namespace,
+        profile=trend_profile,
+        layers=pipeline_core_layers,
+        latest_table_name=latest_quote_table.name,
+        checkpoint_table_name=processor_checkpoint_table.name,
+        evaluation_interval_seconds=trend_evaluation_seconds if trend_mode == "scheduled" else None,
+        settle_seconds=trend_settle_seconds,
+        late_tick_lookback_seconds=trend_late_tick_lookback_seconds,
+    )
 )
-
-dynamo_to_trend_mapping: aws.lambda_.EventSourceMapping = create_dynamodb_stream_event_source_mapping(
-    dynamodb_stream_arn=stock_table.stream_arn,
-    lambda_function_arn=trend_lambda.arn,
+trend_lambda_alias: Optional[aws.lambda_.Alias] = create_live_alias(
+    resource_prefix="trendAlert",
+    function=trend_lambda,
+    profile=trend_profile,
 )
 
+trend_target_arn: pulumi.Output[str] = trend_lambda_alias.arn if trend_lambda_alias else trend_lambda.arn
+
+dynamo_to_trend_mapping: Optional[aws.lambda_.EventSourceMapping] = None
+trend_schedule: Optional[aws.cloudwatch.EventRule] = None
+if trend_mode == "stream":
+    dynamo_to_trend_mapping = create_dynamodb_stream_event_source_mapping(
+        dynamodb_stream_arn=stock_table.stream_arn,
+        lambda_function_arn=trend_target_arn,
+    )
+else:
+    trend_schedule = create_trend_schedule(
+        lambda_function_arn=trend_target_arn,
+        interval_seconds=trend_evaluation_seconds,
+    )
+
 
 
 # ============================================================
@@ -143,12 +394,18 @@ dynamo_to_trend_mapping: aws.lambda_.EventSourceMapping = create_dynamodb_stream
 
 pulumi.export("kinesis_stream_name", stock_stream.name)
 pulumi.export("kinesis_stream_arn", stock_stream.arn)
+pulumi.export(
+    "kinesis_stream_consumer_arns",
+    {name: consumer.arn for name, consumer in stream_consumers.items()},
+)
 
 pulumi.export("lambda_role_name", lambda_execution_role.name)
 pulumi.export("lambda_role_arn", lambda_execution_role.arn)
 
 pulumi.export("dynamodb_table_name", stock_table.name)
 pulumi.export("dynamodb_table_arn", stock_table.arn)
+pulumi.export("latest_quote_table_name", latest_quote_table.name)
+pulumi.export("processor_checkpoint_table_name", processor_checkpoint_table.name)
 
 pulumi.export("raw_data_bucket_name", raw_data_bucket.bucket)
 pulumi.export("raw_data_bucket_arn", raw_data_bucket.arn)
@@ -160,10 +417,15 @@ pulumi.export("kinesis_processor_lambda_name", kinesis_processor_lambda.name)
 pulumi.export("kinesis_processor_lambda_arn", kinesis_processor_lambda.arn)
 
 pulumi.export("athena_workgroup", athena_workgroup.name)
+pulumi.export(
+    "athena_named_query_ids",
+    {name: query.id for name, query in athena_named_queries.items()},
+)
 
 pulumi.export("sns_topic_arn", sns_topic.arn)
 pulumi.export("trend_lambda_name", trend_lambda.name)
 pulumi.export("trend_lambda_arn", trend_lambda.arn)
+pulumi.export("trend_mode", trend_mode)
 
 # pulumi up
 # pulumi destroy
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Final
+from pathlib import Path
+from typing import Dict, Final
 
 import pulumi
 import pulumi_aws as aws
@@ -11,15 +12,28 @@ import pulumi_aws as aws
 
 WORKGROUP_NAME: Final[str] = "stock-market-athena-wg"
 
+# Hard cap on the data a single query may scan. Athena cancels the query
+# once it crosses this limit, so an unfiltered SELECT * over the raw bucket
+# fails fast instead of billing a full scan. Athena's minimum is 10 MB.
+BYTES_SCANNED_CUTOFF_PER_QUERY: Final[int] = 1 * 1024 ** 3  # 1 GiB
+
+SQL_QUERIES_DIR: Final[str] = "../../../sql_in_athena"
+
 # ============================================================
 # Athena WorkGroup
 # ============================================================
 
 def create_athena_workgroup(
     results_bucket_name: pulumi.Input[str],
+    bytes_scanned_cutoff_per_query: int = BYTES_SCANNED_CUTOFF_PER_QUERY,
+    publish_cloudwatch_metrics: bool = True,
 ) -> aws.athena.Workgroup:
     """
     Creates an Athena WorkGroup with controlled output location.
+
+    - Per-query scan limit (bytes_scanned_cutoff_per_query)
+    - CloudWatch metrics (ProcessedBytes, EngineExecutionTime, QueryQueueTime)
+      published per workgroup
     """
 
     workgroup: aws.athena.Workgroup = aws.athena.Workgroup(
@@ -28,6 +42,8 @@ def create_athena_workgroup(
         state="ENABLED",
         configuration=aws.athena.WorkgroupConfigurationArgs(
             enforce_workgroup_configuration=True,
+            bytes_scanned_cutoff_per_query=bytes_scanned_cutoff_per_query,
+            publish_cloudwatch_metrics_enabled=publish_cloudwatch_metrics,
             result_configuration=aws.athena.WorkgroupConfigurationResultConfigurationArgs(
                 output_location=results_bucket_name.apply(
                     lambda bucket: f"s3://{bucket}/athena-results/"
@@ -42,3 +58,34 @@ def create_athena_workgroup(
     )
 
     return workgroup
+
+
+# ============================================================
+# Named queries
+# ============================================================
+
+def create_athena_named_queries(
+    *,
+    database_name: pulumi.Input[str],
+    workgroup_name: pulumi.Input[str],
+    sql_dir: str = SQL_QUERIES_DIR,
+) -> Dict[str, aws.athena.NamedQuery]:
+    """
+    Registers every .sql file in sql_dir as an Athena named query.
+
+    The query name is the file stem (q1, q2, ...), which is what the
+    query stats report uses to group executions.
+    """
+    named_queries: Dict[str, aws.athena.NamedQuery] = {}
+
+    for sql_file in sorted(Path(sql_dir).glob("*.sql")):
+        name: str = sql_file.stem
+        named_queries[name] = aws.athena.NamedQuery(
+            resource_name=f"athenaNamedQuery-{name}",
+            name=name,
+            database=database_name,
+            workgroup=workgroup_name,
+            query=sql_file.read_text(encoding="utf-8"),
+        )
+
+    return named_queries
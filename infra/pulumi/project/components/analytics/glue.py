@@ -1,7 +1,7 @@
 # components/analytics/glue.py
 from __future__ import annotations
 
-from typing import Final
+from typing import Final, List, Tuple
 
 import pulumi
 import pulumi_aws as aws
@@ -11,6 +11,34 @@ import pulumi_aws as aws
 # ============================================================
 
 GLUE_DATABASE_NAME: Final[str] = "stock_data_db"
+RAW_TABLE_NAME: Final[str] = "stock_data_table"
+PARQUET_TABLE_NAME: Final[str] = "stock_data_parquet"
+# Must match the Firehose S3 prefix (components/streaming/firehose.py)
+PARQUET_PREFIX: Final[str] = "raw-parquet"
+
+# Raw tick schema. Also the schema Firehose converts to Parquet with, so a
+# column added here reaches both tables.
+STOCK_DATA_COLUMNS: Final[List[Tuple[str, str]]] = [
+    ("symbol", "string"),
+    ("timestamp", "string"),
+    # Epoch milliseconds (UTC); absent (NULL) in objects written
+    # before the producer started emitting it
+    ("timestamp_ms", "bigint"),
+    ("open", "double"),
+    ("high", "double"),
+    ("low", "double"),
+    ("price", "double"),
+    ("previous_close", "double"),
+    ("volume", "int"),
+]
+
+
+def _columns(columns: List[Tuple[str, str]]) -> List[aws.glue.CatalogTableStorageDescriptorColumnArgs]:
+    return [
+        aws.glue.CatalogTableStorageDescriptorColumnArgs(name=name, type=type_)
+        for name, type_ in columns
+    ]
+
 
 # ============================================================
 # Glue Database
@@ -44,7 +72,7 @@ def create_glue_table(
     table: aws.glue.CatalogTable = aws.glue.CatalogTable(
         resource_name="stockDataGlueTable",
         database_name=database_name,
-        name="stock_data_table",
+        name=RAW_TABLE_NAME,
         table_type="EXTERNAL_TABLE",
         parameters={
             "classification": "json",
@@ -64,35 +92,65 @@ def create_glue_table(
                     "ignore.malformed.json": "true"
                 },
             },
-            columns=[
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="symbol", type="string"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="timestamp", type="string"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="open", type="double"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="high", type="double"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="low", type="double"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="price", type="double"
-                ),
-                aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                    name="previous_close", type="double"
-                ),
-                    aws.glue.CatalogTableStorageDescriptorColumnArgs(
-                        name="volume", type="int"
-                ),
-            ],
+            columns=_columns(STOCK_DATA_COLUMNS),
         ),
     )
 
     pulumi.export("glue_table_name", table.name)
 
     return table
+
+
+def create_parquet_glue_table(
+    *,
+    database_name: pulumi.Input[str],
+    raw_data_bucket_name: pulumi.Input[str],
+) -> aws.glue.CatalogTable:
+    """
+    Creates a Glue table over the Parquet files written by the Firehose
+    archive, under raw-parquet/symbol=<symbol>/dt=<yyyy-MM-dd>/.
+
+    Partitions are resolved with partition projection instead of a crawler.
+    symbol is an injected projection, so queries must filter on it
+    (WHERE symbol = 'AAPL'), and dt prunes by day.
+    """
+
+    table: aws.glue.CatalogTable = aws.glue.CatalogTable(
+        resource_name="stockDataParquetGlueTable",
+        database_name=database_name,
+        name=PARQUET_TABLE_NAME,
+        table_type="EXTERNAL_TABLE",
+        parameters={
+            "classification": "parquet",
+            "projection.enabled": "true",
+            "projection.symbol.type": "injected",
+            "projection.dt.type": "date",
+            "projection.dt.format": "yyyy-MM-dd",
+            "projection.dt.range": "2024-01-01,NOW",
+            "projection.dt.interval": "1",
+            "projection.dt.interval.unit": "DAYS",
+            "storage.location.template": raw_data_bucket_name.apply(
+                lambda b: f"s3://{b}/{PARQUET_PREFIX}/symbol=${{symbol}}/dt=${{dt}}/"
+            ),
+        },
+        partition_keys=[
+            aws.glue.CatalogTablePartitionKeyArgs(name="symbol", type="string"),
+            aws.glue.CatalogTablePartitionKeyArgs(name="dt", type="string"),
+        ],
+        storage_descriptor=aws.glue.CatalogTableStorageDescriptorArgs(
+            location=raw_data_bucket_name.apply(
+                lambda b: f"s3://{b}/{PARQUET_PREFIX}/"
+            ),
+            input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+            output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+            ser_de_info={
+                "serializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe",
+            },
+            # symbol is the partition column; the copy inside the files is ignored
+            columns=_columns([c for c in STOCK_DATA_COLUMNS if c[0] != "symbol"]),
+        ),
+    )
+
+    pulumi.export("glue_parquet_table_name", table.name)
+
+    return table
@@ -1,17 +1,44 @@
 from __future__ import annotations
 
-from typing import Final
+from typing import Final, List, Optional
 
 import pulumi
 import pulumi_aws as aws
 
+from components.compute.packaging import build_lambda_code
+from components.compute.profiles import PROFILES, LambdaPerformanceProfile
+from components.streaming.kinesis import StreamConsumerArgs
+
 
 def create_kinesis_processor_lambda(
     kinesis_stream_arn: pulumi.Input[str],
     dynamo_table_name: pulumi.Input[str],
     raw_bucket_name: pulumi.Input[str],
     role_arn: pulumi.Input[str],
+    key_scheme: str = "symbol",
+    write_shards: int = 1,
+    hot_window_hours: int = 0,
+    latest_table_name: pulumi.Input[str] = "",
+    sort_key_format: str = "iso",
+    checkpoint_table_name: pulumi.Input[str] = "",
+    log_level: str = "INFO",
+    log_sample_rate: float = 0.01,
+    metrics_namespace: str = "StockMarketPipeline",
+    archive_raw_to_s3: bool = True,
+    profile: LambdaPerformanceProfile = PROFILES["processor-default"],
+    layers: Optional[List[pulumi.Input[str]]] = None,
 ) -> aws.lambda_.Function:
+    """
+    archive_raw_to_s3=False drops the processor's per-record S3 sink, for
+    stacks where the Firehose delivery stream archives the raw events
+    (components/streaming/firehose.py).
+
+    `profile` sets memory, architecture and concurrency
+    (components/compute/profiles.py).
+
+    With `layers` (the pipeline-core layer ARN, components/compute/layers.py)
+    the package holds only the handler; otherwise pipeline_core is bundled.
+    """
 
     return aws.lambda_.Function(
         resource_name="kinesisProcessorLambda",
@@ -20,19 +47,24 @@ def create_kinesis_processor_lambda(
         handler="handler.lambda_handler",
         role=role_arn,
         timeout=30,
+        **profile.function_args(),
         environment=aws.lambda_.FunctionEnvironmentArgs(
             variables={
                 "DYNAMO_TABLE": dynamo_table_name,
-                "RAW_BUCKET": raw_bucket_name,
-            }
-        ),
-        code=pulumi.AssetArchive(
-            {
-                ".": pulumi.FileArchive(
-                    "../project/lambdas/kinesis_processor"
-                )
+                "RAW_BUCKET": raw_bucket_name if archive_raw_to_s3 else "",
+                "KEY_SCHEME": key_scheme,
+                "WRITE_SHARDS": str(write_shards),
+                "SORT_KEY_FORMAT": sort_key_format,
+                "HOT_WINDOW_HOURS": str(hot_window_hours),
+                "LATEST_TABLE": latest_table_name,
+                "CHECKPOINT_TABLE": checkpoint_table_name,
+                "LOG_LEVEL": log_level,
+                "LOG_SAMPLE_RATE": str(log_sample_rate),
+                "METRICS_NAMESPACE": metrics_namespace,
             }
         ),
+        code=build_lambda_code("kinesis_processor", bundle_core=not layers),
+        layers=layers,
     )
 
 
@@ -41,14 +73,19 @@ def create_kinesis_event_source_mapping(
     *,
     kinesis_stream_arn: pulumi.Input[str],
     lambda_function_name: pulumi.Input[str],
+    consumer_arn: Optional[pulumi.Input[str]] = None,
 ) -> aws.lambda_.EventSourceMapping:
     """
     Connects a Kinesis Data Stream to a Lambda function.
+
+    With `consumer_arn` (components/streaming/kinesis.py
+    create_stream_consumer) the function reads through its own enhanced
+    fan-out consumer instead of the shared GetRecords budget of the stream.
     """
 
     event_source_mapping: aws.lambda_.EventSourceMapping = aws.lambda_.EventSourceMapping(
         resource_name="kinesisToLambdaMapping",
-        event_source_arn=kinesis_stream_arn,
+        event_source_arn=consumer_arn or kinesis_stream_arn,
         function_name=lambda_function_name,
         starting_position="LATEST",
         batch_size=2,
@@ -57,4 +94,25 @@ def create_kinesis_event_source_mapping(
 
     pulumi.export("kinesis_lambda_mapping_uuid", event_source_mapping.uuid)
 
-    return event_source_mapping
\ No newline at end of file
+    return event_source_mapping
+
+
+def create_fan_out_event_source_mapping(
+    *,
+    consumer: StreamConsumerArgs,
+    consumer_arn: pulumi.Input[str],
+) -> aws.lambda_.EventSourceMapping:
+    """
+    Connects a registered fan-out consumer to its Lambda. Records are
+    pushed as soon as they arrive (no batching window), so propagation
+    stays around the ~70 ms of enhanced fan-out.
+    """
+    return aws.lambda_.EventSourceMapping(
+        resource_name=f"fanOutMapping-{consumer.name}",
+        event_source_arn=consumer_arn,
+        function_name=consumer.function_name,
+        starting_position=consumer.starting_position,
+        batch_size=consumer.batch_size,
+        maximum_batching_window_in_seconds=0,
+        enabled=True,
+    )
\ No newline at end of file
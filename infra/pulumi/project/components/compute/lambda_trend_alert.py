@@ -1,16 +1,28 @@
 # components/compute/lambda_trend_alert.py
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
-from typing import Final
+from typing import Dict, Final, List, Optional
 
 import pulumi
 import pulumi_aws as aws
 
+from components.compute.packaging import build_lambda_code
+from components.compute.profiles import PROFILES, LambdaPerformanceProfile
+
 LAMBDA_NAME: Final[str] = "StockTrendAnalysis"
 LAMBDA_HANDLER: Final[str] = "app.lambda_handler"
 LAMBDA_RUNTIME: Final[str] = "python3.13"
 
+# EventBridge schedules cannot fire more often than once a minute; shorter
+# intervals run several evaluation passes inside each invocation.
+SCHEDULE_MIN_RATE_SECONDS: Final[int] = 60
+
+# Marker of items copied by tools/backfill_epoch_timestamps.py
+# (must match lambdas/pipeline_core/keys.py)
+BACKFILLED_ATTRIBUTE: Final[str] = "backfilled"
+
 @dataclass(frozen=True)
 class TrendAlertLambdaArgs:
     """
@@ -20,16 +32,81 @@ class TrendAlertLambdaArgs:
     table_name: pulumi.Input[str]
     dynamodb_stream_arn: pulumi.Input[str]
     sns_topic_arn: pulumi.Input[str]
+    key_scheme: str = "symbol"
+    write_shards: int = 1
+    sort_key_format: str = "iso"
+    # Dual-read window of a layout migration (iso -> epoch_ms, or a key
+    # scheme switch): the legacy table is read alongside table_name until it
+    # has been backfilled or its ticks have expired.
+    legacy_table_name: Optional[pulumi.Input[str]] = None
+    legacy_key_scheme: str = "symbol"
+    legacy_write_shards: int = 1
+    legacy_sort_key_format: str = "iso"
+    # Structured logging (lambdas/pipeline_core/logs.py)
+    log_level: str = "INFO"
+    log_sample_rate: float = 0.01
+    # EMF metrics namespace (lambdas/pipeline_core/metrics.py)
+    metrics_namespace: str = "StockMarketPipeline"
+    # Memory, architecture and concurrency (components/compute/profiles.py)
+    profile: LambdaPerformanceProfile = PROFILES["trend-default"]
+    # pipeline-core layer ARN (components/compute/layers.py); None bundles
+    # pipeline_core into the function package
+    layers: Optional[List[pulumi.Input[str]]] = None
+    # Scheduled mode: latest-quote table (the symbol list) and checkpoint
+    # table (the evaluation window watermark)
+    latest_table_name: Optional[pulumi.Input[str]] = None
+    checkpoint_table_name: Optional[pulumi.Input[str]] = None
+    # Seconds between evaluation passes in scheduled mode (see
+    # create_trend_schedule); None when driven by the DynamoDB Stream
+    evaluation_interval_seconds: Optional[int] = None
+    # Scheduled mode: seconds a window waits for in-flight ticks (at least
+    # the expected iterator age), and how far back a pass picks up ticks
+    # written after their window was evaluated. None keeps the handler's
+    # defaults.
+    settle_seconds: Optional[int] = None
+    late_tick_lookback_seconds: Optional[int] = None
 
 
 def create_trend_alert_lambda(args: TrendAlertLambdaArgs) -> aws.lambda_.Function:
     """
     Create Lambda function that consumes DynamoDB Stream events and publishes alerts to SNS.
     """
-    lambda_code: pulumi.AssetArchive = pulumi.AssetArchive(
-        {
-            ".": pulumi.FileArchive("../project/lambdas/trend_alert"),
-        }
+    lambda_code: pulumi.AssetArchive = build_lambda_code("trend_alert", bundle_core=not args.layers)
+
+    variables: Dict[str, pulumi.Input[str]] = {
+        "TABLE_NAME": args.table_name,
+        "SNS_TOPIC_ARN": args.sns_topic_arn,
+        "KEY_SCHEME": args.key_scheme,
+        "WRITE_SHARDS": str(args.write_shards),
+        "SORT_KEY_FORMAT": args.sort_key_format,
+        "LOG_LEVEL": args.log_level,
+        "LOG_SAMPLE_RATE": str(args.log_sample_rate),
+        "METRICS_NAMESPACE": args.metrics_namespace,
+    }
+    if args.legacy_table_name is not None:
+        variables.update(
+            {
+                "LEGACY_TABLE_NAME": args.legacy_table_name,
+                "LEGACY_KEY_SCHEME": args.legacy_key_scheme,
+                "LEGACY_WRITE_SHARDS": str(args.legacy_write_shards),
+                "LEGACY_SORT_KEY_FORMAT": args.legacy_sort_key_format,
+            }
+        )
+    if args.latest_table_name is not None:
+        variables["LATEST_TABLE_NAME"] = args.latest_table_name
+    if args.checkpoint_table_name is not None:
+        variables["CHECKPOINT_TABLE"] = args.checkpoint_table_name
+    if args.evaluation_interval_seconds is not None:
+        variables["EVALUATION_INTERVAL_SECONDS"] = str(args.evaluation_interval_seconds)
+    if args.settle_seconds is not None:
+        variables["SETTLE_SECONDS"] = str(args.settle_seconds)
+    if args.late_tick_lookback_seconds is not None:
+        variables["LATE_TICK_LOOKBACK_SECONDS"] = str(args.late_tick_lookback_seconds)
+
+    # Sub-minute intervals keep the invocation alive for a whole minute
+    sub_minute: bool = (
+        args.evaluation_interval_seconds is not None
+        and args.evaluation_interval_seconds < SCHEDULE_MIN_RATE_SECONDS
     )
 
     fn: aws.lambda_.Function = aws.lambda_.Function(
@@ -38,14 +115,12 @@ def create_trend_alert_lambda(args: TrendAlertLambdaArgs) -> aws.lambda_.Functio
         role=args.role_arn,
         runtime=LAMBDA_RUNTIME,
         handler=LAMBDA_HANDLER,
-        timeout=30,
-        memory_size=256,
+        timeout=90 if sub_minute else 30,
+        **args.profile.function_args(),
         code=lambda_code,
+        layers=args.layers,
         environment=aws.lambda_.FunctionEnvironmentArgs(
-            variables={
-                "TABLE_NAME": args.table_name,
-                "SNS_TOPIC_ARN": args.sns_topic_arn,
-            }
+            variables=variables
         ),
         tags={
             "Project": "StockMarketRealTimePipeline",
@@ -64,6 +139,13 @@ def create_dynamodb_stream_event_source_mapping(
 ) -> aws.lambda_.EventSourceMapping:
     """
     Connect DynamoDB Stream -> Lambda.
+
+    INSERT and MODIFY events reach the function: a MODIFY is a tick
+    re-written with new values (a replay or a corrected quote) and is
+    evaluated again. TTL expiries (REMOVE) are dropped by the event filter
+    and are not billed as invocations. Items written by the epoch_ms
+    backfill carry `backfilled=true` and are dropped too, so copying
+    history does not replay old alerts.
     """
     mapping: aws.lambda_.EventSourceMapping = aws.lambda_.EventSourceMapping(
         resource_name="dynamoStreamToTrendLambdaMapping",
@@ -72,6 +154,74 @@ def create_dynamodb_stream_event_source_mapping(
         starting_position="LATEST",
         batch_size=2,
         enabled=True,
+        filter_criteria=aws.lambda_.EventSourceMappingFilterCriteriaArgs(
+            filters=[
+                aws.lambda_.EventSourceMappingFilterCriteriaFilterArgs(
+                    pattern=json.dumps({
+                        "eventName": ["INSERT", "MODIFY"],
+                        "dynamodb": {
+                            "NewImage": {BACKFILLED_ATTRIBUTE: {"BOOL": [{"exists": False}]}},
+                        },
+                    }),
+                )
+            ]
+        ),
     )
 
     return mapping
+
+
+def create_trend_schedule(
+    *,
+    lambda_function_arn: pulumi.Input[str],
+    interval_seconds: int,
+) -> aws.cloudwatch.EventRule:
+    """
+    EventBridge rule that invokes the trend Lambda on a fixed rate instead
+    of once per DynamoDB Stream batch.
+
+    Every invocation evaluates the latest window of all symbols, so the cost
+    no longer grows with the tick rate. The finest EventBridge rate is one
+    minute: intervals below it must divide 60 and are run as several passes
+    inside a one-minute invocation.
+    """
+    if interval_seconds < 1:
+        raise ValueError(f"interval_seconds must be >= 1, got {interval_seconds}")
+    if interval_seconds < SCHEDULE_MIN_RATE_SECONDS:
+        if SCHEDULE_MIN_RATE_SECONDS % interval_seconds:
+            raise ValueError(f"interval_seconds below 60 must divide 60, got {interval_seconds}")
+        minutes: int = 1
+    else:
+        if interval_seconds % SCHEDULE_MIN_RATE_SECONDS:
+            raise ValueError(f"interval_seconds above 60 must be whole minutes, got {interval_seconds}")
+        minutes = interval_seconds // SCHEDULE_MIN_RATE_SECONDS
+
+    tags: Dict[str, str] = {
+        "Project": "StockMarketRealTimePipeline",
+        "ManagedBy": "Pulumi",
+        "Environment": pulumi.get_stack(),
+    }
+
+    rule: aws.cloudwatch.EventRule = aws.cloudwatch.EventRule(
+        resource_name="trendEvaluationSchedule",
+        description=f"Scheduled trend evaluation every {interval_seconds}s",
+        schedule_expression=f"rate({minutes} minute{'s' if minutes > 1 else ''})",
+        tags=tags,
+    )
+
+    aws.lambda_.Permission(
+        resource_name="trendEvaluationSchedulePermission",
+        action="lambda:InvokeFunction",
+        function=lambda_function_arn,
+        principal="events.amazonaws.com",
+        source_arn=rule.arn,
+    )
+
+    aws.cloudwatch.EventTarget(
+        resource_name="trendEvaluationScheduleTarget",
+        rule=rule.name,
+        arn=lambda_function_arn,
+        input=json.dumps({"mode": "scheduled"}),
+    )
+
+    return rule
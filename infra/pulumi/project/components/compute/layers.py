@@ -0,0 +1,160 @@
+# components/compute/layers.py
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import Final, List, Tuple
+
+import pulumi
+import pulumi_aws as aws
+
+from components.compute.packaging import LAMBDAS_DIR, PIPELINE_CORE_DIR
+
+# ============================================================
+# Constants
+# ============================================================
+
+LAYER_NAME: Final[str] = "stock-pipeline-core"
+
+# Runtimes of the pipeline Lambdas (kinesis processor, trend alert). The
+# layer ships bytecode for each of them whose interpreter is available at
+# build time.
+LAYER_RUNTIMES: Final[Tuple[str, ...]] = ("python3.10", "python3.13")
+LAYER_ARCHITECTURES: Final[Tuple[str, ...]] = ("x86_64", "arm64")
+
+LAYER_REQUIREMENTS: Final[str] = f"{LAMBDAS_DIR}/layer-requirements.txt"
+LAYER_BUILD_DIR: Final[str] = "build/pipeline-core-layer"
+
+
+# ============================================================
+# Build
+# ============================================================
+
+def _package_version() -> str:
+    with open(os.path.join(PIPELINE_CORE_DIR, "__init__.py"), encoding="utf-8") as f:
+        match = re.search(r'^__version__ = "([^"]+)"', f.read(), re.MULTILINE)
+    return match.group(1) if match else "0"
+
+
+def _requirements() -> List[str]:
+    if not os.path.exists(LAYER_REQUIREMENTS):
+        return []
+    with open(LAYER_REQUIREMENTS, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _interpreter(runtime: str) -> str:
+    """
+    Local interpreter matching a Lambda runtime ("python3.10" -> python3.10
+    on PATH, or the current one if it is that version). "" if none.
+    """
+    if runtime == f"python{sys.version_info.major}.{sys.version_info.minor}":
+        return sys.executable
+    return shutil.which(runtime) or ""
+
+
+def _tree_hash(root: str) -> str:
+    digest = hashlib.sha256()
+    for directory, dirs, files in sorted(os.walk(root)):
+        dirs.sort()
+        for name in sorted(files):
+            path: str = os.path.join(directory, name)
+            digest.update(os.path.relpath(path, root).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return base64.b64encode(digest.digest()).decode("ascii")
+
+
+def build_layer_directory() -> Tuple[str, List[str]]:
+    """
+    Lays out the layer under LAYER_BUILD_DIR/python (the directory Lambda
+    adds to sys.path from /opt) and returns it with the runtimes that got
+    bytecode.
+
+    Layers are mounted read-only, so without shipped .pyc files every cold
+    start compiles pipeline_core again. Bytecode is written with
+    unchecked-hash invalidation: the runtime loads it without comparing
+    source timestamps (zip mtimes are not preserved), and the files are
+    byte-identical between builds, so an unchanged package does not
+    publish a new layer version.
+    """
+    shutil.rmtree(LAYER_BUILD_DIR, ignore_errors=True)
+    site_dir: str = os.path.join(LAYER_BUILD_DIR, "python")
+    shutil.copytree(
+        PIPELINE_CORE_DIR,
+        os.path.join(site_dir, "pipeline_core"),
+        ignore=shutil.ignore_patterns("__pycache__", "*.pyc"),
+    )
+
+    requirements: List[str] = _requirements()
+    if requirements:
+        subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install", "--quiet",
+                "--target", site_dir,
+                "--platform", "any",
+                "--only-binary=:all:",
+                "--python-version", LAYER_RUNTIMES[0].removeprefix("python"),
+                *requirements,
+            ],
+            check=True,
+        )
+
+    compiled: List[str] = []
+    for runtime in LAYER_RUNTIMES:
+        interpreter: str = _interpreter(runtime)
+        # A version-manager shim can be on PATH without a working interpreter
+        if not interpreter or subprocess.run(
+            [interpreter, "-m", "compileall", "-q", "--invalidation-mode", "unchecked-hash", site_dir],
+            capture_output=True,
+        ).returncode != 0:
+            pulumi.log.warn(
+                f"{runtime} not available: layer {LAYER_NAME} ships no bytecode for it "
+                "(functions on that runtime compile pipeline_core at cold start)"
+            )
+            continue
+        compiled.append(runtime)
+
+    return LAYER_BUILD_DIR, compiled
+
+
+# ============================================================
+# Factory function
+# ============================================================
+
+def create_pipeline_core_layer() -> aws.lambda_.LayerVersion:
+    """
+    Publishes pipeline_core (plus the pinned packages of
+    lambdas/layer-requirements.txt) as a Lambda layer shared by both
+    pipeline functions, which then deploy only their handler file.
+
+    A new layer version is published only when the built content changes:
+    the description holds only the package version, so a build host
+    missing one of LAYER_RUNTIMES does not change it. The runtimes that got
+    bytecode are exported as a stack output instead. Old versions are kept (skip_destroy) so a rollback of a function can
+    still reference the version it was deployed with.
+    """
+    build_dir, compiled = build_layer_directory()
+    version: str = _package_version()
+
+    layer: aws.lambda_.LayerVersion = aws.lambda_.LayerVersion(
+        resource_name="pipelineCoreLayer",
+        layer_name=LAYER_NAME,
+        description=f"pipeline_core {version}",
+        code=pulumi.FileArchive(build_dir),
+        source_code_hash=_tree_hash(build_dir),
+        compatible_runtimes=list(LAYER_RUNTIMES),
+        compatible_architectures=list(LAYER_ARCHITECTURES),
+        skip_destroy=True,
+    )
+
+    pulumi.export("pipeline_core_layer_arn", layer.arn)
+    pulumi.export("pipeline_core_layer_version", layer.version)
+    pulumi.export("pipeline_core_layer_bytecode_runtimes", compiled)
+
+    return layer
@@ -0,0 +1,22 @@
+# components/compute/packaging.py
+from __future__ import annotations
+
+from typing import Dict, Final
+
+import pulumi
+
+LAMBDAS_DIR: Final[str] = "../project/lambdas"
+PIPELINE_CORE_DIR: Final[str] = f"{LAMBDAS_DIR}/pipeline_core"
+
+
+def build_lambda_code(function_dir: str, bundle_core: bool = True) -> pulumi.AssetArchive:
+    """
+    Packages a Lambda function directory. With bundle_core, the shared
+    pipeline_core package is copied next to the handler so it can
+    `import pipeline_core`; without it, the function gets pipeline_core
+    from the layer (components/compute/layers.py).
+    """
+    assets: Dict[str, pulumi.Archive] = {".": pulumi.FileArchive(f"{LAMBDAS_DIR}/{function_dir}")}
+    if bundle_core:
+        assets["pipeline_core"] = pulumi.FileArchive(PIPELINE_CORE_DIR)
+    return pulumi.AssetArchive(assets)
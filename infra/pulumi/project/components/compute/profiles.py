@@ -0,0 +1,142 @@
+# components/compute/profiles.py
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Final, Optional, Tuple, Union
+
+import pulumi
+import pulumi_aws as aws
+
+# ============================================================
+# Constants
+# ============================================================
+
+ARCHITECTURES: Final[Tuple[str, ...]] = ("x86_64", "arm64")
+ALIAS_NAME: Final[str] = "live"
+
+
+# ============================================================
+# Performance profile
+# ============================================================
+
+@dataclass(frozen=True)
+class LambdaPerformanceProfile:
+    """
+    Sizing of a Lambda function.
+
+    - memory_size: MB. CPU scales with memory (one full vCPU at 1769 MB),
+      so batch-heavy handlers often finish cheaper at a larger size.
+      Measure with tools/lambda_power_tuning.py.
+    - architecture: "arm64" (Graviton, about 20% cheaper per GB-second) or
+      "x86_64"
+    - provisioned_concurrency: pre-initialized environments kept warm on
+      the "live" alias (0 = none). Removes cold starts from the hot path
+      but is billed whether used or not.
+    - reserved_concurrency: hard cap on concurrent executions (None = no
+      cap). Protects downstream tables from a burst.
+    """
+    memory_size: int = 128
+    architecture: str = "x86_64"
+    provisioned_concurrency: int = 0
+    reserved_concurrency: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if not 128 <= self.memory_size <= 10240:
+            raise ValueError("memory_size must be between 128 and 10240 MB")
+        if self.architecture not in ARCHITECTURES:
+            raise ValueError(f"architecture must be one of {ARCHITECTURES}")
+        if self.provisioned_concurrency < 0:
+            raise ValueError("provisioned_concurrency must be >= 0")
+        if (
+            self.reserved_concurrency is not None
+            and self.provisioned_concurrency > self.reserved_concurrency
+        ):
+            raise ValueError("provisioned_concurrency cannot exceed reserved_concurrency")
+
+    def function_args(self) -> Dict[str, Any]:
+        """
+        Keyword arguments for aws.lambda_.Function. A version is published
+        only when an alias is needed for provisioned concurrency.
+        """
+        return {
+            "memory_size": self.memory_size,
+            "architectures": [self.architecture],
+            "reserved_concurrent_executions": (
+                -1 if self.reserved_concurrency is None else self.reserved_concurrency
+            ),
+            "publish": self.provisioned_concurrency > 0,
+        }
+
+
+# Presets, selectable by name from stack config
+PROFILES: Final[Dict[str, LambdaPerformanceProfile]] = {
+    # Sizes used before profiles existed
+    "processor-default": LambdaPerformanceProfile(memory_size=128),
+    "trend-default": LambdaPerformanceProfile(memory_size=256),
+    # Large Kinesis batches: more CPU for decode + Decimal conversion
+    "throughput": LambdaPerformanceProfile(memory_size=1024, architecture="arm64"),
+    # Alerting path: no cold starts
+    "low-latency": LambdaPerformanceProfile(
+        memory_size=512, architecture="arm64", provisioned_concurrency=2
+    ),
+}
+
+
+def resolve_profile(
+    value: Union[None, str, Dict[str, Any]], default: LambdaPerformanceProfile
+) -> LambdaPerformanceProfile:
+    """
+    Profile from stack config: a preset name ("throughput"), an object
+    overriding fields of `default`
+    ({"memorySize": 512, "architecture": "arm64", "provisionedConcurrency": 1,
+      "reservedConcurrency": 10}), or None for `default`.
+    """
+    if value is None:
+        return default
+    if isinstance(value, str):
+        if value not in PROFILES:
+            raise ValueError(f"Unknown Lambda profile {value!r} (expected one of {sorted(PROFILES)})")
+        return PROFILES[value]
+    base: LambdaPerformanceProfile = resolve_profile(value.get("preset"), default)
+    overrides: Dict[str, Any] = {
+        field: value[key]
+        for key, field in (
+            ("memorySize", "memory_size"),
+            ("architecture", "architecture"),
+            ("provisionedConcurrency", "provisioned_concurrency"),
+            ("reservedConcurrency", "reserved_concurrency"),
+        )
+        if key in value
+    }
+    return replace(base, **overrides)
+
+
+def create_live_alias(
+    *,
+    resource_prefix: str,
+    function: aws.lambda_.Function,
+    profile: LambdaPerformanceProfile,
+) -> Optional[aws.lambda_.Alias]:
+    """
+    With provisioned concurrency, creates the "live" alias on the published
+    version and keeps `provisioned_concurrency` environments warm on it.
+    Event source mappings must target the alias ARN to use them.
+    Returns None when the profile has no provisioned concurrency.
+    """
+    if profile.provisioned_concurrency == 0:
+        return None
+
+    alias: aws.lambda_.Alias = aws.lambda_.Alias(
+        resource_name=f"{resource_prefix}LiveAlias",
+        name=ALIAS_NAME,
+        function_name=function.name,
+        function_version=function.version,
+    )
+    aws.lambda_.ProvisionedConcurrencyConfig(
+        resource_name=f"{resource_prefix}ProvisionedConcurrency",
+        function_name=function.name,
+        qualifier=alias.name,
+        provisioned_concurrent_executions=profile.provisioned_concurrency,
+    )
+    pulumi.export(f"{resource_prefix}_alias_arn", alias.arn)
+    return alias
@@ -1,6 +1,7 @@
 # components/security/iam.py
 from __future__ import annotations
 
+import json
 from typing import Final, List
 
 import pulumi
@@ -11,6 +12,7 @@ import pulumi_aws as aws
 # ============================================================
 
 LAMBDA_ROLE_NAME: Final[str] = "Lambda_Kinesis_DynamoDB_Role"
+FIREHOSE_ROLE_NAME: Final[str] = "Firehose_Raw_Archive_Role"
 
 MANAGED_POLICY_ARNS: Final[List[str]] = [
     "arn:aws:iam::aws:policy/AmazonKinesisFullAccess",
@@ -63,3 +65,86 @@ def create_lambda_execution_role() -> aws.iam.Role:
         )
 
     return role
+
+
+def create_firehose_delivery_role(
+    *,
+    stream_arn: pulumi.Input[str],
+    bucket_arn: pulumi.Input[str],
+) -> aws.iam.Role:
+    """
+    Creates the IAM Role Firehose assumes to read the Kinesis stream, look
+    up the Glue schema for Parquet conversion and write to the raw bucket.
+    """
+
+    role: aws.iam.Role = aws.iam.Role(
+        resource_name="firehoseDeliveryRole",
+        name=FIREHOSE_ROLE_NAME,
+        assume_role_policy=aws.iam.get_policy_document(
+            statements=[
+                aws.iam.GetPolicyDocumentStatementArgs(
+                    effect="Allow",
+                    principals=[
+                        aws.iam.GetPolicyDocumentStatementPrincipalArgs(
+                            type="Service",
+                            identifiers=["firehose.amazonaws.com"],
+                        )
+                    ],
+                    actions=["sts:AssumeRole"],
+                )
+            ]
+        ).json,
+        tags={
+            "Project": "StockMarketRealTimePipeline",
+            "ManagedBy": "Pulumi",
+            "Environment": pulumi.get_stack(),
+        },
+    )
+
+    aws.iam.RolePolicy(
+        resource_name="firehoseDeliveryPolicy",
+        role=role.id,
+        policy=pulumi.Output.all(stream_arn, bucket_arn).apply(
+            lambda arns: json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Action": [
+                                "kinesis:DescribeStream",
+                                "kinesis:GetShardIterator",
+                                "kinesis:GetRecords",
+                                "kinesis:ListShards",
+                            ],
+                            "Resource": arns[0],
+                        },
+                        {
+                            "Effect": "Allow",
+                            "Action": [
+                                "s3:AbortMultipartUpload",
+                                "s3:GetBucketLocation",
+                                "s3:GetObject",
+                                "s3:ListBucket",
+                                "s3:ListBucketMultipartUploads",
+                                "s3:PutObject",
+                            ],
+                            "Resource": [arns[1], f"{arns[1]}/*"],
+                        },
+                        {
+                            "Effect": "Allow",
+                            "Action": ["glue:GetTable", "glue:GetTableVersion", "glue:GetTableVersions"],
+                            "Resource": "*",
+                        },
+                        {
+                            "Effect": "Allow",
+                            "Action": ["logs:PutLogEvents"],
+                            "Resource": "*",
+                        },
+                    ],
+                }
+            )
+        ),
+    )
+
+    return role
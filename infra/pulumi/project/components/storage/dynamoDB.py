@@ -1,7 +1,7 @@
 # components/storage/dynamoDB.py
 from __future__ import annotations
 
-from typing import Final
+from typing import Final, List, Optional
 
 import pulumi
 import pulumi_aws as aws
@@ -11,36 +11,158 @@ import pulumi_aws as aws
 # ============================================================
 
 TABLE_NAME: Final[str] = "stock-market-data"
+LATEST_QUOTE_TABLE_NAME: Final[str] = "stock-market-latest"
+CHECKPOINT_TABLE_NAME: Final[str] = "stock-market-processor-checkpoints"
+# Must match lambdas/pipeline_core/idempotency.py
+CHECKPOINT_KEY: Final[str] = "checkpoint_id"
 PARTITION_KEY: Final[str] = "symbol"
 SORT_KEY: Final[str] = "timestamp"
 
+# Epoch-millisecond sort key layout (table stock-market-data-v2)
+SORT_KEY_ISO: Final[str] = "iso"
+SORT_KEY_EPOCH_MS: Final[str] = "epoch_ms"
+EPOCH_MS_SORT_KEY: Final[str] = "ts"
+EPOCH_MS_TABLE_NAME: Final[str] = f"{TABLE_NAME}-v2"
+
+# Write-sharded layout: pk = "symbol#YYYY-MM-DD#shard"
+# (must match lambdas/pipeline_core/keys.py)
+KEY_SCHEME_SYMBOL: Final[str] = "symbol"
+KEY_SCHEME_SHARDED: Final[str] = "sharded"
+SHARDED_PARTITION_KEY: Final[str] = "pk"
+# A hash key cannot change in place either: the sharded layout gets its own
+# table (and Pulumi resource) instead of replacing the symbol one
+SHARDED_TABLE_SUFFIX: Final[str] = "-sharded"
+
+# Epoch-seconds attribute stamped by the processor (lambdas/pipeline_core/retention.py)
+TTL_ATTRIBUTE: Final[str] = "expires_at"
+DEFAULT_HOT_WINDOW_HOURS: Final[int] = 48
+
 
 # ============================================================
 # Factory function
 # ============================================================
 
-def create_stock_table() -> aws.dynamodb.Table:
+def create_stock_table(
+    key_scheme: str = KEY_SCHEME_SYMBOL,
+    hot_window_hours: Optional[int] = DEFAULT_HOT_WINDOW_HOURS,
+    sort_key_format: str = SORT_KEY_ISO,
+    retain_on_delete: bool = True,
+) -> aws.dynamodb.Table:
     """
     Create DynamoDB table for processed stock data.
 
-    - Partition key: symbol (S)
-    - Sort key: timestamp (S)
+    - Partition key: symbol (S), or pk (S) = "symbol#day#shard" when
+      key_scheme="sharded" to spread hot symbols over several partitions
+    - Sort key: timestamp (S) for sort_key_format="iso", or ts (N) epoch
+      milliseconds for sort_key_format="epoch_ms". A sort key type cannot
+      change in place, so the epoch_ms layout is a separate table
+      (stock-market-data-v2) that lives next to the legacy one while the
+      backfill runs.
+    - Each key scheme is a separate table too (stock-market-data-sharded,
+      stock-market-data-v2-sharded): switching dynamoKeyScheme creates the
+      new table instead of replacing the one that holds the data.
     - Billing mode: PAY_PER_REQUEST (on-demand)
     - DynamoDB Streams enabled to trigger downstream Lambda.
+    - TTL on expires_at when hot_window_hours is set: only recent ticks stay
+      in DynamoDB, the history lives in the S3 raw bucket. The window itself
+      is applied by the processor when it stamps expires_at.
+    - retain_on_delete (default): removing the table from the stack, e.g.
+      after a layout switch, leaves it and its data in AWS.
+    """
+    if key_scheme not in (KEY_SCHEME_SYMBOL, KEY_SCHEME_SHARDED):
+        raise ValueError(f"Unknown key scheme: {key_scheme}")
+    if sort_key_format not in (SORT_KEY_ISO, SORT_KEY_EPOCH_MS):
+        raise ValueError(f"Unknown sort key format: {sort_key_format}")
+
+    epoch_ms: bool = sort_key_format == SORT_KEY_EPOCH_MS
+    sort_key: str = EPOCH_MS_SORT_KEY if epoch_ms else SORT_KEY
+
+    sharded: bool = key_scheme == KEY_SCHEME_SHARDED
+    partition_key: str = SHARDED_PARTITION_KEY if sharded else PARTITION_KEY
+    resource_name: str = "stockMarketDataTableV2" if epoch_ms else "stockMarketDataTable"
+    table_name: str = EPOCH_MS_TABLE_NAME if epoch_ms else TABLE_NAME
+    if sharded:
+        resource_name += "Sharded"
+        table_name += SHARDED_TABLE_SUFFIX
+
+    attributes: List[aws.dynamodb.TableAttributeArgs] = [
+        aws.dynamodb.TableAttributeArgs(name=partition_key, type="S",),
+        aws.dynamodb.TableAttributeArgs(name=sort_key, type="N" if epoch_ms else "S",),
+    ]
+
+    table: aws.dynamodb.Table = aws.dynamodb.Table(
+        resource_name=resource_name,
+        name=table_name,
+        billing_mode="PAY_PER_REQUEST",
+        hash_key=partition_key,
+        range_key=sort_key,
+        attributes=attributes,
+        stream_enabled=True,
+        stream_view_type="NEW_IMAGE",
+        ttl=aws.dynamodb.TableTtlArgs(
+            attribute_name=TTL_ATTRIBUTE,
+            enabled=bool(hot_window_hours),
+        ),
+        tags={
+            "Project": "StockMarketRealTimePipeline",
+            "ManagedBy": "Pulumi",
+            "Environment": pulumi.get_stack(),
+        },
+        opts=pulumi.ResourceOptions(retain_on_delete=retain_on_delete),
+    )
+
+    return table
+
+
+def create_latest_quote_table() -> aws.dynamodb.Table:
+    """
+    Create DynamoDB table holding the latest quote per symbol.
+
+    - Partition key: symbol (S), no sort key: one item per symbol
+    - Billing mode: PAY_PER_REQUEST (on-demand)
+    - No stream: quote updates must not trigger the trend Lambda.
+
+    The processor keeps it current with a conditional update on timestamp
+    (lambdas/pipeline_core/quotes.py).
     """
 
     table: aws.dynamodb.Table = aws.dynamodb.Table(
-        resource_name="stockMarketDataTable",
-        name=TABLE_NAME,
+        resource_name="stockMarketLatestQuoteTable",
+        name=LATEST_QUOTE_TABLE_NAME,
         billing_mode="PAY_PER_REQUEST",
         hash_key=PARTITION_KEY,
-        range_key=SORT_KEY,
         attributes=[
             aws.dynamodb.TableAttributeArgs(name=PARTITION_KEY, type="S",),
-            aws.dynamodb.TableAttributeArgs(name=SORT_KEY, type="S",),
         ],
-        stream_enabled=True,
-        stream_view_type="NEW_IMAGE",
+        tags={
+            "Project": "StockMarketRealTimePipeline",
+            "ManagedBy": "Pulumi",
+            "Environment": pulumi.get_stack(),
+        },
+    )
+
+    return table
+
+
+def create_processor_checkpoint_table() -> aws.dynamodb.Table:
+    """
+    Create DynamoDB table holding the processor's sequence checkpoints.
+
+    - Partition key: checkpoint_id (S) = "shardId#partitionKey"
+    - One small item per (shard, symbol): the highest Kinesis sequence
+      number already processed, so replayed batches are skipped
+      (lambdas/pipeline_core/idempotency.py)
+    - Billing mode: PAY_PER_REQUEST (on-demand), no stream
+    """
+
+    table: aws.dynamodb.Table = aws.dynamodb.Table(
+        resource_name="stockMarketProcessorCheckpointTable",
+        name=CHECKPOINT_TABLE_NAME,
+        billing_mode="PAY_PER_REQUEST",
+        hash_key=CHECKPOINT_KEY,
+        attributes=[
+            aws.dynamodb.TableAttributeArgs(name=CHECKPOINT_KEY, type="S",),
+        ],
         tags={
             "Project": "StockMarketRealTimePipeline",
             "ManagedBy": "Pulumi",
@@ -0,0 +1,130 @@
+# components/streaming/firehose.py
+from __future__ import annotations
+
+from typing import Final
+
+import pulumi
+import pulumi_aws as aws
+
+from components.analytics.glue import PARQUET_PREFIX
+
+# ============================================================
+# Constants
+# ============================================================
+
+DELIVERY_STREAM_NAME: Final[str] = "stock-market-raw-archive"
+
+# Firehose flushes a partition when either limit is hit. Parquet conversion
+# requires at least 64 MB; larger buffers mean fewer, bigger files.
+DEFAULT_BUFFER_INTERVAL_SECONDS: Final[int] = 300
+DEFAULT_BUFFER_SIZE_MB: Final[int] = 128
+
+# Dynamic partitioning: symbol comes from the record (JQ), the day from the
+# arrival time. Must match the Parquet Glue table projection.
+S3_PREFIX: Final[str] = (
+    f"{PARQUET_PREFIX}/symbol=!{{partitionKeyFromQuery:symbol}}/dt=!{{timestamp:yyyy-MM-dd}}/"
+)
+ERROR_PREFIX: Final[str] = "raw-parquet-errors/!{firehose:error-output-type}/dt=!{timestamp:yyyy-MM-dd}/"
+
+
+# ============================================================
+# Factory function
+# ============================================================
+
+def create_raw_archive_delivery_stream(
+    *,
+    stream_arn: pulumi.Input[str],
+    bucket_arn: pulumi.Input[str],
+    role_arn: pulumi.Input[str],
+    glue_database_name: pulumi.Input[str],
+    glue_table_name: pulumi.Input[str],
+    buffer_interval_seconds: int = DEFAULT_BUFFER_INTERVAL_SECONDS,
+    buffer_size_mb: int = DEFAULT_BUFFER_SIZE_MB,
+) -> aws.kinesis.FirehoseDeliveryStream:
+    """
+    Archives the Kinesis stream to S3 as Parquet, partitioned by symbol
+    and day, without going through the processor Lambda.
+
+    - Source: the Kinesis stream (read as a regular, shared-throughput
+      consumer)
+    - Conversion: JSON -> Parquet (Snappy) with the columns of the Glue
+      raw table (glue_table_name)
+    - Layout: raw-parquet/symbol=<symbol>/dt=<yyyy-MM-dd>/, queryable
+      through the stock_data_parquet table
+    """
+    if buffer_size_mb < 64:
+        raise ValueError("Parquet conversion requires a buffer of at least 64 MB")
+
+    delivery_stream: aws.kinesis.FirehoseDeliveryStream = aws.kinesis.FirehoseDeliveryStream(
+        resource_name="rawArchiveDeliveryStream",
+        name=DELIVERY_STREAM_NAME,
+        destination="extended_s3",
+        kinesis_source_configuration=aws.kinesis.FirehoseDeliveryStreamKinesisSourceConfigurationArgs(
+            kinesis_stream_arn=stream_arn,
+            role_arn=role_arn,
+        ),
+        extended_s3_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationArgs(
+            role_arn=role_arn,
+            bucket_arn=bucket_arn,
+            prefix=S3_PREFIX,
+            error_output_prefix=ERROR_PREFIX,
+            buffering_interval=buffer_interval_seconds,
+            buffering_size=buffer_size_mb,
+            dynamic_partitioning_configuration=(
+                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDynamicPartitioningConfigurationArgs(
+                    enabled=True,
+                )
+            ),
+            processing_configuration=(
+                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationArgs(
+                    enabled=True,
+                    processors=[
+                        aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorArgs(
+                            type="MetadataExtraction",
+                            parameters=[
+                                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorParameterArgs(
+                                    parameter_name="MetadataExtractionQuery",
+                                    parameter_value="{symbol: .symbol}",
+                                ),
+                                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorParameterArgs(
+                                    parameter_name="JsonParsingEngine",
+                                    parameter_value="JQ-1.6",
+                                ),
+                            ],
+                        )
+                    ],
+                )
+            ),
+            data_format_conversion_configuration=(
+                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationArgs(
+                    enabled=True,
+                    input_format_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationArgs(
+                        deserializer=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationDeserializerArgs(
+                            open_x_json_ser_de=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationDeserializerOpenXJsonSerDeArgs(),
+                        ),
+                    ),
+                    output_format_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationArgs(
+                        serializer=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationSerializerArgs(
+                            parquet_ser_de=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationSerializerParquetSerDeArgs(
+                                compression="SNAPPY",
+                            ),
+                        ),
+                    ),
+                    schema_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationSchemaConfigurationArgs(
+                        database_name=glue_database_name,
+                        table_name=glue_table_name,
+                        role_arn=role_arn,
+                    ),
+                )
+            ),
+        ),
+        tags={
+            "Project": "StockMarketRealTimePipeline",
+            "ManagedBy": "Pulumi",
+            "Environment": pulumi.get_stack(),
+        },
+    )
+
+    pulumi.export("raw_archive_delivery_stream_name", delivery_stream.name)
+
+    return delivery_stream
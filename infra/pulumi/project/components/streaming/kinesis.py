@@ -1,7 +1,8 @@
 # components/streaming/kinesis.py
 from __future__ import annotations
 
-from typing import Final
+from dataclasses import dataclass
+from typing import Dict, Final, List, Optional
 
 import pulumi
 import pulumi_aws as aws
@@ -13,6 +14,12 @@ import pulumi_aws as aws
 STREAM_NAME: Final[str] = "stock-market-stream"
 RETENTION_HOURS: Final[int] = 24
 
+# Enhanced fan-out: each registered consumer gets its own 2 MB/s per shard
+# and records are pushed over HTTP/2 (~70 ms propagation instead of the
+# 200 ms+ of shared GetRecords polling). Kinesis allows 20 per stream.
+MAX_STREAM_CONSUMERS: Final[int] = 20
+PROCESSOR_CONSUMER_NAME: Final[str] = "kinesis-processor"
+
 
 # ============================================================
 # Factory function
@@ -43,3 +50,57 @@ def create_stock_stream() -> aws.kinesis.Stream:
     )
 
     return stream
+
+
+
+@dataclass(frozen=True)
+class StreamConsumerArgs:
+    """
+    One downstream reader of the stream (indicator Lambda, raw archiver,
+    feature service...).
+
+    - name: consumer name, unique per stream
+    - function_name: Lambda attached to the consumer through an event
+      source mapping; None registers the consumer only (for KCL / SDK
+      readers that call SubscribeToShard themselves)
+    """
+    name: str
+    function_name: Optional[pulumi.Input[str]] = None
+    batch_size: int = 100
+    starting_position: str = "LATEST"
+
+
+def create_stream_consumer(
+    *,
+    stream_arn: pulumi.Input[str],
+    consumer_name: str,
+) -> aws.kinesis.StreamConsumer:
+    """
+    Registers an enhanced fan-out consumer on the stream.
+    The consumer ARN is used as the event source of a Lambda mapping.
+    """
+    return aws.kinesis.StreamConsumer(
+        resource_name=f"streamConsumer-{consumer_name}",
+        name=consumer_name,
+        stream_arn=stream_arn,
+    )
+
+
+def create_fan_out_consumers(
+    *,
+    stream_arn: pulumi.Input[str],
+    consumers: List[StreamConsumerArgs],
+) -> Dict[str, aws.kinesis.StreamConsumer]:
+    """
+    Registers every consumer in `consumers`, keyed by name.
+    """
+    names: List[str] = [consumer.name for consumer in consumers]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stream consumer names: {names}")
+    if len(names) > MAX_STREAM_CONSUMERS:
+        raise ValueError(f"At most {MAX_STREAM_CONSUMERS} enhanced fan-out consumers per stream")
+
+    return {
+        consumer.name: create_stream_consumer(stream_arn=stream_arn, consumer_name=consumer.name)
+        for consumer in consumers
+    }
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-import base64
 import json
 import os
-from decimal import Decimal
-from typing import Any, Dict
-
-import boto3
+import time
+from typing import Any, Dict, Optional
+
+from pipeline_core.clients import client, resource
+from pipeline_core.codecs import decode_kinesis_data
+from pipeline_core.decimals import to_decimal
+from pipeline_core.idempotency import SequenceCheckpoints, put_item_once, record_position
+from pipeline_core.indicators import ohlc_average, price_change
+from pipeline_core.keys import KeyScheme, key_attributes
+from pipeline_core.logs import get_logger
+from pipeline_core.metrics import MetricsBuffer
+from pipeline_core.quotes import upsert_latest_quote
+from pipeline_core.retention import TTL_ATTRIBUTE, expires_at, hot_window_seconds_from_env
+from pipeline_core.timestamps import event_epoch_ms
+from pipeline_core.tracing import TRACE_ID, now_ms
 
 
 # =========================
@@ -14,56 +24,152 @@ import boto3
 # =========================
 
 DYNAMO_TABLE: str = os.environ["DYNAMO_TABLE"]
-RAW_BUCKET: str = os.environ["RAW_BUCKET"]
+# Empty when the stream is archived by Firehose (no per-record S3 put)
+RAW_BUCKET: str = os.environ.get("RAW_BUCKET", "")
+KEY_SCHEME: KeyScheme = KeyScheme.from_env()
+HOT_WINDOW_SECONDS: Optional[int] = hot_window_seconds_from_env()
+LATEST_TABLE: str = os.environ.get("LATEST_TABLE", "")
+CHECKPOINT_TABLE: str = os.environ.get("CHECKPOINT_TABLE", "")
 
 
 # =========================
 # AWS clients
 # =========================
 
-dynamodb = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
+dynamodb = resource("dynamodb")
+s3 = client("s3")
 
 table = dynamodb.Table(DYNAMO_TABLE)
+latest_table = dynamodb.Table(LATEST_TABLE) if LATEST_TABLE else None
+checkpoints = SequenceCheckpoints(dynamodb.Table(CHECKPOINT_TABLE)) if CHECKPOINT_TABLE else None
+
+# EMF metrics, written once per invocation (no PutMetricData calls)
+metrics = MetricsBuffer("kinesis_processor")
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    for record in event["Records"]:
+    log = get_logger("kinesis_processor", context)
+
+    # Highest sequence handled in this batch, per (shard, partition key)
+    processed: Dict[str, str] = {}
+    replayed: int = 0
+    stored: int = 0
+    failed: int = 0
+
+    records = event["Records"]
+    metrics.count("RecordsPerBatch", len(records))
+    if records:
+        # Age of the oldest record in the batch: how far behind the shard we are
+        oldest_arrival: float = min(r["kinesis"]["approximateArrivalTimestamp"] for r in records)
+        metrics.put("IteratorAge", max(0.0, time.time() - oldest_arrival) * 1000)
+
+    for record in records:
+        checkpoint_id, sequence = record_position(record)
+        if checkpoints is not None and checkpoints.already_processed(checkpoint_id, sequence):
+            replayed += 1
+            continue
+
         try:
-            payload = json.loads(
-                base64.b64decode(record["kinesis"]["data"]).decode("utf-8")
-            )
-
-            # Save raw data to S3
-            s3.put_object(
-                Bucket=RAW_BUCKET,
-                Key=f"raw-data/{payload['symbol']}/{payload['timestamp'].replace(':', '-')}.json",
-                Body=json.dumps(payload),
-                ContentType="application/json",
-            )
-
-            # Compute metrics
-            price_change = payload["price"] - payload["previous_close"]
-            moving_average = (
-                payload["open"]
-                + payload["high"]
-                + payload["low"]
-                + payload["price"]
-            ) / 4
-
-            # Store processed data in DynamoDB
-            table.put_item(
-                Item={
-                    "symbol": payload["symbol"],
-                    "timestamp": payload["timestamp"],
-                    "price": Decimal(str(payload["price"])),
-                    "previous_close": Decimal(str(payload["previous_close"])),
-                    "change": Decimal(str(price_change)),
-                    "moving_average": Decimal(str(moving_average)),
-                }
-            )
+            with metrics.timer("DecodeTime"):
+                payload = decode_kinesis_data(record)
+
+            # Save raw data to S3 (key unique per record: a retry overwrites
+            # the same object, two ticks in the same second do not collide)
+            if RAW_BUCKET:
+                with metrics.timer("S3WriteLatency"):
+                    s3.put_object(
+                        Bucket=RAW_BUCKET,
+                        Key=(
+                            f"raw-data/{payload['symbol']}/"
+                            f"{payload['timestamp'].replace(':', '-')}-{sequence.lstrip('0')}.json"
+                        ),
+                        Body=json.dumps(payload),
+                        ContentType="application/json",
+                    )
+
+            timestamp_ms: int = event_epoch_ms(payload)
+
+            # Compute metrics (pipeline_core/indicators.py)
+            change: float = price_change(payload["price"], payload["previous_close"])
+            moving_average: float = ohlc_average(payload)
+
+            # Store processed data in DynamoDB (to_decimal == Decimal(str(x)),
+            # memoized: tick prices repeat across records)
+            item: Dict[str, Any] = {
+                **key_attributes(KEY_SCHEME, payload["symbol"], timestamp_ms),
+                "price": to_decimal(payload["price"]),
+                "previous_close": to_decimal(payload["previous_close"]),
+                "change": to_decimal(change),
+                "moving_average": to_decimal(moving_average),
+            }
+            if HOT_WINDOW_SECONDS is not None:
+                item[TTL_ATTRIBUTE] = expires_at(HOT_WINDOW_SECONDS)
+
+            # Latency trace (pipeline_core/tracing.py): producer fields
+            # when present, plus this stage's arrival and processing times.
+            # timestamp_ms keeps the produced time at ms resolution on iso
+            # tables, whose sort key has whole seconds.
+            if payload.get("timestamp_ms") is not None:
+                item["timestamp_ms"] = int(payload["timestamp_ms"])
+            if payload.get(TRACE_ID):
+                item[TRACE_ID] = payload[TRACE_ID]
+            if payload.get("sent_ms") is not None:
+                item["sent_ms"] = int(payload["sent_ms"])
+            item["arrival_ms"] = int(record["kinesis"]["approximateArrivalTimestamp"] * 1000)
+            item["processed_ms"] = now_ms()
+
+            # Conditional write on the record's sequence number: a replayed
+            # record writes nothing and emits no second stream record (no
+            # duplicate trend alert); another tick with the same key overwrites
+            with metrics.timer("DynamoDBWriteLatency"):
+                written: bool = put_item_once(table, item, sequence)
+            if not written:
+                replayed += 1
+                processed[checkpoint_id] = sequence
+                continue
+
+            stored += 1
+            log.sample("Stored tick", symbol=payload["symbol"], ts=timestamp_ms, sequence=sequence.lstrip("0"))
+
+            # Keep the latest-quote projection current (newer timestamps only)
+            if latest_table is not None:
+                with metrics.timer("LatestQuoteWriteLatency"):
+                    upsert_latest_quote(
+                        latest_table,
+                        {
+                            "symbol": payload["symbol"],
+                            "ts": timestamp_ms,
+                            "timestamp": payload["timestamp"],
+                            "price": item["price"],
+                            "previous_close": item["previous_close"],
+                            "change": item["change"],
+                        },
+                    )
 
         except Exception as exc:
-            print(f"Error processing record: {exc}")
+            failed += 1
+            log.error("Error processing record", error=str(exc), sequence=sequence.lstrip("0"))
+
+        # Failed records are not retried either (the batch always succeeds),
+        # so the checkpoint moves past them like the event source mapping does
+        processed[checkpoint_id] = sequence
+
+    if checkpoints is not None:
+        with metrics.timer("CheckpointWriteLatency"):
+            for checkpoint_id, sequence in processed.items():
+                checkpoints.advance(checkpoint_id, sequence)
+
+    metrics.count("RecordsStored", stored)
+    metrics.count("RecordsReplayed", replayed)
+    metrics.count("RecordsFailed", failed)
+    metrics.flush()
+
+    log.info(
+        "Batch processed",
+        records=len(records),
+        stored=stored,
+        replayed=replayed,
+        failed=failed,
+    )
 
     return {"statusCode": 200}
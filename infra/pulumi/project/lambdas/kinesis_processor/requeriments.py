@@ -1 +0,0 @@
-boto3
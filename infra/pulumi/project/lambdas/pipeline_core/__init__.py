@@ -0,0 +1,12 @@
+# lambdas/pipeline_core/__init__.py
+"""
+Code shared by the pipeline Lambdas.
+
+Shipped as the pipeline-core Lambda layer (components/compute/layers.py),
+or bundled next to each function's handler when the layer is disabled
+(components/compute/packaging.py). Either way handlers import it as a
+top-level package: `from pipeline_core import keys`.
+"""
+
+# Bump on every change to the package: it is part of the layer description
+__version__ = "1.1.0"
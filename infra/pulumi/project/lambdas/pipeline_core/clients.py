@@ -0,0 +1,32 @@
+# lambdas/pipeline_core/clients.py
+"""
+boto3 clients shared by the pipeline Lambdas.
+
+Created once per container (module-level cache) and reused by every
+invocation, with the same client configuration in every function:
+keep-alive connections and the standard retry mode.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import boto3
+from botocore.config import Config
+
+CLIENT_CONFIG: Config = Config(
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=10,
+)
+
+
+@lru_cache(maxsize=None)
+def client(service: str) -> Any:
+    return boto3.client(service, config=CLIENT_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def resource(service: str) -> Any:
+    return boto3.resource(service, config=CLIENT_CONFIG)
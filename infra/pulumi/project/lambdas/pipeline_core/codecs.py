@@ -0,0 +1,55 @@
+# lambdas/pipeline_core/codecs.py
+"""
+Event payload decoding.
+
+- Kinesis records carry the producer JSON base64-encoded in
+  record["kinesis"]["data"].
+- DynamoDB Streams images carry attributes typed as {"S": "..."} or
+  {"N": "..."}. Numbers stay Decimal, as boto3 returns them.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Optional
+
+
+def decode_kinesis_data(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Kinesis event record -> producer payload.
+    """
+    return json.loads(base64.b64decode(record["kinesis"]["data"]))
+
+
+def stream_new_image(record: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    DynamoDB Streams record -> its NewImage, if present.
+    """
+    return record.get("dynamodb", {}).get("NewImage")
+
+
+def image_number(field: Mapping[str, str]) -> Decimal:
+    """
+    {"N": "123.45"} -> Decimal("123.45")
+    """
+    return Decimal(field["N"])
+
+
+def image_string(field: Mapping[str, str]) -> str:
+    """
+    {"S": "text"} -> "text"
+    """
+    return field["S"]
+
+
+def plain_image(image: Mapping[str, Mapping[str, str]]) -> Dict[str, str]:
+    """
+    String and number attributes of an image, as their raw strings.
+    Other types (lists, maps, binary) are left out.
+    """
+    return {
+        name: value["S"] if "S" in value else value["N"]
+        for name, value in image.items()
+        if "S" in value or "N" in value
+    }
@@ -0,0 +1,47 @@
+# lambdas/pipeline_core/decimals.py
+"""
+Fast float -> Decimal conversion for DynamoDB items.
+
+boto3 rejects floats, so every numeric attribute goes through
+`Decimal(str(value))`: a float repr plus a Decimal parse, about 0.8 µs per
+field. Tick values repeat heavily: prices move in cents, previous_close is
+constant for a symbol all day, and open/high/low change rarely. A memo
+keyed by the float skips both steps on every repeat.
+
+`to_decimal(x)` returns exactly `Decimal(str(x))`: same value, same
+exponent, same str(). Only floats are memoized. Other types (int, str,
+Decimal) and zeros are converted directly, because they compare equal to a
+float with a different repr (230 == 230.0, 0.0 == -0.0) and would share its
+cache entry.
+
+tools/bench_decimal_conversion.py measures the speedup and checks that the
+output is identical.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict
+
+# A warm container sees a bounded set of prices. The memo is simply dropped
+# when full, which costs one cold batch.
+MAX_CACHED: int = 65536
+
+_cache: Dict[float, Decimal] = {}
+
+
+def to_decimal(value: Any) -> Decimal:
+    """
+    Decimal(str(value)), memoized for floats.
+    """
+    if type(value) is not float or not value:
+        return value if isinstance(value, Decimal) else Decimal(str(value))
+    cached = _cache.get(value)
+    if cached is None:
+        if len(_cache) >= MAX_CACHED:
+            _cache.clear()
+        cached = _cache[value] = Decimal(repr(value))
+    return cached
+
+
+def clear_cache() -> None:
+    _cache.clear()
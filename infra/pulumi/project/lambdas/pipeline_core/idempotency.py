@@ -0,0 +1,186 @@
+# lambdas/pipeline_core/idempotency.py
+"""
+Idempotent processing of Kinesis records.
+
+Kinesis delivers at least once: a failed or timed-out invocation is retried
+with the same batch, and producers may resend records. Two guards make a
+replay a cheap no-op:
+
+1. Sequence checkpoints. Within a shard, records of one partition key keep
+   their order even with a ParallelizationFactor > 1, so the highest
+   processed sequence number per (shard, partition key) identifies every
+   record already handled. The checkpoint is read once per key per
+   container and advanced after each batch with a conditional write that
+   never moves it backwards.
+2. Conditional tick writes. Every tick item stores the sequence number of
+   the record that wrote it. A record that slips past the checkpoint (crash
+   between the write and the checkpoint update) finds its own sequence
+   number already stored, so DynamoDB does not write it again and emits no
+   second stream record, and no duplicate alert follows.
+
+The same table keeps the window watermark of the scheduled trend mode
+(WindowWatermark), so evaluation windows stay contiguous and never overlap
+whichever container runs them.
+
+Only the record position identifies a replay. Distinct ticks that share a
+table key (iso sort keys have second resolution) are different records and
+overwrite each other, as plain puts always did.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+CHECKPOINT_KEY: str = "checkpoint_id"
+SEQUENCE_ATTRIBUTE: str = "sequence_number"
+WINDOW_END_ATTRIBUTE: str = "window_end_ms"
+
+# Kinesis sequence numbers are decimal strings of up to 56 digits: too long
+# for a DynamoDB number, so they are stored zero-padded and compared as strings
+SEQUENCE_WIDTH: int = 64
+
+
+def _is_conditional_failure(exc: ClientError) -> bool:
+    return exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def padded_sequence(sequence_number: str) -> str:
+    return sequence_number.zfill(SEQUENCE_WIDTH)
+
+
+def record_position(record: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    (checkpoint id, padded sequence number) of a Kinesis Lambda record.
+    The checkpoint id is "<shardId>#<partitionKey>".
+    """
+    shard_id: str = record["eventID"].split(":", 1)[0]
+    kinesis: Dict[str, Any] = record["kinesis"]
+    return f"{shard_id}#{kinesis['partitionKey']}", padded_sequence(kinesis["sequenceNumber"])
+
+
+class SequenceCheckpoints:
+    """
+    Highest processed sequence number per (shard, partition key), cached
+    across warm invocations. A stale cache can only be behind the table
+    (checkpoints never move backwards), which costs a redundant conditional
+    write at worst, never a skipped record.
+    """
+
+    def __init__(self, table: Any) -> None:
+        self.table = table
+        self._cache: Dict[str, str] = {}
+
+    def _load(self, checkpoint_id: str) -> str:
+        if checkpoint_id not in self._cache:
+            response: Dict[str, Any] = self.table.get_item(
+                Key={CHECKPOINT_KEY: checkpoint_id}, ConsistentRead=True
+            )
+            self._cache[checkpoint_id] = response.get("Item", {}).get(SEQUENCE_ATTRIBUTE, "")
+        return self._cache[checkpoint_id]
+
+    def already_processed(self, checkpoint_id: str, sequence: str) -> bool:
+        return sequence <= self._load(checkpoint_id)
+
+    def advance(self, checkpoint_id: str, sequence: str) -> None:
+        try:
+            self.table.update_item(
+                Key={CHECKPOINT_KEY: checkpoint_id},
+                UpdateExpression="SET #seq = :seq",
+                ConditionExpression="attribute_not_exists(#seq) OR #seq < :seq",
+                ExpressionAttributeNames={"#seq": SEQUENCE_ATTRIBUTE},
+                ExpressionAttributeValues={":seq": sequence},
+            )
+        except ClientError as exc:
+            if not _is_conditional_failure(exc):
+                raise
+            # Another invocation is already further along: drop our cached value
+            self._cache.pop(checkpoint_id, None)
+            return
+        self._cache[checkpoint_id] = sequence
+
+
+class WindowWatermark:
+    """
+    End (epoch-ms) of the last evaluated window of a scheduled job, stored as
+    one item of the checkpoint table. A pass claims [start, end) by moving
+    the watermark from `start` to `end` with a conditional write: if another
+    invocation claimed it first the write fails and the pass is skipped, so
+    no window is evaluated twice.
+    """
+
+    def __init__(self, table: Any, watermark_id: str) -> None:
+        self.table = table
+        self.watermark_id = watermark_id
+
+    def load(self) -> Optional[int]:
+        response: Dict[str, Any] = self.table.get_item(
+            Key={CHECKPOINT_KEY: self.watermark_id}, ConsistentRead=True
+        )
+        value = response.get("Item", {}).get(WINDOW_END_ATTRIBUTE)
+        return None if value is None else int(value)
+
+    def _move(self, expected: Optional[int], new: int) -> bool:
+        condition: str = "attribute_not_exists(#end)" if expected is None else "#end = :expected"
+        values: Dict[str, Any] = {":end": new}
+        if expected is not None:
+            values[":expected"] = expected
+        try:
+            self.table.update_item(
+                Key={CHECKPOINT_KEY: self.watermark_id},
+                UpdateExpression="SET #end = :end",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={"#end": WINDOW_END_ATTRIBUTE},
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as exc:
+            if _is_conditional_failure(exc):
+                return False
+            raise
+        return True
+
+    def claim(self, stored: Optional[int], end_ms: int) -> bool:
+        """
+        Moves the watermark from `stored` (the value load() returned) to
+        `end_ms`. False if it changed in between.
+        """
+        return self._move(stored, end_ms)
+
+    def release(self, stored: Optional[int], end_ms: int) -> None:
+        """
+        Undoes claim() after a failed pass, unless a later pass moved on.
+        The window is then evaluated again by the next pass.
+        """
+        if stored is None:
+            try:
+                self.table.delete_item(
+                    Key={CHECKPOINT_KEY: self.watermark_id},
+                    ConditionExpression="#end = :end",
+                    ExpressionAttributeNames={"#end": WINDOW_END_ATTRIBUTE},
+                    ExpressionAttributeValues={":end": end_ms},
+                )
+            except ClientError as exc:
+                if not _is_conditional_failure(exc):
+                    raise
+            return
+        self._move(end_ms, stored)
+
+
+def put_item_once(table: Any, item: Dict[str, Any], sequence: str) -> bool:
+    """
+    Writes `item`, tagged with the (padded) sequence number of its Kinesis
+    record, unless the stored item was written by that same record.
+    Returns False for a replay (nothing written, no stream record).
+    """
+    try:
+        table.put_item(
+            Item={**item, SEQUENCE_ATTRIBUTE: sequence},
+            ConditionExpression="attribute_not_exists(#seq) OR #seq <> :seq",
+            ExpressionAttributeNames={"#seq": SEQUENCE_ATTRIBUTE},
+            ExpressionAttributeValues={":seq": sequence},
+        )
+    except ClientError as exc:
+        if _is_conditional_failure(exc):
+            return False
+        raise
+    return True
@@ -0,0 +1,65 @@
+# lambdas/pipeline_core/indicators.py
+"""
+Per-tick and rolling indicators.
+
+The processor computes the per-tick ones on floats from the producer
+payload; the trend Lambda on the Decimals read back from the stream image.
+Both go through the same functions so a stored `change` and an alert's
+change_percent always agree. Rolling indicators summarize the last ticks
+of a symbol for readers (src/query_api.py).
+"""
+from __future__ import annotations
+
+import math
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Sequence, TypeVar
+
+Number = TypeVar("Number", float, Decimal)
+
+
+def price_change(price: Number, previous_close: Number) -> Number:
+    return price - previous_close
+
+
+def change_percent(price: Number, previous_close: Number) -> Number:
+    """
+    Percent move against the previous close (0 when there is none).
+    """
+    if previous_close == 0:
+        return type(price)(0)
+    return (price - previous_close) / previous_close * 100
+
+
+def ohlc_average(payload: Mapping[str, Any]) -> float:
+    """
+    (open + high + low + price) / 4, stored as `moving_average`.
+    """
+    return (payload["open"] + payload["high"] + payload["low"] + payload["price"]) / 4
+
+
+def rolling_indicators(prices: Sequence[float], window: int) -> Dict[str, float]:
+    """
+    Indicators over the last `window` prices (oldest first):
+    sma, ema (alpha = 2 / (window + 1), seeded with the oldest price),
+    min, max, stddev (population) and momentum_percent (last vs oldest).
+    Empty dict when there are no prices.
+    """
+    values = [float(p) for p in prices[-window:]]
+    if not values:
+        return {}
+    count: int = len(values)
+    sma: float = sum(values) / count
+    alpha: float = 2 / (window + 1)
+    ema: float = values[0]
+    for value in values[1:]:
+        ema += alpha * (value - ema)
+    return {
+        "count": count,
+        "last": values[-1],
+        "sma": sma,
+        "ema": ema,
+        "min": min(values),
+        "max": max(values),
+        "stddev": math.sqrt(sum((v - sma) ** 2 for v in values) / count),
+        "momentum_percent": change_percent(values[-1], values[0]),
+    }
@@ -0,0 +1,343 @@
+# lambdas/pipeline_core/keys.py
+"""
+DynamoDB key scheme for the stock table.
+
+Hash key, two layouts:
+
+- "symbol"  : hash key = symbol (original layout)
+- "sharded" : hash key = "symbol#YYYY-MM-DD#shard"
+
+The sharded scheme spreads the writes of a single hot symbol over
+`write_shards` partitions per day. The shard is derived from the record
+itself (not random) so a retried write lands on the same item.
+Readers must fan out over every (day, shard) pair and merge the results,
+which is what `query_symbol_range` and `query_symbol_latest` do.
+
+Sort key, two formats:
+
+- "iso"      : timestamp (S) = "%Y-%m-%dT%H:%M:%SZ" (legacy table)
+- "epoch_ms" : ts (N) = epoch milliseconds (stock-market-data-v2)
+
+During the iso -> epoch_ms migration `query_symbol_range_dual_read` reads
+both tables and merges them until the legacy table has drained (TTL) or
+been backfilled (tools/backfill_epoch_timestamps.py).
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pipeline_core.timestamps import format_iso, parse_iso_ms, to_epoch_ms
+
+KEY_SCHEME_SYMBOL: str = "symbol"
+KEY_SCHEME_SHARDED: str = "sharded"
+
+SORT_KEY_ISO: str = "iso"
+SORT_KEY_EPOCH_MS: str = "epoch_ms"
+
+SYMBOL_ATTRIBUTE: str = "symbol"
+SHARDED_HASH_KEY: str = "pk"
+ISO_RANGE_KEY: str = "timestamp"
+EPOCH_MS_RANGE_KEY: str = "ts"
+
+KEY_SEPARATOR: str = "#"
+
+# Set on items copied by tools/backfill_epoch_timestamps.py; the trend
+# stream mapping filters them out so a backfill does not replay alerts.
+BACKFILLED_ATTRIBUTE: str = "backfilled"
+
+_deserializer = TypeDeserializer()
+
+
+@dataclass(frozen=True)
+class KeyScheme:
+    mode: str = KEY_SCHEME_SYMBOL
+    write_shards: int = 1
+    sort_key_format: str = SORT_KEY_ISO
+
+    def __post_init__(self) -> None:
+        if self.mode not in (KEY_SCHEME_SYMBOL, KEY_SCHEME_SHARDED):
+            raise ValueError(f"Unknown key scheme: {self.mode}")
+        if self.write_shards < 1:
+            raise ValueError("write_shards must be >= 1")
+        if self.sort_key_format not in (SORT_KEY_ISO, SORT_KEY_EPOCH_MS):
+            raise ValueError(f"Unknown sort key format: {self.sort_key_format}")
+
+    @classmethod
+    def from_env(cls, prefix: str = "") -> "KeyScheme":
+        """
+        Reads KEY_SCHEME / WRITE_SHARDS / SORT_KEY_FORMAT
+        (defaults: symbol / 1 / iso). `prefix` selects another table's
+        settings, e.g. prefix="LEGACY_" during the timestamp migration.
+        """
+        return cls(
+            mode=os.environ.get(f"{prefix}KEY_SCHEME", KEY_SCHEME_SYMBOL),
+            write_shards=int(os.environ.get(f"{prefix}WRITE_SHARDS", "1")),
+            sort_key_format=os.environ.get(f"{prefix}SORT_KEY_FORMAT", SORT_KEY_ISO),
+        )
+
+    @property
+    def sharded(self) -> bool:
+        return self.mode == KEY_SCHEME_SHARDED
+
+    @property
+    def hash_key(self) -> str:
+        return SHARDED_HASH_KEY if self.sharded else SYMBOL_ATTRIBUTE
+
+    @property
+    def epoch_ms(self) -> bool:
+        return self.sort_key_format == SORT_KEY_EPOCH_MS
+
+    @property
+    def range_key(self) -> str:
+        return EPOCH_MS_RANGE_KEY if self.epoch_ms else ISO_RANGE_KEY
+
+    def range_value(self, epoch_ms: int) -> Any:
+        return epoch_ms if self.epoch_ms else format_iso(epoch_ms)
+
+    def typed_range_value(self, epoch_ms: int) -> Dict[str, str]:
+        """
+        Low-level (client API) representation of the sort key value.
+        """
+        if self.epoch_ms:
+            return {"N": str(epoch_ms)}
+        return {"S": format_iso(epoch_ms)}
+
+
+# ============================================================
+# Write side
+# ============================================================
+
+def day_bucket(epoch_ms: int) -> str:
+    """
+    1709303400000 -> "2024-03-01"
+    """
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).date().isoformat()
+
+
+def shard_for(symbol: str, epoch_ms: int, write_shards: int) -> int:
+    if write_shards == 1:
+        return 0
+    return zlib.crc32(f"{symbol}{KEY_SEPARATOR}{epoch_ms}".encode("utf-8")) % write_shards
+
+
+def sharded_partition_key(symbol: str, bucket: str, shard: int) -> str:
+    return KEY_SEPARATOR.join((symbol, bucket, str(shard)))
+
+
+def key_attributes(scheme: KeyScheme, symbol: str, epoch_ms: int) -> Dict[str, Any]:
+    """
+    Key attributes for a tick item. `symbol` is always stored so stream
+    consumers and Athena-style readers never have to parse the hash key.
+    """
+    attributes: Dict[str, Any] = {
+        SYMBOL_ATTRIBUTE: symbol,
+        scheme.range_key: scheme.range_value(epoch_ms),
+    }
+    if scheme.sharded:
+        shard: int = shard_for(symbol, epoch_ms, scheme.write_shards)
+        attributes[SHARDED_HASH_KEY] = sharded_partition_key(
+            symbol, day_bucket(epoch_ms), shard
+        )
+    return attributes
+
+
+def item_epoch_ms(item: Dict[str, Any]) -> int:
+    """
+    Epoch-ms of a deserialized tick item from either table layout.
+    """
+    if EPOCH_MS_RANGE_KEY in item:
+        return int(item[EPOCH_MS_RANGE_KEY])
+    return parse_iso_ms(item[ISO_RANGE_KEY])
+
+
+# ============================================================
+# Read side
+# ============================================================
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _day_buckets(start: datetime, end: datetime) -> Iterator[str]:
+    day = start.date()
+    while day <= end.date():
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def partition_keys_for_range(
+    scheme: KeyScheme, symbol: str, start: datetime, end: datetime
+) -> List[str]:
+    if not scheme.sharded:
+        return [symbol]
+    return [
+        sharded_partition_key(symbol, bucket, shard)
+        for bucket in _day_buckets(_as_utc(start), _as_utc(end))
+        for shard in range(scheme.write_shards)
+    ]
+
+
+def _query_partition(
+    client: Any,
+    table_name: str,
+    scheme: KeyScheme,
+    partition_value: str,
+    start_ms: int,
+    end_ms: int,
+) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    kwargs: Dict[str, Any] = {
+        "TableName": table_name,
+        "KeyConditionExpression": "#pk = :pk AND #ts BETWEEN :start AND :end",
+        "ExpressionAttributeNames": {"#pk": scheme.hash_key, "#ts": scheme.range_key},
+        "ExpressionAttributeValues": {
+            ":pk": {"S": partition_value},
+            ":start": scheme.typed_range_value(start_ms),
+            ":end": scheme.typed_range_value(end_ms),
+        },
+        "ScanIndexForward": True,
+    }
+    while True:
+        response = client.query(**kwargs)
+        items.extend(
+            {k: _deserializer.deserialize(v) for k, v in item.items()}
+            for item in response.get("Items", [])
+        )
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def query_symbol_range(
+    client: Any,
+    table_name: str,
+    scheme: KeyScheme,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    max_workers: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    Returns every tick of `symbol` with start <= timestamp <= end,
+    ascending by timestamp.
+
+    `client` must be a low-level boto3 DynamoDB client (clients are
+    thread-safe, Table resources are not). Under the sharded scheme one
+    Query per (day, shard) runs on a bounded thread pool and the
+    already-sorted partitions are k-way merged.
+
+    Naive datetimes are interpreted as UTC.
+    """
+    start_ms: int = to_epoch_ms(_as_utc(start))
+    end_ms: int = to_epoch_ms(_as_utc(end))
+    partitions: List[str] = partition_keys_for_range(scheme, symbol, start, end)
+
+    if len(partitions) == 1:
+        return _query_partition(client, table_name, scheme, partitions[0], start_ms, end_ms)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(partitions))) as pool:
+        results: List[List[Dict[str, Any]]] = list(
+            pool.map(
+                lambda pk: _query_partition(client, table_name, scheme, pk, start_ms, end_ms),
+                partitions,
+            )
+        )
+
+    merged: Iterator[Dict[str, Any]] = heapq.merge(*results, key=item_epoch_ms)
+    return list(merged)
+
+
+def query_symbol_range_dual_read(
+    client: Any,
+    table_name: str,
+    scheme: KeyScheme,
+    legacy_table_name: str,
+    legacy_scheme: KeyScheme,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+) -> List[Dict[str, Any]]:
+    """
+    Migration-window read: queries the current and the legacy table,
+    merges both by epoch-ms and drops duplicates (backfilled rows exist in
+    both tables; the current table wins).
+    """
+    current = query_symbol_range(client, table_name, scheme, symbol, start, end)
+    legacy = query_symbol_range(client, legacy_table_name, legacy_scheme, symbol, start, end)
+
+    seen = {item_epoch_ms(item) for item in current}
+    merged = current + [item for item in legacy if item_epoch_ms(item) not in seen]
+    merged.sort(key=item_epoch_ms)
+    return merged
+
+
+def _query_partition_latest(
+    client: Any, table_name: str, scheme: KeyScheme, partition_value: str, limit: int
+) -> List[Dict[str, Any]]:
+    response = client.query(
+        TableName=table_name,
+        KeyConditionExpression="#pk = :pk",
+        ExpressionAttributeNames={"#pk": scheme.hash_key},
+        ExpressionAttributeValues={":pk": {"S": partition_value}},
+        ScanIndexForward=False,
+        Limit=limit,
+    )
+    return [
+        {k: _deserializer.deserialize(v) for k, v in item.items()}
+        for item in response.get("Items", [])
+    ]
+
+
+def query_symbol_latest(
+    client: Any,
+    table_name: str,
+    scheme: KeyScheme,
+    symbol: str,
+    limit: int,
+    now: Optional[datetime] = None,
+    max_days: int = 2,
+    max_workers: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    Returns the `limit` most recent ticks of `symbol`, ascending by
+    timestamp.
+
+    One newest-first Query with Limit per partition, so the read costs
+    about `limit` items however long the table is. Under the sharded
+    scheme every shard of the current day is queried in parallel and the
+    newest `limit` kept; earlier days (at most `max_days` in total) are
+    read only while fewer than `limit` ticks have been found.
+    """
+    if not scheme.sharded:
+        return _query_partition_latest(client, table_name, scheme, symbol, limit)[::-1]
+
+    day: datetime = _as_utc(now or datetime.now(timezone.utc))
+    found: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, scheme.write_shards)) as pool:
+        for _ in range(max_days):
+            bucket: str = day.date().isoformat()
+            results: List[List[Dict[str, Any]]] = list(
+                pool.map(
+                    lambda shard: _query_partition_latest(
+                        client, table_name, scheme, sharded_partition_key(symbol, bucket, shard), limit
+                    ),
+                    range(scheme.write_shards),
+                )
+            )
+            found.extend(heapq.merge(*results, key=item_epoch_ms, reverse=True))
+            if len(found) >= limit:
+                break
+            day -= timedelta(days=1)
+    # Each day is newest-first and the days run backwards: `found` is sorted
+    return found[:limit][::-1]
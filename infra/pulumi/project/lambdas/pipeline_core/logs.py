@@ -0,0 +1,115 @@
+# lambdas/pipeline_core/logs.py
+"""
+Structured JSON logging for the Lambdas and the producer.
+
+One JSON object per line, so CloudWatch Logs Insights can filter on any
+field (`level`, `symbol`, `aws_request_id`...). Hot loops should not log
+every record: per-record detail goes through `sample()`, which only writes
+a configurable fraction of the calls, and each invocation ends with one
+summary line carrying the counters.
+
+Configuration (environment):
+    LOG_LEVEL        DEBUG | INFO | WARNING | ERROR   (default INFO)
+    LOG_SAMPLE_RATE  fraction of sample() calls written (default 0.01)
+
+Levels are checked before anything is serialized, so disabled calls cost
+one comparison.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Optional, TextIO
+
+LEVELS: Dict[str, int] = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+DEFAULT_SAMPLE_RATE: float = 0.01
+
+
+def _level_from_env() -> int:
+    return LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), LEVELS["INFO"])
+
+
+def _sample_rate_from_env() -> float:
+    raw: Optional[str] = os.environ.get("LOG_SAMPLE_RATE")
+    return DEFAULT_SAMPLE_RATE if raw is None else min(1.0, max(0.0, float(raw)))
+
+
+class StructuredLogger:
+    """
+    Minimal JSON-lines logger. `bind()` returns a child logger that adds
+    fixed fields (e.g. the request id) to every line.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        level: Optional[int] = None,
+        sample_rate: Optional[float] = None,
+        stream: Optional[TextIO] = None,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.level: int = _level_from_env() if level is None else level
+        self.sample_rate: float = _sample_rate_from_env() if sample_rate is None else sample_rate
+        self.stream = stream
+        self.context: Dict[str, Any] = context or {}
+
+    def bind(self, **fields: Any) -> "StructuredLogger":
+        return StructuredLogger(
+            self.name, self.level, self.sample_rate, self.stream, {**self.context, **fields}
+        )
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= self.level
+
+    def _write(self, level: str, message: str, fields: Dict[str, Any]) -> None:
+        line: Dict[str, Any] = {
+            "timestamp": round(time.time(), 3),
+            "level": level,
+            "logger": self.name,
+            "message": message,
+            **self.context,
+            **fields,
+        }
+        # default=str: Decimal, datetime... never break a log line.
+        # One write per line so concurrent threads do not interleave.
+        (self.stream or sys.stdout).write(json.dumps(line, default=str) + "\n")
+
+    def debug(self, message: str, **fields: Any) -> None:
+        if LEVELS["DEBUG"] >= self.level:
+            self._write("DEBUG", message, fields)
+
+    def info(self, message: str, **fields: Any) -> None:
+        if LEVELS["INFO"] >= self.level:
+            self._write("INFO", message, fields)
+
+    def warning(self, message: str, **fields: Any) -> None:
+        if LEVELS["WARNING"] >= self.level:
+            self._write("WARNING", message, fields)
+
+    def error(self, message: str, **fields: Any) -> None:
+        if LEVELS["ERROR"] >= self.level:
+            self._write("ERROR", message, fields)
+
+    def sample(self, message: str, **fields: Any) -> None:
+        """
+        Per-record detail: written at INFO for a `sample_rate` fraction of
+        calls (always at DEBUG level).
+        """
+        if self.level <= LEVELS["DEBUG"]:
+            self._write("DEBUG", message, fields)
+        elif LEVELS["INFO"] >= self.level and self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._write("INFO", message, {**fields, "sampled": True})
+
+
+def get_logger(name: str, context: Any = None) -> StructuredLogger:
+    """
+    Logger for a Lambda invocation (pass the Lambda context to tag every
+    line with the request id) or for a long-running process (context=None).
+    """
+    logger = StructuredLogger(name)
+    request_id: Optional[str] = getattr(context, "aws_request_id", None)
+    return logger.bind(aws_request_id=request_id) if request_id else logger
@@ -0,0 +1,112 @@
+# lambdas/pipeline_core/metrics.py
+"""
+CloudWatch metrics through the Embedded Metric Format (EMF).
+
+A metric is a JSON log line with an `_aws` block. CloudWatch Logs extracts
+the values asynchronously, so recording a metric costs no PutMetricData
+call and adds no latency to the handler. In Lambda, stdout already goes to
+CloudWatch Logs. For the producer, the CloudWatch agent (or any log shipper
+that forwards to CloudWatch Logs) does the same.
+
+Values are buffered and written by `flush()`, usually once per invocation
+or every few hundred events. Each metric holds a list of values, and
+CloudWatch keeps every value for percentiles. EMF accepts at most 100
+values per metric per line, so larger buffers are split over several lines.
+
+Configuration (environment):
+    METRICS_NAMESPACE  CloudWatch namespace (default StockMarketPipeline)
+    METRICS_ENABLED    "false" turns flush() into a no-op (default true)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+DEFAULT_NAMESPACE: str = "StockMarketPipeline"
+MAX_VALUES_PER_METRIC: int = 100
+
+MILLISECONDS: str = "Milliseconds"
+COUNT: str = "Count"
+
+
+def _enabled_from_env() -> bool:
+    return os.environ.get("METRICS_ENABLED", "true").lower() not in ("false", "0", "no")
+
+
+class MetricsBuffer:
+    """
+    Buffers metric values and writes them as EMF lines. All metrics share
+    one dimension, Service, so each component gets its own series.
+    Thread-safe: the producer records from several threads.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        namespace: Optional[str] = None,
+        stream: Optional[TextIO] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        self.service = service
+        self.namespace: str = namespace or os.environ.get("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        self.stream = stream
+        self.enabled: bool = _enabled_from_env() if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[str, List[float]]] = {}
+
+    def put(self, name: str, value: float, unit: str = MILLISECONDS) -> None:
+        with self._lock:
+            self._values.setdefault(name, (unit, []))[1].append(value)
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.put(name, value, COUNT)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Records the duration of the `with` block in milliseconds, also when
+        it raises (a slow failure is still a slow call).
+        """
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put(name, (time.perf_counter() - started) * 1000)
+
+    def flush(self) -> None:
+        with self._lock:
+            values, self._values = self._values, {}
+        if not values or not self.enabled:
+            return
+        # Line i carries values [i*100, (i+1)*100) of every metric
+        longest: int = max(len(series) for _, series in values.values())
+        for start in range(0, longest, MAX_VALUES_PER_METRIC):
+            chunk: Dict[str, Tuple[str, List[float]]] = {
+                name: (unit, series[start:start + MAX_VALUES_PER_METRIC])
+                for name, (unit, series) in values.items()
+                if len(series) > start
+            }
+            self._write(chunk)
+
+    def _write(self, chunk: Dict[str, Tuple[str, List[float]]]) -> None:
+        line: Dict[str, object] = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [["Service"]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _) in chunk.items()],
+                    }
+                ],
+            },
+            "Service": self.service,
+        }
+        for name, (_, series) in chunk.items():
+            line[name] = series[0] if len(series) == 1 else series
+        (self.stream or sys.stdout).write(json.dumps(line) + "\n")
@@ -0,0 +1,89 @@
+# lambdas/pipeline_core/quotes.py
+"""
+Latest-quote projection.
+
+A small table keyed only by `symbol` holds the most recent tick of every
+symbol. The processor upserts it with a conditional write that only
+succeeds for a newer timestamp, so out-of-order or replayed records never
+move the quote backwards. Reading the current price of a whole watchlist
+is then one BatchGetItem per 100 symbols instead of one Query per symbol.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, List
+
+from botocore.exceptions import ClientError
+
+SYMBOL_KEY: str = "symbol"
+# Epoch-ms: numeric comparison, independent of the ISO string format
+TIMESTAMP_ATTRIBUTE: str = "ts"
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT: int = 100
+MAX_UNPROCESSED_RETRIES: int = 5
+
+
+def upsert_latest_quote(table: Any, item: Dict[str, Any]) -> bool:
+    """
+    Writes `item` as the latest quote of item["symbol"] unless a quote with
+    the same or a newer timestamp is already stored.
+
+    `table` is a boto3 Table resource. Returns True if the item was written.
+    """
+    attributes: Dict[str, Any] = {
+        k: v for k, v in item.items() if k not in (SYMBOL_KEY, TIMESTAMP_ATTRIBUTE)
+    }
+
+    names: Dict[str, str] = {"#ts": TIMESTAMP_ATTRIBUTE}
+    values: Dict[str, Any] = {":ts": item[TIMESTAMP_ATTRIBUTE]}
+    assignments: List[str] = ["#ts = :ts"]
+    for index, (name, value) in enumerate(attributes.items()):
+        names[f"#a{index}"] = name
+        values[f":a{index}"] = value
+        assignments.append(f"#a{index} = :a{index}")
+
+    try:
+        table.update_item(
+            Key={SYMBOL_KEY: item[SYMBOL_KEY]},
+            UpdateExpression="SET " + ", ".join(assignments),
+            ConditionExpression="attribute_not_exists(#ts) OR #ts < :ts",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def get_latest_quotes(
+    dynamodb: Any, table_name: str, symbols: Iterable[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns {symbol: latest quote item} for every symbol that has a quote.
+
+    `dynamodb` is the boto3 DynamoDB service resource. Unprocessed keys
+    (throttling) are retried with exponential backoff.
+    """
+    unique_symbols: List[str] = list(dict.fromkeys(symbols))
+    quotes: Dict[str, Dict[str, Any]] = {}
+
+    for start in range(0, len(unique_symbols), BATCH_GET_LIMIT):
+        chunk: List[str] = unique_symbols[start:start + BATCH_GET_LIMIT]
+        request: Dict[str, Any] = {
+            table_name: {"Keys": [{SYMBOL_KEY: symbol} for symbol in chunk]}
+        }
+
+        for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get("Responses", {}).get(table_name, []):
+                quotes[item[SYMBOL_KEY]] = item
+
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            time.sleep(0.05 * (2 ** attempt))
+
+    return quotes
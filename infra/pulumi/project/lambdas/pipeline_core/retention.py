@@ -0,0 +1,45 @@
+# lambdas/pipeline_core/retention.py
+"""
+Hot-window retention for the tick table.
+
+Items carry an `expires_at` epoch-seconds attribute and the table has TTL
+enabled on it, so DynamoDB deletes ticks once they leave the hot window.
+The full history stays in the S3 raw archive.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+TTL_ATTRIBUTE: str = "expires_at"
+
+# DynamoDB marks TTL deletions with this service principal on the stream record
+TTL_PRINCIPAL: str = "dynamodb.amazonaws.com"
+
+
+def hot_window_seconds_from_env() -> Optional[int]:
+    """
+    HOT_WINDOW_HOURS (unset or 0 = keep items forever).
+    """
+    hours: int = int(os.environ.get("HOT_WINDOW_HOURS", "0"))
+    return hours * 3600 if hours > 0 else None
+
+
+def expires_at(hot_window_seconds: int, now: Optional[float] = None) -> int:
+    """
+    TTL timestamp measured from ingestion time, not from the tick's own
+    timestamp, so replayed historical data still stays hot for a full window.
+    """
+    current: float = time.time() if now is None else now
+    return int(current) + hot_window_seconds
+
+
+def is_ttl_removal(record: Dict[str, Any]) -> bool:
+    """
+    True for DynamoDB Stream records produced by a TTL expiry.
+    """
+    if record.get("eventName") != "REMOVE":
+        return False
+    identity: Dict[str, Any] = record.get("userIdentity") or {}
+    return identity.get("type") == "Service" and identity.get("principalId") == TTL_PRINCIPAL
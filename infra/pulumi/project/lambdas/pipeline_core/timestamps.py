@@ -0,0 +1,55 @@
+# lambdas/pipeline_core/timestamps.py
+"""
+Tick timestamps.
+
+Events carry `timestamp_ms` (epoch milliseconds, UTC) next to the legacy
+ISO string `timestamp` ("%Y-%m-%dT%H:%M:%SZ"). Numeric sort keys compare
+correctly regardless of string formatting and are smaller than the
+20-byte ISO string.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Mapping
+
+ISO_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
+
+# Formats seen in the wild: producer output, fractional seconds, and the
+# space-separated form the legacy trend Lambda used for range conditions.
+_PARSE_FORMATS = (
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%d %H:%M:%S",
+)
+
+
+def to_epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def parse_iso_ms(timestamp: str) -> int:
+    """
+    "2024-03-01T14:30:00Z" -> 1709303400000
+    """
+    for fmt in _PARSE_FORMATS:
+        try:
+            return to_epoch_ms(datetime.strptime(timestamp, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized timestamp: {timestamp!r}")
+
+
+def format_iso(epoch_ms: int) -> str:
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).strftime(ISO_FORMAT)
+
+
+def event_epoch_ms(payload: Mapping[str, Any]) -> int:
+    """
+    Epoch-ms of a producer event, falling back to the ISO string for
+    events emitted before the producer started sending timestamp_ms.
+    """
+    if payload.get("timestamp_ms") is not None:
+        return int(payload["timestamp_ms"])
+    return parse_iso_ms(payload["timestamp"])
@@ -0,0 +1,96 @@
+# lambdas/pipeline_core/tracing.py
+"""
+End-to-end latency tracing.
+
+The producer gives each event a `trace_id` and stamps `sent_ms` when it
+hands the event to Kinesis (or to the spool). Every later stage adds its own
+epoch-ms timestamp:
+
+    produced   timestamp_ms   event time, set when the producer formats the tick
+    sent       sent_ms        producer hands the event to Kinesis / the spool
+    arrived    arrival_ms     Kinesis approximateArrivalTimestamp
+    processed  processed_ms   processor writes the tick to DynamoDB
+    alerted    alerted_ms     trend Lambda published the SNS alert
+
+The processor stores the trace fields on the DynamoDB item, so they also
+reach the trend Lambda through the stream NewImage. The trend Lambda logs
+the complete trace with every alert. tools/latency_report.py rebuilds the
+per-stage percentiles from the items and from those log lines.
+
+Stage clocks come from different machines (producer host, Kinesis, Lambda),
+so short stages carry the clock skew between them.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+TRACE_ID: str = "trace_id"
+PROCESSED_MS: str = "processed_ms"
+
+# (stage, attribute) in pipeline order
+STAGES: List[Tuple[str, str]] = [
+    ("produced", "timestamp_ms"),
+    ("sent", "sent_ms"),
+    ("arrived", "arrival_ms"),
+    ("processed", PROCESSED_MS),
+    ("alerted", "alerted_ms"),
+]
+STAGE_ATTRIBUTES: List[str] = [attribute for _, attribute in STAGES]
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def new_trace_id() -> str:
+    """
+    64 random bits as hex: unique enough for a latency sample, and cheaper
+    than a UUID on the producer's hot path.
+    """
+    return os.urandom(8).hex()
+
+
+def start_trace(event: Mapping[str, Any], sent_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copy of `event` with a trace id (kept if the event already has one,
+    e.g. a replay) and the producer send time.
+    """
+    return {
+        **event,
+        TRACE_ID: event.get(TRACE_ID) or new_trace_id(),
+        "sent_ms": now_ms() if sent_ms is None else sent_ms,
+    }
+
+
+def trace_fields(source: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Trace id and stage timestamps present in `source` (event, item or
+    deserialized stream image). Timestamps are returned as int.
+    """
+    fields: Dict[str, Any] = {}
+    if source.get(TRACE_ID):
+        fields[TRACE_ID] = str(source[TRACE_ID])
+    for attribute in STAGE_ATTRIBUTES:
+        if source.get(attribute) is not None:
+            fields[attribute] = int(source[attribute])
+    return fields
+
+
+def stage_latencies(trace: Mapping[str, Any]) -> Dict[str, int]:
+    """
+    Milliseconds between consecutive stages present in `trace`, e.g.
+    {"arrived_to_processed": 42, ...}, plus "end_to_end" (first to last).
+    A missing stage is skipped: the next interval spans it.
+    """
+    present: List[Tuple[str, int]] = [
+        (stage, int(trace[attribute])) for stage, attribute in STAGES if trace.get(attribute) is not None
+    ]
+    latencies: Dict[str, int] = {
+        f"{previous}_to_{stage}": at - previous_at
+        for (previous, previous_at), (stage, at) in zip(present, present[1:])
+    }
+    if len(present) > 1:
+        latencies["end_to_end"] = present[-1][1] - present[0][1]
+    return latencies
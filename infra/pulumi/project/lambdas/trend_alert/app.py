@@ -4,20 +4,69 @@ from __future__ import annotations
 
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
+from pipeline_core.clients import client, resource
+from pipeline_core.codecs import image_number, image_string, plain_image, stream_new_image
+from pipeline_core.idempotency import WindowWatermark
+from pipeline_core.indicators import change_percent as compute_change_percent
+from pipeline_core.keys import KeyScheme, item_epoch_ms, query_symbol_range, query_symbol_range_dual_read
+from pipeline_core.logs import get_logger
+from pipeline_core.metrics import MetricsBuffer
+from pipeline_core.quotes import SYMBOL_KEY, TIMESTAMP_ATTRIBUTE
+from pipeline_core.retention import is_ttl_removal
+from pipeline_core.timestamps import format_iso
+from pipeline_core.tracing import PROCESSED_MS, now_ms, trace_fields
 
-dynamodb = boto3.resource("dynamodb")
-sns = boto3.client("sns")
+dynamodb = resource("dynamodb")
+dynamodb_client = client("dynamodb")
+sns = client("sns")
+
+# EMF metrics, written once per invocation (no PutMetricData calls)
+metrics = MetricsBuffer("trend_alert")
+
+# Simple anomaly rule: |change vs previous close| above this, in percent
+ALERT_THRESHOLD: Decimal = Decimal("0.1050")
+
+# Scheduled mode: a window is evaluated this long after it ends, so ticks
+# still in flight (processor lag, iterator age) land in it. Default of
+# SETTLE_SECONDS.
+SETTLE_MS: int = 5_000
+# Ticks written after their window was evaluated are picked up by the next
+# pass if their timestamp is at most this far before its window (they carry
+# processed_ms). Default of LATE_TICK_LOOKBACK_SECONDS.
+LATE_TICK_LOOKBACK_MS: int = 60_000
+# Stop starting new passes with less than this left before the timeout
+MIN_REMAINING_MS: int = 10_000
+MAX_QUERY_WORKERS: int = 16
+# Longest window a pass evaluates after the schedule was paused (mode
+# switch, disabled rule); older ticks are no longer alert-worthy
+MAX_CATCHUP_MS: int = 15 * 60 * 1000
+
+# Checkpoint table item holding the end of the last evaluated window
+WATERMARK_ID: str = "trend_alert#scheduled"
 
 
 @dataclass(frozen=True)
 class Config:
     table_name: str
     sns_topic_arn: str
+    key_scheme: KeyScheme
+    # Set only during the iso -> epoch_ms sort key migration (dual-read window)
+    legacy_table_name: Optional[str] = None
+    legacy_key_scheme: Optional[KeyScheme] = None
+    # Scheduled mode: latest-quote table (the symbol list), checkpoint table
+    # (the window watermark) and the seconds between evaluation passes
+    latest_table_name: Optional[str] = None
+    checkpoint_table_name: Optional[str] = None
+    evaluation_interval_seconds: int = 60
+    settle_ms: int = SETTLE_MS
+    late_tick_lookback_ms: int = LATE_TICK_LOOKBACK_MS
 
 
 def load_config() -> Config:
@@ -27,99 +76,335 @@ def load_config() -> Config:
     """
     table_name: str = os.environ["TABLE_NAME"]
     sns_topic_arn: str = os.environ["SNS_TOPIC_ARN"]
-    return Config(table_name=table_name, sns_topic_arn=sns_topic_arn)
+    legacy_table_name: Optional[str] = os.environ.get("LEGACY_TABLE_NAME") or None
+    return Config(
+        table_name=table_name,
+        sns_topic_arn=sns_topic_arn,
+        key_scheme=KeyScheme.from_env(),
+        legacy_table_name=legacy_table_name,
+        legacy_key_scheme=KeyScheme.from_env(prefix="LEGACY_") if legacy_table_name else None,
+        latest_table_name=os.environ.get("LATEST_TABLE_NAME") or None,
+        checkpoint_table_name=os.environ.get("CHECKPOINT_TABLE") or None,
+        evaluation_interval_seconds=int(os.environ.get("EVALUATION_INTERVAL_SECONDS", "60")),
+        settle_ms=int(float(os.environ.get("SETTLE_SECONDS", SETTLE_MS / 1000)) * 1000),
+        late_tick_lookback_ms=int(
+            float(os.environ.get("LATE_TICK_LOOKBACK_SECONDS", LATE_TICK_LOOKBACK_MS / 1000)) * 1000
+        ),
+    )
 
 
-def _to_decimal(value: Any) -> Decimal:
+def parse_image_trace(new_image: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Ensures numeric values are treated as Decimal for DynamoDB safety.
+    Trace id and stage timestamps stored by the processor, if any.
     """
-    if isinstance(value, Decimal):
-        return value
-    return Decimal(str(value))
+    plain: Dict[str, Any] = plain_image(new_image)
+    if "timestamp_ms" not in plain and "ts" in plain:
+        plain["timestamp_ms"] = plain["ts"]
+    return trace_fields(plain)
 
 
-def extract_new_image(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def parse_image_timestamp(new_image: Dict[str, Any]) -> str:
     """
-    DynamoDB Streams record -> get the NewImage dict, if present.
+    ISO timestamp of a stream image from either table layout:
+    {"ts": {"N": epoch_ms}} or the legacy {"timestamp": {"S": iso}}.
     """
-    ddb: Dict[str, Any] = record.get("dynamodb", {})
-    new_image: Optional[Dict[str, Any]] = ddb.get("NewImage")
-    return new_image
+    if "ts" in new_image:
+        return format_iso(int(image_number(new_image["ts"])))
+    return image_string(new_image["timestamp"])
 
 
-def parse_ddb_number(field: Dict[str, str]) -> Decimal:
+def get_ticks(cfg: Config, symbol: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
     """
-    DynamoDB streams encodes numbers like {"N": "123.45"}.
+    Ticks of `symbol` with start <= timestamp <= end, ascending.
+    Fans out over write shards when the table uses the sharded key scheme,
+    and also reads the legacy table while a sort key migration is running.
     """
-    return Decimal(field["N"])
+    if cfg.legacy_table_name and cfg.legacy_key_scheme:
+        return query_symbol_range_dual_read(
+            dynamodb_client,
+            cfg.table_name,
+            cfg.key_scheme,
+            cfg.legacy_table_name,
+            cfg.legacy_key_scheme,
+            symbol,
+            start,
+            end,
+        )
+    return query_symbol_range(
+        dynamodb_client, cfg.table_name, cfg.key_scheme, symbol, start, end
+    )
+
+
+def publish_alert(topic_arn: str, subject: str, message: str) -> None:
+    sns.publish(
+        TopicArn=topic_arn,
+        Subject=subject,
+        Message=message,
+    )
 
 
-def parse_ddb_string(field: Dict[str, str]) -> str:
+def evaluate_tick(
+    cfg: Config,
+    log: Any,
+    symbol: str,
+    timestamp: str,
+    price: Decimal,
+    prev_close: Decimal,
+    trace: Dict[str, Any],
+) -> bool:
     """
-    DynamoDB streams encodes strings like {"S": "text"}.
+    Applies the anomaly rule to one tick and publishes the alert.
+    Returns True when an alert was sent.
     """
-    return field["S"]
+    change_percent: Decimal = compute_change_percent(price, prev_close)
+    log.sample(
+        "Evaluated tick",
+        symbol=symbol,
+        timestamp=timestamp,
+        change_percent=change_percent,
+        threshold=ALERT_THRESHOLD,
+        trace_id=trace.get("trace_id"),
+    )
+    if abs(change_percent) <= ALERT_THRESHOLD:
+        return False
 
+    subject: str = f"Stock Alert: {symbol}"
+    message: str = (
+        f"ALERTA: movimiento anómalo detectado\n"
+        f"symbol: {symbol}\n"
+        f"timestamp: {timestamp}\n"
+        f"price: {price}\n"
+        f"previous_close: {prev_close}\n"
+        f"change_percent: {change_percent:.2f}%\n"
+        f"trace_id: {trace.get('trace_id', '-')}\n"
+    )
+    with metrics.timer("SNSPublishLatency"):
+        publish_alert(cfg.sns_topic_arn, subject, message)
+    # Complete trace, one line per alert: tools/latency_report.py --logs
+    log.info(
+        "Alert published",
+        symbol=symbol,
+        timestamp=timestamp,
+        change_percent=change_percent,
+        trace={**trace, "alerted_ms": now_ms()},
+    )
+    return True
 
-def compute_change_percent(price: Decimal, previous_close: Decimal) -> Decimal:
-    if previous_close == 0:
-        return Decimal("0")
-    return (price - previous_close) / previous_close * Decimal("100")
 
+# ============================================================
+# Scheduled mode (EventBridge)
+# ============================================================
 
-def publish_alert(topic_arn: str, subject: str, message: str) -> None:
-    sns.publish(
-        TopicArn=topic_arn,
-        Subject=subject,
-        Message=message,
+def active_symbols(cfg: Config, since_ms: int) -> List[str]:
+    """
+    Symbols whose latest quote is at or after `since_ms`. The latest-quote
+    table holds one small item per symbol, so the scan is cheap.
+    """
+    table = dynamodb.Table(cfg.latest_table_name)
+    kwargs: Dict[str, Any] = {
+        "ProjectionExpression": "#s, #ts",
+        "ExpressionAttributeNames": {"#s": SYMBOL_KEY, "#ts": TIMESTAMP_ATTRIBUTE},
+    }
+    symbols: List[str] = []
+    while True:
+        response = table.scan(**kwargs)
+        symbols.extend(
+            item[SYMBOL_KEY]
+            for item in response.get("Items", [])
+            if int(item[TIMESTAMP_ATTRIBUTE]) >= since_ms
+        )
+        if not response.get("LastEvaluatedKey"):
+            return symbols
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def is_late_tick(cfg: Config, item: Dict[str, Any], start_ms: int) -> bool:
+    """
+    A tick from before the window that was written after the previous pass
+    ran (at start_ms + settle): no window has evaluated it yet.
+    """
+    return (
+        item_epoch_ms(item) < start_ms
+        and PROCESSED_MS in item
+        and int(item[PROCESSED_MS]) >= start_ms + cfg.settle_ms
     )
 
 
+def evaluate_window(cfg: Config, log: Any, start_ms: int, end_ms: int) -> Tuple[int, int, int, int]:
+    """
+    Evaluates every tick with start_ms <= timestamp < end_ms for all
+    symbols, queried concurrently, plus the late ticks of the trailing
+    late_tick_lookback_ms (see is_late_tick). At most one alert per symbol
+    and window: the tick with the largest move.
+    Returns (symbols, ticks, alerts, late ticks).
+    """
+    lookback_ms: int = start_ms - cfg.late_tick_lookback_ms
+    symbols: List[str] = active_symbols(cfg, lookback_ms)
+    if not symbols:
+        return 0, 0, 0, 0
+
+    start: datetime = datetime.fromtimestamp(lookback_ms / 1000, tz=timezone.utc)
+    end: datetime = datetime.fromtimestamp((end_ms - 1) / 1000, tz=timezone.utc)
+    with ThreadPoolExecutor(max_workers=min(MAX_QUERY_WORKERS, len(symbols))) as pool:
+        windows: List[List[Dict[str, Any]]] = list(
+            pool.map(lambda symbol: get_ticks(cfg, symbol, start, end), symbols)
+        )
+
+    ticks: int = 0
+    alerts: int = 0
+    late: int = 0
+    for symbol, items in zip(symbols, windows):
+        late_items: List[Dict[str, Any]] = [item for item in items if is_late_tick(cfg, item, start_ms)]
+        items = [item for item in items if start_ms <= item_epoch_ms(item) < end_ms] + late_items
+        late += len(late_items)
+        ticks += len(items)
+        if not items:
+            continue
+        item: Dict[str, Any] = max(
+            items, key=lambda i: abs(compute_change_percent(Decimal(i["price"]), Decimal(i["previous_close"])))
+        )
+        epoch_ms: int = item_epoch_ms(item)
+        alerts += evaluate_tick(
+            cfg,
+            log,
+            symbol,
+            format_iso(epoch_ms),
+            Decimal(item["price"]),
+            Decimal(item["previous_close"]),
+            trace_fields({"timestamp_ms": epoch_ms, **item}),
+        )
+    if late:
+        log.warning(
+            "Late ticks evaluated after their window",
+            late_ticks=late,
+            window_start_ms=start_ms,
+            settle_ms=cfg.settle_ms,
+        )
+    return len(symbols), ticks, alerts, late
+
+
+def scheduled_handler(context: Any) -> Dict[str, Any]:
+    """
+    Trigger: EventBridge schedule (every minute, or every N minutes)
+    Action: evaluates the ticks of every symbol since the previous pass.
+
+    With EVALUATION_INTERVAL_SECONDS below 60 (EventBridge's finest rate),
+    one invocation runs 60 / interval passes, one every `interval` seconds.
+    Each pass claims its window on the watermark in the checkpoint table:
+    windows follow each other without gaps or overlaps across cold starts
+    and concurrent invocations. A window closes SETTLE_SECONDS after its
+    end; ticks written later still get evaluated by the next pass within
+    LATE_TICK_LOOKBACK_SECONDS, and are counted as LateTicks.
+    """
+    log = get_logger("trend_alert", context)
+    cfg: Config = load_config()
+    if not cfg.latest_table_name or not cfg.checkpoint_table_name:
+        raise KeyError("LATEST_TABLE_NAME and CHECKPOINT_TABLE are required in scheduled mode")
+    watermark = WindowWatermark(dynamodb.Table(cfg.checkpoint_table_name), WATERMARK_ID)
+
+    interval: int = cfg.evaluation_interval_seconds
+    passes: int = 60 // interval if interval < 60 else 1
+    started: float = time.monotonic()
+    totals: List[int] = [0, 0, 0, 0]
+    completed: int = 0
+    for n in range(passes):
+        if n:
+            time.sleep(max(0.0, started + n * interval - time.monotonic()))
+            if context is not None and context.get_remaining_time_in_millis() < MIN_REMAINING_MS:
+                break
+        end_ms: int = now_ms() - cfg.settle_ms
+        stored: Optional[int] = watermark.load()
+        # First run ever: one interval back
+        start_ms: int = end_ms - interval * 1000 if stored is None else stored
+        if start_ms < end_ms - MAX_CATCHUP_MS:
+            log.warning(
+                "Watermark too old, skipping ahead",
+                watermark_ms=start_ms,
+                skipped_ms=end_ms - MAX_CATCHUP_MS - start_ms,
+            )
+            start_ms = end_ms - MAX_CATCHUP_MS
+        if start_ms >= end_ms or not watermark.claim(stored, end_ms):
+            # Another invocation already evaluated up to here
+            continue
+        try:
+            with metrics.timer("EvaluationPassLatency"):
+                result: Tuple[int, int, int, int] = evaluate_window(cfg, log, start_ms, end_ms)
+        except Exception:
+            watermark.release(stored, end_ms)
+            raise
+        totals = [a + b for a, b in zip(totals, result)]
+        completed += 1
+
+    symbols, ticks, alerts, late = totals
+    metrics.count("SymbolsScanned", symbols)
+    metrics.count("TicksEvaluated", ticks)
+    metrics.count("LateTicks", late)
+    metrics.count("AlertsSent", alerts)
+    metrics.flush()
+
+    log.info("Scheduled evaluation", passes=completed, symbols=symbols, ticks=ticks, late_ticks=late,
+             alerts_sent=alerts)
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"symbols": symbols, "ticks_evaluated": ticks, "late_ticks": late,
+                            "alerts_sent": alerts}),
+    }
+
+
+# ============================================================
+# Entry point
+# ============================================================
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    print("In lambda handler")
     """
-    Trigger: DynamoDB Stream (NEW_IMAGE)
+    Trigger: DynamoDB Stream (NEW_IMAGE), or an EventBridge schedule in
+    scheduled mode (no "Records" in the event)
     Action: Send SNS alert on anomalous movement.
     """
+    if "Records" not in event:
+        return scheduled_handler(context)
+
+    log = get_logger("trend_alert", context)
     cfg: Config = load_config()
 
     records: List[Dict[str, Any]] = event.get("Records", [])
     table = dynamodb.Table(cfg.table_name)
 
+    metrics.count("RecordsPerBatch", len(records))
+    created: List[float] = [
+        rec["dynamodb"]["ApproximateCreationDateTime"]
+        for rec in records
+        if "ApproximateCreationDateTime" in rec.get("dynamodb", {})
+    ]
+    if created:
+        # Age of the oldest stream record: how far behind the table we are
+        metrics.put("IteratorAge", max(0.0, time.time() - min(created)) * 1000)
+
     alerts_sent: int = 0
     for rec in records:
-        print(f"\t[LAMBDA HANDLER]rec: {rec}")
-        new_image = extract_new_image(rec)
+        # The event filter already drops these; kept for manual/legacy mappings
+        if is_ttl_removal(rec):
+            continue
+        new_image = stream_new_image(rec)
         if new_image is None:
             continue
 
         # Expect these fields from your processed DynamoDB item
-        symbol: str = parse_ddb_string(new_image["symbol"])
-        timestamp: str = parse_ddb_string(new_image["timestamp"])
-
-        price: Decimal = parse_ddb_number(new_image["price"])
-        prev_close: Decimal = parse_ddb_number(new_image["previous_close"])
-
-        change_percent: Decimal = compute_change_percent(price, prev_close)
-
-        # Simple anomaly rule (same spirit as before)
-        threshold: Decimal = Decimal("0.1050")
-        print("\t[LAMBDA HANDLER] In lambda handler: threshold =", threshold)
-        print("\t[LAMBDA HANDLER] In lambda handler: change_percent =", change_percent)
-        if abs(change_percent) > threshold:
-            subject: str = f"Stock Alert: {symbol}"
-            message: str = (
-                f"ALERTA: movimiento anómalo detectado\n"
-                f"symbol: {symbol}\n"
-                f"timestamp: {timestamp}\n"
-                f"price: {price}\n"
-                f"previous_close: {prev_close}\n"
-                f"change_percent: {change_percent:.2f}%\n"
-            )
-            publish_alert(cfg.sns_topic_arn, subject, message)
+        symbol: str = image_string(new_image["symbol"])
+        timestamp: str = parse_image_timestamp(new_image)
+
+        price: Decimal = image_number(new_image["price"])
+        prev_close: Decimal = image_number(new_image["previous_close"])
+        trace: Dict[str, Any] = parse_image_trace(new_image)
+
+        if evaluate_tick(cfg, log, symbol, timestamp, price, prev_close, trace):
             alerts_sent += 1
 
+    metrics.count("AlertsSent", alerts_sent)
+    metrics.flush()
+
+    log.info("Batch processed", records=len(records), alerts_sent=alerts_sent)
+
     return {
         "statusCode": 200,
         "body": json.dumps(
@@ -1,4 +1,6 @@
 import json
+import os
+import random
 import boto3
 import base64
 from decimal import Decimal
@@ -15,16 +17,25 @@ S3_BUCKET = "stock-market-data-bucket-1996" # esto puede variar
 # Table reference
 table = dynamodb.Table(DYNAMO_TABLE)
 
+# Structured logging: one JSON line per event. Per-record detail is only
+# written for a LOG_SAMPLE_RATE fraction of records (same format as
+# infra/pulumi/project/lambdas/pipeline_core/logs.py; this file is pasted
+# into the console on its own, so it cannot import that package).
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+
+
+def log(level, message, **fields):
+    print(json.dumps({"level": level, "message": message, **fields}, default=str))
+
+
 def lambda_handler(event, context):
-    print("in lambda_handler function")
-    idx: int = 0
+    stored = 0
+    failed = 0
     for record in event['Records']:
-        print(f"print record ${idx}-  record call ${record}")
         try:
             # Decode base64 Kinesis data
             raw_data = base64.b64decode(record["kinesis"]["data"]).decode("utf-8")
             payload = json.loads(raw_data)
-            print(f"Processing record: {payload}")
 
             # Store raw data in S3
             try:
@@ -35,9 +46,8 @@ def lambda_handler(event, context):
                     Body=json.dumps(payload),
                     ContentType='application/json'
                 )
-                print(f"Raw data saved to S3: {s3_key}")
             except Exception as s3_error:
-                print(f"Failed to save raw data to S3: {s3_error}")
+                log("ERROR", "Failed to save raw data to S3", key=s3_key, error=str(s3_error))
 
             # Compute stock metrics
             price_change = round(payload["price"] - payload["previous_close"], 2)
@@ -63,9 +73,13 @@ def lambda_handler(event, context):
 
             # Store in DynamoDB
             table.put_item(Item=processed_data)
-            print(f"Stored in DynamoDB: {processed_data}")
+            stored += 1
+            if random.random() < LOG_SAMPLE_RATE:
+                log("INFO", "Stored in DynamoDB", item=processed_data, sampled=True)
 
         except Exception as e:
-            print(f"Error processing record: {e}")
+            failed += 1
+            log("ERROR", "Error processing record", error=str(e))
 
+    log("INFO", "Batch processed", records=len(event['Records']), stored=stored, failed=failed)
     return {"statusCode": 200, "body": "Processing Complete"}
\ No newline at end of file
@@ -1,73 +1,105 @@
 import boto3
 import json
-import decimal
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-# AWS Clients
-dynamodb = boto3.resource("dynamodb")
-sns = boto3.client("sns")
+import numpy as np
+from botocore.config import Config
+
+# Configuration (Lambda environment variables)
+TABLE_NAME = os.environ.get("TABLE_NAME", "stock-market-data")
+SNS_TOPIC_ARN = os.environ.get("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:628203515321:Stock_Trend_Alerts")
+# Comma-separated symbols to scan, e.g. "AAPL,MSFT,GOOG"
+WATCHLIST = [s.strip().upper() for s in os.environ.get("WATCHLIST", "AAPL").split(",") if s.strip()]
+LOOKBACK_MINUTES = int(os.environ.get("LOOKBACK_MINUTES", "5"))
+# Concurrent DynamoDB queries (also the size of the client's connection pool)
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "16"))
 
-# DynamoDB Table Name and SNS ARN
-TABLE_NAME = "stock-market-data"
-SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:628203515321:Stock_Trend_Alerts"
+SHORT_PERIOD = 5
+LONG_PERIOD = 20
+# SMA-20 now and one tick earlier
+WINDOW = LONG_PERIOD + 1
 
-def get_recent_stock_data(symbol, minutes=5):
-    """ Fetch stock data for the last 'minutes' from DynamoDB using Query instead of Scan """
-    table = dynamodb.Table(TABLE_NAME)
-    now = datetime.utcnow()
-    past_time = now - timedelta(minutes=minutes)
+# AWS Clients: one low-level DynamoDB client shared by all query threads
+# (clients are thread-safe, Table resources are not)
+dynamodb = boto3.client("dynamodb", config=Config(max_pool_connections=MAX_WORKERS))
+sns = boto3.client("sns")
+
+def get_recent_prices(symbol, minutes=LOOKBACK_MINUTES):
+    """ Last WINDOW prices of 'symbol' within the last 'minutes', oldest first """
+    past_time = datetime.utcnow() - timedelta(minutes=minutes)
 
     try:
-        response = table.query(
+        # Newest first with a Limit: reads only the ticks the crossover needs
+        response = dynamodb.query(
+            TableName=TABLE_NAME,
             KeyConditionExpression="symbol = :symbol AND #ts >= :time",
-            ExpressionAttributeNames={"#ts": "timestamp"},
+            ExpressionAttributeNames={"#ts": "timestamp", "#price": "price"},
             ExpressionAttributeValues={
-                ":symbol": symbol,
-                ":time": past_time.strftime("%Y-%m-%d %H:%M:%S"),
+                ":symbol": {"S": symbol},
+                # Must match the producer format, otherwise the lexicographic range is wrong
+                ":time": {"S": past_time.strftime("%Y-%m-%dT%H:%M:%SZ")},
             },
-            ScanIndexForward=True  # Get latest records first
+            ProjectionExpression="#price",
+            ScanIndexForward=False,
+            Limit=WINDOW,
         )
-        return sorted(response.get("Items", []), key=lambda x: x["timestamp"])
-    
+        return [float(item["price"]["N"]) for item in reversed(response.get("Items", []))]
+
     except Exception as e:
-        print(f"Error fetching stock data: {e}")
+        print(f"Error fetching stock data for {symbol}: {e}")
         return []
 
-def calculate_moving_average(data, period):
-    """ Calculate moving average for given period, avoid None issues """
-    if len(data) < period:
-        return decimal.Decimal("0") 
-    return sum(decimal.Decimal(d["price"]) for d in data[-period:]) / period
+def fetch_watchlist(symbols):
+    """ Query every symbol concurrently; keep those with a full window """
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(symbols))) as pool:
+        prices = list(pool.map(get_recent_prices, symbols))
+    return {symbol: p for symbol, p in zip(symbols, prices) if len(p) == WINDOW}
 
-def lambda_handler(event, context):
-    """ Main Lambda function """
-    symbols = ["AAPL"]  # Add more stocks if needed
+def detect_crossovers(prices_by_symbol):
+    """
+    SMA-5 / SMA-20 crossovers for all symbols in one vectorized pass.
+    Returns {symbol: "up" | "down"} for the symbols whose trend changed.
+    """
+    if not prices_by_symbol:
+        return {}
+    symbols = list(prices_by_symbol)
+    prices = np.array([prices_by_symbol[s] for s in symbols])  # shape (symbols, WINDOW)
+
+    sma_5 = prices[:, -SHORT_PERIOD:].mean(axis=1)
+    sma_20 = prices[:, -LONG_PERIOD:].mean(axis=1)
+    # Previous moving averages (without the newest tick)
+    sma_5_prev = prices[:, -SHORT_PERIOD - 1:-1].mean(axis=1)
+    sma_20_prev = prices[:, :-1].mean(axis=1)
 
-    for symbol in symbols:
-        stock_data = get_recent_stock_data(symbol)
-        if len(stock_data) < 20:  # Ensure we have enough data
-            continue
+    up = (sma_5_prev < sma_20_prev) & (sma_5 > sma_20)
+    down = (sma_5_prev > sma_20_prev) & (sma_5 < sma_20)
 
-        # Compute Moving Averages
-        sma_5 = calculate_moving_average(stock_data, 5)
-        sma_20 = calculate_moving_average(stock_data, 20)
-        # Get previous moving averages
-        sma_5_prev = calculate_moving_average(stock_data[:-1], 5)
-        sma_20_prev = calculate_moving_average(stock_data[:-1], 20)
+    trends = {}
+    for i in np.flatnonzero(up | down):
+        trends[symbols[i]] = "up" if up[i] else "down"
+    return trends
 
-        if None not in (sma_5, sma_20, sma_5_prev, sma_20_prev):
-            message = None
+def lambda_handler(event, context):
+    """ Main Lambda function """
+    trends = detect_crossovers(fetch_watchlist(WATCHLIST))
 
-            # Detect Trend Change
-            if sma_5_prev < sma_20_prev and sma_5 > sma_20:
-                message = f"{symbol} is in an **Uptrend**! Consider a buy opportunity."
-            elif sma_5_prev > sma_20_prev and sma_5 < sma_20:
-                message = f"{symbol} is in a **Downtrend**! Consider selling."
-            # Publish SNS Alert
-            if message:
-                try:
-                    sns.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject=f"Stock Alert: {symbol}")
-                except Exception as e:
-                    print(f"Failed to publish SNS message: {e}")
+    for symbol, trend in trends.items():
+        # Detect Trend Change
+        if trend == "up":
+            message = f"{symbol} is in an **Uptrend**! Consider a buy opportunity."
+        else:
+            message = f"{symbol} is in a **Downtrend**! Consider selling."
+        # Publish SNS Alert
+        try:
+            sns.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject=f"Stock Alert: {symbol}")
+        except Exception as e:
+            print(f"Failed to publish SNS message: {e}")
 
-    return {"statusCode": 200, "body": json.dumps("Trend analysis complete")}
\ No newline at end of file
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"symbols_scanned": len(WATCHLIST), "trend_changes": trends}),
+    }
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from typing import Any, List, Optional
+
+from synthetic_source import SyntheticMarket, SyntheticMarketConfig
+
+# ==============================
+# Servidor WebSocket de cotizaciones (falso)
+# ==============================
+#
+# Implementa el protocolo que espera WebSocketQuoteSource:
+#   cliente -> {"action": "subscribe", "symbols": ["AAPL", ...]}
+#   servidor -> {"type": "quote", "symbol": ..., "price": ..., ...} (uno por tick)
+#
+# Los precios salen de SyntheticMarket (GBM), así se puede probar el
+# backend de streaming sin credenciales de un proveedor real.
+#
+# Uso:
+#   python src/fake_quote_server.py --port 8765 --rate 20
+
+
+def _quote_message(market: SyntheticMarket, symbol: str) -> Optional[str]:
+    tick = market.fetch(symbol)
+    if tick is None:
+        return None
+    return json.dumps({"type": "quote", **tick})
+
+
+def serve_quotes(host: str = "localhost", port: int = 8765, rate_per_symbol: float = 10.0) -> Any:
+    """
+    Crea el servidor (sin arrancarlo). Cada conexión recibe `rate_per_symbol`
+    cotizaciones por segundo de cada símbolo suscrito; símbolos nuevos se
+    agregan al mercado sintético al suscribirse.
+
+    Retorna el objeto de websockets: `serve_forever()` / `shutdown()`.
+    """
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.server import serve
+
+    lock = threading.Lock()
+    markets: dict = {}
+
+    def market_for(symbols: List[str]) -> SyntheticMarket:
+        key = tuple(sorted(symbols))
+        with lock:
+            if key not in markets:
+                markets[key] = SyntheticMarket(SyntheticMarketConfig(symbols=key))
+            return markets[key]
+
+    def handler(connection: Any) -> None:
+        try:
+            request = json.loads(connection.recv(timeout=10))
+        except (TimeoutError, ConnectionClosed, ValueError):
+            return
+        symbols: List[str] = list(request.get("symbols") or [])
+        if request.get("action") != "subscribe" or not symbols:
+            connection.send(json.dumps({"type": "error", "message": "expected subscribe with symbols"}))
+            return
+        connection.send(json.dumps({"type": "subscribed", "symbols": symbols}))
+
+        market = market_for(symbols)
+        interval: float = 1.0 / rate_per_symbol if rate_per_symbol > 0 else 0.0
+        try:
+            while True:
+                for symbol in symbols:
+                    message = _quote_message(market, symbol)
+                    if message is not None:
+                        connection.send(message)
+                if interval:
+                    time.sleep(interval)
+        except ConnectionClosed:
+            return
+
+    return serve(handler, host, port)
+
+
+def start_in_thread(host: str = "localhost", port: int = 8765, rate_per_symbol: float = 10.0) -> Any:
+    """
+    Arranca el servidor en un hilo daemon (para pruebas y el runner local).
+    Detenerlo con server.shutdown().
+    """
+    server = serve_quotes(host, port, rate_per_symbol)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake WebSocket quote feed")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=10.0, help="quotes per second per symbol (0 = unthrottled)")
+    args = parser.parse_args()
+
+    server = serve_quotes(args.host, args.port, args.rate)
+    print(f"=== Fake quote feed on ws://{args.host}:{args.port} ({args.rate}/s per symbol) ===")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,689 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import itertools
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# ==============================
+# Stand-ins en memoria de los servicios AWS del pipeline
+# ==============================
+#
+# Implementan solo la parte de la API de boto3 que usan el productor y las
+# Lambdas (mismos nombres de métodos y argumentos), para poder correr el
+# pipeline completo en un solo proceso:
+#
+#   LocalKinesis   -> put_record / put_records / list_shards + lectura por shard
+#   LocalDynamoDB  -> Table(...).put_item/update_item/get_item/query,
+#                     batch_get_item y un DynamoDB Stream por tabla
+#   LocalS3        -> put_object / get_object / list_objects_v2 / ...
+#   LocalSNS       -> publish
+#
+# Todos son thread-safe (un lock por servicio).
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+MAX_HASH_KEY: int = 2 ** 128 - 1
+
+
+def _ok(**fields: Any) -> Dict[str, Any]:
+    return {**fields, "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+
+class LocalClientError(ClientError):
+    """
+    ClientError real, para que el código que captura botocore (p.ej. un
+    ConditionalCheckFailedException) se comporte igual que contra AWS.
+    """
+
+    def __init__(self, code: str, message: str = "", operation_name: str = "Local") -> None:
+        super().__init__({"Error": {"Code": code, "Message": message}}, operation_name)
+
+
+# ==============================
+# 1) Kinesis
+# ==============================
+
+@dataclass
+class LocalKinesisRecord:
+    shard_id: str
+    sequence_number: str
+    partition_key: str
+    data: bytes
+    arrival_timestamp: float
+
+
+@dataclass
+class LocalShard:
+    shard_id: str
+    starting_hash_key: int
+    ending_hash_key: int
+    records: Deque[LocalKinesisRecord] = field(default_factory=deque)
+    # Instantes de escritura del último segundo (límite de throughput simulado)
+    recent_writes: Deque[float] = field(default_factory=deque)
+
+
+class LocalKinesis:
+    """
+    Stream Kinesis en memoria con la semántica de shards real:
+    - cada shard cubre un rango contiguo del espacio de hash de 128 bits
+    - shard = rango que contiene MD5(PartitionKey) (o ExplicitHashKey)
+    - orden garantizado solo dentro de cada shard
+    - opcional: límite de registros/segundo por shard (1000 en AWS); al
+      superarlo responde ProvisionedThroughputExceededException como Kinesis
+    """
+
+    def __init__(
+        self,
+        stream_name: str = "stock-market-stream",
+        shard_count: int = 4,
+        shard_records_per_second: Optional[int] = None,
+    ) -> None:
+        self.stream_name: str = stream_name
+        self.shard_records_per_second: Optional[int] = shard_records_per_second
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        step: int = (MAX_HASH_KEY + 1) // shard_count
+        self.shards: List[LocalShard] = [
+            LocalShard(
+                shard_id=f"shardId-{index:012d}",
+                starting_hash_key=index * step,
+                ending_hash_key=MAX_HASH_KEY if index == shard_count - 1 else (index + 1) * step - 1,
+            )
+            for index in range(shard_count)
+        ]
+
+    @property
+    def stream_arn(self) -> str:
+        return f"arn:aws:kinesis:local:000000000000:stream/{self.stream_name}"
+
+    def _shard_for(self, partition_key: str, explicit_hash_key: Optional[str]) -> LocalShard:
+        if explicit_hash_key is not None:
+            hash_key: int = int(explicit_hash_key)
+        else:
+            hash_key = int(hashlib.md5(partition_key.encode("utf-8")).hexdigest(), 16)
+        for shard in self.shards:
+            if shard.starting_hash_key <= hash_key <= shard.ending_hash_key:
+                return shard
+        raise LocalClientError("InvalidArgumentException", f"hash key out of range: {hash_key}")
+
+    def _throttled(self, shard: LocalShard, now: float) -> bool:
+        if self.shard_records_per_second is None:
+            return False
+        while shard.recent_writes and now - shard.recent_writes[0] >= 1.0:
+            shard.recent_writes.popleft()
+        if len(shard.recent_writes) >= self.shard_records_per_second:
+            return True
+        shard.recent_writes.append(now)
+        return False
+
+    def _append(self, data: Any, partition_key: str, explicit_hash_key: Optional[str]) -> LocalKinesisRecord:
+        payload: bytes = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        shard = self._shard_for(partition_key, explicit_hash_key)
+        if self._throttled(shard, time.time()):
+            raise LocalClientError(
+                "ProvisionedThroughputExceededException",
+                f"Rate exceeded for shard {shard.shard_id}",
+                "PutRecord",
+            )
+        record = LocalKinesisRecord(
+            shard_id=shard.shard_id,
+            sequence_number=f"{next(self._sequence):056d}",
+            partition_key=partition_key,
+            data=payload,
+            arrival_timestamp=time.time(),
+        )
+        shard.records.append(record)
+        return record
+
+    # --- API boto3 ---
+
+    def put_record(
+        self,
+        StreamName: str,
+        Data: Any,
+        PartitionKey: str,
+        ExplicitHashKey: Optional[str] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            record = self._append(Data, PartitionKey, ExplicitHashKey)
+        return _ok(ShardId=record.shard_id, SequenceNumber=record.sequence_number)
+
+    def put_records(self, StreamName: str, Records: List[Dict[str, Any]], **_: Any) -> Dict[str, Any]:
+        results: List[Dict[str, Any]] = []
+        failed: int = 0
+        with self._lock:
+            for entry in Records:
+                try:
+                    record = self._append(entry["Data"], entry["PartitionKey"], entry.get("ExplicitHashKey"))
+                except LocalClientError as e:
+                    # PutRecords no falla entero: marca cada registro rechazado
+                    failed += 1
+                    results.append({"ErrorCode": e.response["Error"]["Code"],
+                                    "ErrorMessage": e.response["Error"]["Message"]})
+                    continue
+                results.append({"ShardId": record.shard_id, "SequenceNumber": record.sequence_number})
+        return _ok(FailedRecordCount=failed, Records=results)
+
+    def list_shards(self, StreamName: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        return _ok(Shards=[
+            {
+                "ShardId": shard.shard_id,
+                "HashKeyRange": {
+                    "StartingHashKey": str(shard.starting_hash_key),
+                    "EndingHashKey": str(shard.ending_hash_key),
+                },
+                "SequenceNumberRange": {"StartingSequenceNumber": "0"},
+            }
+            for shard in self.shards
+        ])
+
+    # --- Lado consumidor (event source mapping) ---
+
+    def poll(self, shard: LocalShard, batch_size: int) -> List[LocalKinesisRecord]:
+        with self._lock:
+            count: int = min(batch_size, len(shard.records))
+            return [shard.records.popleft() for _ in range(count)]
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(shard.records) for shard in self.shards)
+
+    def to_lambda_event(self, records: List[LocalKinesisRecord]) -> Dict[str, Any]:
+        """
+        Mismo formato de evento que entrega el event source mapping de Kinesis.
+        """
+        return {
+            "Records": [
+                {
+                    "kinesis": {
+                        "kinesisSchemaVersion": "1.0",
+                        "partitionKey": r.partition_key,
+                        "sequenceNumber": r.sequence_number,
+                        "data": base64.b64encode(r.data).decode("ascii"),
+                        "approximateArrivalTimestamp": r.arrival_timestamp,
+                    },
+                    "eventSource": "aws:kinesis",
+                    "eventID": f"{r.shard_id}:{r.sequence_number}",
+                    "eventName": "aws:kinesis:record",
+                    "eventSourceARN": self.stream_arn,
+                    "awsRegion": "local",
+                }
+                for r in records
+            ]
+        }
+
+
+# ==============================
+# 2) DynamoDB (+ Streams)
+# ==============================
+
+_NAME_TOKEN = r"[#\w.]+"
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _resolve_name(token: str, names: Dict[str, str]) -> str:
+    return names.get(token, token)
+
+
+def _evaluate_condition(
+    expression: str,
+    item: Optional[Dict[str, Any]],
+    names: Dict[str, str],
+    values: Dict[str, Any],
+) -> bool:
+    """
+    Evalúa el subconjunto de ConditionExpression que usa el pipeline:
+    attribute_exists / attribute_not_exists / comparaciones, unidos por OR / AND.
+    """
+    current: Dict[str, Any] = item or {}
+
+    def clause(text: str) -> bool:
+        text = text.strip()
+        match = re.fullmatch(rf"attribute_(not_)?exists\(\s*({_NAME_TOKEN})\s*\)", text)
+        if match:
+            exists: bool = _resolve_name(match.group(2), names) in current
+            return not exists if match.group(1) else exists
+        match = re.fullmatch(rf"({_NAME_TOKEN})\s*(<>|<=|>=|=|<|>)\s*(:\w+)", text)
+        if match:
+            name = _resolve_name(match.group(1), names)
+            if name not in current:
+                return False
+            return _COMPARATORS[match.group(2)](current[name], values[match.group(3)])
+        raise ValueError(f"Unsupported condition clause: {text!r}")
+
+    return any(
+        all(clause(part) for part in re.split(r"\s+AND\s+", alternative))
+        for alternative in re.split(r"\s+OR\s+", expression)
+    )
+
+
+@dataclass
+class LocalStreamRecord:
+    event_name: str
+    keys: Dict[str, Any]
+    new_image: Optional[Dict[str, Any]]
+    sequence_number: str
+    created_at: float
+
+
+class LocalTable:
+    """
+    Tabla DynamoDB en memoria con la interfaz de boto3 `Table` (resource).
+    Si `stream_enabled`, cada escritura genera un registro NEW_IMAGE.
+    """
+
+    def __init__(
+        self,
+        service: "LocalDynamoDB",
+        name: str,
+        hash_key: str,
+        range_key: Optional[str] = None,
+        stream_enabled: bool = False,
+    ) -> None:
+        self._service = service
+        self.name: str = name
+        self.table_name: str = name
+        self.hash_key: str = hash_key
+        self.range_key: Optional[str] = range_key
+        self.stream_enabled: bool = stream_enabled
+        self.items: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+        self.stream: Deque[LocalStreamRecord] = deque()
+
+    def _key_of(self, item: Dict[str, Any]) -> Tuple[Any, Any]:
+        return item[self.hash_key], item.get(self.range_key) if self.range_key else None
+
+    def _key_dict(self, key: Tuple[Any, Any]) -> Dict[str, Any]:
+        keys = {self.hash_key: key[0]}
+        if self.range_key:
+            keys[self.range_key] = key[1]
+        return keys
+
+    def _emit(self, event_name: str, key: Tuple[Any, Any], new_image: Optional[Dict[str, Any]]) -> None:
+        if not self.stream_enabled:
+            return
+        self.stream.append(
+            LocalStreamRecord(
+                event_name=event_name,
+                keys=self._key_dict(key),
+                new_image=dict(new_image) if new_image is not None else None,
+                sequence_number=f"{next(self._service.sequence):021d}",
+                created_at=time.time(),
+            )
+        )
+
+    def _check(self, current: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+        expression: Optional[str] = kwargs.get("ConditionExpression")
+        if expression and not _evaluate_condition(
+            expression,
+            current,
+            kwargs.get("ExpressionAttributeNames", {}),
+            kwargs.get("ExpressionAttributeValues", {}),
+        ):
+            raise LocalClientError("ConditionalCheckFailedException", "The conditional request failed")
+
+    # --- API boto3 (resource Table) ---
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        with self._service.lock:
+            key = self._key_of(Item)
+            current = self.items.get(key)
+            self._check(current, kwargs)
+            self.items[key] = dict(Item)
+            self._emit("MODIFY" if current is not None else "INSERT", key, Item)
+        return _ok()
+
+    def get_item(self, Key: Dict[str, Any], **_: Any) -> Dict[str, Any]:
+        with self._service.lock:
+            item = self.items.get(self._key_of(Key))
+        return _ok(Item=dict(item)) if item is not None else _ok()
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        with self._service.lock:
+            key = self._key_of(Key)
+            current = self.items.get(key)
+            self._check(current, kwargs)
+            if current is not None:
+                del self.items[key]
+                self._emit("REMOVE", key, None)
+        return _ok()
+
+    def update_item(
+        self,
+        Key: Dict[str, Any],
+        UpdateExpression: str,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Soporta UpdateExpression de la forma "SET a = :a, #b = :b".
+        """
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        if not UpdateExpression.strip().upper().startswith("SET "):
+            raise ValueError(f"Unsupported UpdateExpression: {UpdateExpression!r}")
+
+        with self._service.lock:
+            key = self._key_of(Key)
+            current = self.items.get(key)
+            self._check(
+                current,
+                {**kwargs, "ExpressionAttributeNames": names, "ExpressionAttributeValues": values},
+            )
+            updated: Dict[str, Any] = dict(current) if current else dict(Key)
+            for assignment in UpdateExpression.strip()[4:].split(","):
+                target, source = (part.strip() for part in assignment.split("="))
+                updated[_resolve_name(target, names)] = values[source]
+            self.items[key] = updated
+            self._emit("MODIFY" if current is not None else "INSERT", key, updated)
+        return _ok()
+
+    def query_items(
+        self,
+        hash_value: Any,
+        range_condition: Optional[Tuple[str, Any, Any]] = None,
+        forward: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._service.lock:
+            matches = [dict(item) for (h, _), item in self.items.items() if h == hash_value]
+        if self.range_key:
+            if range_condition is not None:
+                op, low, high = range_condition
+                if op == "BETWEEN":
+                    matches = [i for i in matches if low <= i[self.range_key] <= high]
+                else:
+                    matches = [i for i in matches if _COMPARATORS[op](i[self.range_key], low)]
+            matches.sort(key=lambda i: i[self.range_key], reverse=not forward)
+        return matches[:limit] if limit else matches
+
+    def scan(self, **_: Any) -> Dict[str, Any]:
+        with self._service.lock:
+            items = [dict(item) for item in self.items.values()]
+        return _ok(Items=items, Count=len(items))
+
+    # --- Lado consumidor (DynamoDB Streams) ---
+
+    def poll_stream(self, batch_size: int) -> List[LocalStreamRecord]:
+        with self._service.lock:
+            count: int = min(batch_size, len(self.stream))
+            return [self.stream.popleft() for _ in range(count)]
+
+    def to_lambda_event(self, records: List[LocalStreamRecord]) -> Dict[str, Any]:
+        """
+        Mismo formato que entrega el event source mapping de DynamoDB Streams.
+        """
+        events: List[Dict[str, Any]] = []
+        for r in records:
+            ddb: Dict[str, Any] = {
+                "ApproximateCreationDateTime": r.created_at,
+                "Keys": {k: _serializer.serialize(v) for k, v in r.keys.items()},
+                "SequenceNumber": r.sequence_number,
+                "StreamViewType": "NEW_IMAGE",
+            }
+            if r.new_image is not None:
+                ddb["NewImage"] = {k: _serializer.serialize(_for_serializer(v)) for k, v in r.new_image.items()}
+            events.append(
+                {
+                    "eventID": r.sequence_number,
+                    "eventName": r.event_name,
+                    "eventSource": "aws:dynamodb",
+                    "awsRegion": "local",
+                    "dynamodb": ddb,
+                }
+            )
+        return {"Records": events}
+
+
+def _for_serializer(value: Any) -> Any:
+    # TypeSerializer rechaza float (igual que DynamoDB real); las Lambdas ya
+    # convierten a Decimal, esto solo protege al runner de datos de prueba.
+    return Decimal(str(value)) if isinstance(value, float) else value
+
+
+class LocalDynamoDB:
+    """
+    Equivalente a boto3.resource("dynamodb"): `Table(name)` y `batch_get_item`.
+    `client()` devuelve la vista de bajo nivel (valores tipados {"S": ...}).
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.sequence = itertools.count(1)
+        self.tables: Dict[str, LocalTable] = {}
+
+    def create_table(
+        self,
+        name: str,
+        hash_key: str,
+        range_key: Optional[str] = None,
+        stream_enabled: bool = False,
+    ) -> LocalTable:
+        table = LocalTable(self, name, hash_key, range_key, stream_enabled)
+        self.tables[name] = table
+        return table
+
+    def Table(self, name: str) -> LocalTable:  # noqa: N802 (nombre de la API boto3)
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise LocalClientError("ResourceNotFoundException", f"Table not found: {name}") from None
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **_: Any) -> Dict[str, Any]:
+        responses: Dict[str, List[Dict[str, Any]]] = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            found = [table.get_item(Key=key).get("Item") for key in request["Keys"]]
+            responses[table_name] = [item for item in found if item is not None]
+        return _ok(Responses=responses, UnprocessedKeys={})
+
+    def client(self) -> "LocalDynamoDBClient":
+        return LocalDynamoDBClient(self)
+
+
+class LocalDynamoDBClient:
+    """
+    Equivalente a boto3.client("dynamodb") para `query` (usado por
+    pipeline_core.keys) y `batch_get_item`, con valores tipados.
+    """
+
+    _KEY_CONDITION = re.compile(
+        rf"^\s*({_NAME_TOKEN})\s*=\s*(:\w+)"
+        rf"(?:\s+AND\s+({_NAME_TOKEN})\s+(?:BETWEEN\s+(:\w+)\s+AND\s+(:\w+)|(<=|>=|=|<|>)\s*(:\w+)))?\s*$",
+        re.IGNORECASE,
+    )
+
+    def __init__(self, service: LocalDynamoDB) -> None:
+        self._service = service
+
+    def query(
+        self,
+        TableName: str,
+        KeyConditionExpression: str,
+        ExpressionAttributeValues: Dict[str, Dict[str, Any]],
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ScanIndexForward: bool = True,
+        Limit: Optional[int] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        match = self._KEY_CONDITION.match(KeyConditionExpression)
+        if not match:
+            raise ValueError(f"Unsupported KeyConditionExpression: {KeyConditionExpression!r}")
+        values = {k: _deserializer.deserialize(v) for k, v in ExpressionAttributeValues.items()}
+
+        range_condition: Optional[Tuple[str, Any, Any]] = None
+        if match.group(4):
+            range_condition = ("BETWEEN", values[match.group(4)], values[match.group(5)])
+        elif match.group(6):
+            range_condition = (match.group(6), values[match.group(7)], None)
+
+        items = self._service.Table(TableName).query_items(
+            values[match.group(2)], range_condition, ScanIndexForward, Limit
+        )
+        typed = [{k: _serializer.serialize(_for_serializer(v)) for k, v in i.items()} for i in items]
+        return _ok(Items=typed, Count=len(typed))
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **_: Any) -> Dict[str, Any]:
+        plain = {
+            name: {"Keys": [{k: _deserializer.deserialize(v) for k, v in key.items()} for key in req["Keys"]]}
+            for name, req in RequestItems.items()
+        }
+        response = self._service.batch_get_item(RequestItems=plain)
+        typed = {
+            name: [{k: _serializer.serialize(_for_serializer(v)) for k, v in i.items()} for i in items]
+            for name, items in response["Responses"].items()
+        }
+        return _ok(Responses=typed, UnprocessedKeys={})
+
+
+# ==============================
+# 3) S3
+# ==============================
+
+class LocalS3:
+    """
+    Equivalente a boto3.client("s3") para objetos completos (sin multipart).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+
+    def _bucket(self, name: str) -> Dict[str, bytes]:
+        return self.buckets.setdefault(name, {})
+
+    def put_object(self, Bucket: str, Key: str, Body: Any = b"", **_: Any) -> Dict[str, Any]:
+        data: bytes = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        with self._lock:
+            self._bucket(Bucket)[Key] = data
+        return _ok(ETag=f'"{hashlib.md5(data).hexdigest()}"')
+
+    def get_object(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            data = self._bucket(Bucket).get(Key)
+        if data is None:
+            raise LocalClientError("NoSuchKey", Key)
+        return _ok(Body=_Body(data), ContentLength=len(data))
+
+    def head_object(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            data = self._bucket(Bucket).get(Key)
+        if data is None:
+            raise LocalClientError("404", Key)
+        return _ok(ContentLength=len(data))
+
+    def delete_object(self, Bucket: str, Key: str, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            self._bucket(Bucket).pop(Key, None)
+        return _ok()
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any], **_: Any) -> Dict[str, Any]:
+        keys: List[str] = [obj["Key"] for obj in Delete["Objects"]]
+        if len(keys) > 1000:
+            raise LocalClientError("MalformedXML", "At most 1000 keys per DeleteObjects")
+        with self._lock:
+            bucket = self._bucket(Bucket)
+            for key in keys:
+                bucket.pop(key, None)
+        return _ok(Deleted=[{"Key": key} for key in keys], Errors=[])
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: Dict[str, str], **_: Any) -> Dict[str, Any]:
+        source = self.get_object(Bucket=CopySource["Bucket"], Key=CopySource["Key"])["Body"].read()
+        return self.put_object(Bucket=Bucket, Key=Key, Body=source)
+
+    def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        ContinuationToken: Optional[str] = None,
+        MaxKeys: int = 1000,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            keys = sorted(k for k in self._bucket(Bucket) if k.startswith(Prefix))
+            sizes = {k: len(self._bucket(Bucket)[k]) for k in keys}
+        start: int = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = _ok(
+            Contents=[{"Key": k, "Size": sizes[k]} for k in page],
+            KeyCount=len(page),
+            IsTruncated=start + MaxKeys < len(keys),
+        )
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def get_paginator(self, operation_name: str) -> "_ListObjectsPaginator":
+        if operation_name != "list_objects_v2":
+            raise ValueError(f"Unsupported paginator: {operation_name}")
+        return _ListObjectsPaginator(self)
+
+
+class _ListObjectsPaginator:
+    """
+    Imita el paginator de list_objects_v2: `paginate()` recorre las páginas.
+    """
+
+    def __init__(self, s3: LocalS3) -> None:
+        self._s3 = s3
+
+    def paginate(self, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        token: Optional[str] = None
+        while True:
+            page = self._s3.list_objects_v2(**kwargs, **({"ContinuationToken": token} if token else {}))
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
+
+
+class _Body:
+    """
+    Imita StreamingBody: solo `read()`.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+
+    def read(self, *_: Any) -> bytes:
+        return self._data
+
+
+# ==============================
+# 4) SNS
+# ==============================
+
+class LocalSNS:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.messages: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+
+    def publish(self, TopicArn: str, Message: str, Subject: str = "", **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            message_id: str = f"local-{next(self._ids)}"
+            self.messages.append(
+                {"TopicArn": TopicArn, "Subject": Subject, "Message": Message,
+                 "MessageId": message_id, "published_at": time.time()}
+            )
+        return _ok(MessageId=message_id)
+
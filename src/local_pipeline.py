@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Dict, List
+
+from local_aws import LocalDynamoDB, LocalKinesis, LocalS3, LocalSNS
+from stream_stock_data_refactoring import AppConfig, send_to_kinesis_loop
+from synthetic_source import SyntheticMarket, SyntheticMarketConfig
+
+# ==============================
+# Runner local del pipeline completo
+# ==============================
+#
+#   productor -> Kinesis -> processor Lambda -> DynamoDB (+ Stream)
+#             -> trend Lambda -> SNS
+#
+# Todo corre en un solo proceso: los handlers reales de
+# infra/pulumi/project/lambdas se importan tal cual y sus clientes boto3
+# se reemplazan por los stand-ins de local_aws.py. Sirve para pruebas de
+# carga en la laptop y para medir la latencia extremo a extremo.
+#
+# Uso:
+#   python src/local_pipeline.py --symbols AAPL MSFT GOOG --events 2000 --shards 4
+
+LAMBDAS_DIR: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"
+)
+
+TICK_TABLE: str = "stock-market-data-v2"
+LATEST_TABLE: str = "stock-market-latest"
+CHECKPOINT_TABLE: str = "stock-market-processor-checkpoints"
+RAW_BUCKET: str = "local-raw-data"
+SNS_TOPIC_ARN: str = "arn:aws:sns:local:000000000000:Stock_Trend_Alerts"
+
+
+# ==============================
+# 1) Configuración
+# ==============================
+
+@dataclass(frozen=True)
+class LocalPipelineConfig:
+    """
+    Parámetros de la corrida local.
+    Los batch sizes imitan los event source mappings de Pulumi (batch_size=2).
+    """
+    symbols: List[str] = field(default_factory=lambda: ["AAPL"])
+    events_per_symbol: int = 100
+    shard_count: int = 4
+    kinesis_batch_size: int = 2
+    stream_batch_size: int = 2
+    producer_delay_seconds: float = 0.0
+    key_scheme: str = "symbol"
+    write_shards: int = 1
+    seed: int = 42
+
+
+# ==============================
+# 2) Carga de las Lambdas con stand-ins
+# ==============================
+
+def load_lambda_module(module_name: str, relative_path: str, env: Dict[str, str]) -> ModuleType:
+    """
+    Importa un handler desde su archivo, con pipeline_core en el path y
+    las variables de entorno que le daría Pulumi.
+    """
+    os.environ.update(env)
+    if LAMBDAS_DIR not in sys.path:
+        sys.path.insert(0, LAMBDAS_DIR)
+
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(LAMBDAS_DIR, relative_path))
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load {relative_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LocalPipeline:
+    """
+    Conecta productor, stand-ins y handlers. `run()` lanza un hilo productor
+    por símbolo y bombea Kinesis y el DynamoDB Stream en el hilo principal
+    (un batch por shard por vuelta, como hace el event source mapping).
+    """
+
+    def __init__(self, config: LocalPipelineConfig) -> None:
+        self.config = config
+        self.kinesis = LocalKinesis(shard_count=config.shard_count)
+        self.dynamodb = LocalDynamoDB()
+        self.s3 = LocalS3()
+        self.sns = LocalSNS()
+
+        hash_key: str = "pk" if config.key_scheme == "sharded" else "symbol"
+        self.tick_table = self.dynamodb.create_table(TICK_TABLE, hash_key, "ts", stream_enabled=True)
+        self.dynamodb.create_table(LATEST_TABLE, "symbol")
+        self.dynamodb.create_table(CHECKPOINT_TABLE, "checkpoint_id")
+
+        common_env: Dict[str, str] = {
+            "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+            "KEY_SCHEME": config.key_scheme,
+            "WRITE_SHARDS": str(config.write_shards),
+            "SORT_KEY_FORMAT": "epoch_ms",
+        }
+        self.processor = load_lambda_module(
+            "local_kinesis_processor",
+            "kinesis_processor/handler.py",
+            {**common_env, "DYNAMO_TABLE": TICK_TABLE, "RAW_BUCKET": RAW_BUCKET,
+             "LATEST_TABLE": LATEST_TABLE, "CHECKPOINT_TABLE": CHECKPOINT_TABLE, "HOT_WINDOW_HOURS": "0"},
+        )
+        self.processor.s3 = self.s3
+        self.processor.dynamodb = self.dynamodb
+        self.processor.table = self.dynamodb.Table(TICK_TABLE)
+        self.processor.latest_table = self.dynamodb.Table(LATEST_TABLE)
+        self.processor.checkpoints = self.processor.SequenceCheckpoints(self.dynamodb.Table(CHECKPOINT_TABLE))
+
+        self.trend = load_lambda_module(
+            "local_trend_alert",
+            "trend_alert/app.py",
+            {**common_env, "TABLE_NAME": TICK_TABLE, "SNS_TOPIC_ARN": SNS_TOPIC_ARN,
+             "LATEST_TABLE_NAME": LATEST_TABLE, "CHECKPOINT_TABLE": CHECKPOINT_TABLE},
+        )
+        self.trend.dynamodb = self.dynamodb
+        self.trend.dynamodb_client = self.dynamodb.client()
+        self.trend.sns = self.sns
+
+        # Latencias por etapa, en milisegundos
+        self.latencies: Dict[str, List[float]] = {
+            "producer_to_kinesis": [], "kinesis_to_processed": [],
+            "stream_to_trend": [], "end_to_end": [],
+        }
+        self.processor_invocations: int = 0
+        self.trend_invocations: int = 0
+        # Contadores de send_source_to_kinesis por productor, y escrituras
+        # que pisaron un ítem existente (eventos MODIFY del stream)
+        self.producer_stats: List[Dict[str, int]] = []
+        self.overwritten: int = 0
+
+    # --- Event source mappings ---
+
+    def _pump_kinesis(self) -> int:
+        handled: int = 0
+        for shard in self.kinesis.shards:
+            records = self.kinesis.poll(shard, self.config.kinesis_batch_size)
+            if not records:
+                continue
+            self.processor.lambda_handler(self.kinesis.to_lambda_event(records), None)
+            self.processor_invocations += 1
+            done: float = time.time()
+            for record in records:
+                produced_ms: int = json.loads(record.data)["timestamp_ms"]
+                self.latencies["producer_to_kinesis"].append(record.arrival_timestamp * 1000 - produced_ms)
+                self.latencies["kinesis_to_processed"].append((done - record.arrival_timestamp) * 1000)
+            handled += len(records)
+        return handled
+
+    def _pump_stream(self) -> int:
+        records = self.tick_table.poll_stream(self.config.stream_batch_size)
+        self.overwritten += sum(1 for r in records if r.event_name == "MODIFY")
+        # Mismo filtro que el event source mapping de Pulumi
+        records = [
+            r for r in records
+            if r.event_name in ("INSERT", "MODIFY") and "backfilled" not in r.new_image
+        ]
+        if not records:
+            return 0
+        self.trend.lambda_handler(self.tick_table.to_lambda_event(records), None)
+        self.trend_invocations += 1
+        done: float = time.time()
+        for record in records:
+            self.latencies["stream_to_trend"].append((done - record.created_at) * 1000)
+            self.latencies["end_to_end"].append(done * 1000 - int(record.new_image["ts"]))
+        return len(records)
+
+    # --- Ejecución ---
+
+    def run(self, quiet: bool = True) -> Dict[str, Any]:
+        # Fuente offline en lugar de yfinance: GBM por símbolo
+        market = SyntheticMarket(
+            SyntheticMarketConfig(symbols=tuple(self.config.symbols), seed=self.config.seed)
+        )
+        producers: List[threading.Thread] = []
+        for symbol in self.config.symbols:
+            producer_config = AppConfig(
+                region_name="local",
+                stream_name=self.kinesis.stream_name,
+                stock_symbol=symbol,
+                delay_seconds=self.config.producer_delay_seconds,  # type: ignore[arg-type]
+            )
+            producers.append(
+                threading.Thread(
+                    target=lambda **kwargs: self.producer_stats.append(send_to_kinesis_loop(**kwargs)),
+                    kwargs={
+                        "config": producer_config,
+                        "kinesis_client": self.kinesis,
+                        "fetch_stock_data": market.fetch,
+                        "max_events": self.config.events_per_symbol,
+                    },
+                    daemon=True,
+                )
+            )
+
+        started: float = time.time()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+            for thread in producers:
+                thread.start()
+            while True:
+                moved: int = self._pump_kinesis() + self._pump_stream()
+                producing: bool = any(thread.is_alive() for thread in producers)
+                if not moved and not producing and not self.kinesis.pending() and not self.tick_table.stream:
+                    break
+                if not moved:
+                    time.sleep(0.001)
+        elapsed: float = time.time() - started
+
+        total_events: int = len(self.config.symbols) * self.config.events_per_symbol
+        produced: int = sum(stats["sent"] for stats in self.producer_stats)
+        stored: int = len(self.tick_table.items)
+        # Un tick producido que no está en la tabla se perdió (o fue pisado)
+        if stored < produced:
+            print(
+                f"WARNING: {produced - stored} of {produced} produced ticks are not in the table "
+                f"({self.overwritten} overwritten)",
+                file=sys.stderr,
+            )
+        return {
+            "events": total_events,
+            "produced": produced,
+            "producer_failures": sum(stats["failed"] for stats in self.producer_stats),
+            "elapsed_seconds": round(elapsed, 3),
+            "events_per_second": round(total_events / elapsed, 1) if elapsed else 0.0,
+            "processor_invocations": self.processor_invocations,
+            "trend_invocations": self.trend_invocations,
+            "items_in_table": stored,
+            "items_overwritten": self.overwritten,
+            "items_missing": produced - stored,
+            "raw_objects": len(self.s3.buckets.get(RAW_BUCKET, {})),
+            "alerts_published": len(self.sns.messages),
+            "latency_ms": {
+                stage: {
+                    "p50": round(percentile(values, 50), 2),
+                    "p95": round(percentile(values, 95), 2),
+                    "p99": round(percentile(values, 99), 2),
+                }
+                for stage, values in self.latencies.items()
+            },
+        }
+
+
+# ==============================
+# 3) Punto de entrada
+# ==============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the streaming pipeline locally")
+    parser.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "GOOG"])
+    parser.add_argument("--events", type=int, default=200, help="events per symbol")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--kinesis-batch-size", type=int, default=2)
+    parser.add_argument("--stream-batch-size", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.01, help="producer delay in seconds (0 = as fast as possible)")
+    parser.add_argument("--key-scheme", choices=["symbol", "sharded"], default="symbol")
+    parser.add_argument("--write-shards", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show producer/Lambda output")
+    args = parser.parse_args()
+
+    pipeline = LocalPipeline(
+        LocalPipelineConfig(
+            symbols=args.symbols,
+            events_per_symbol=args.events,
+            shard_count=args.shards,
+            kinesis_batch_size=args.kinesis_batch_size,
+            stream_batch_size=args.stream_batch_size,
+            producer_delay_seconds=args.delay,
+            key_scheme=args.key_scheme,
+            write_shards=args.write_shards,
+        )
+    )
+    print(json.dumps(pipeline.run(quiet=not args.verbose), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from stream_stock_data_refactoring import (
+    METRICS_LOG_EVERY,
+    StockData,
+    build_kinesis_client,
+    get_stock_data,
+    log,
+    log_producer_metrics,
+    metrics,
+    put_record_to_kinesis,
+    start_trace,
+)
+from partitioning import PartitionStrategy, build_partitioner
+from spool import Spool, SpoolDrainer
+from throttling import AdaptiveRateLimiter
+
+# ==============================
+# Fuentes de datos de mercado
+# ==============================
+#
+# MarketDataSource desacopla al productor de *cómo* llegan las cotizaciones:
+#
+#   - PollingSource: consulta periódica (yfinance u otra función con la
+#     firma de get_stock_data), un evento por símbolo cada 'delay_seconds'
+#   - WebSocketQuoteSource: feed push; cada cotización se entrega apenas
+#     llega, sin temporizador (ver src/fake_quote_server.py para un
+#     servidor local de prueba)
+#
+# El productor solo itera `source.stream()` y envía cada evento a Kinesis
+# apenas llega (send_source_to_kinesis), sin esperar un delay fijo.
+#
+# Uso:
+#   python src/market_data_sources.py --source polling --symbols AAPL MSFT --delay 3
+#   python src/fake_quote_server.py --port 8765 &
+#   python src/market_data_sources.py --source websocket --url ws://localhost:8765 --symbols AAPL --local
+
+
+class MarketDataSource(ABC):
+    """
+    Interfaz común de las fuentes. `stream()` es un iterador bloqueante que
+    entrega StockData a medida que hay datos; `close()` lo detiene.
+    """
+
+    @abstractmethod
+    def stream(self) -> Iterator[StockData]:
+        ...
+
+    def close(self) -> None:
+        """
+        Por defecto no hay recursos que liberar.
+        """
+
+
+# ==============================
+# 1) Polling (yfinance)
+# ==============================
+
+class PollingSource(MarketDataSource):
+    """
+    Recorre los símbolos llamando a `fetch` y espera 'delay_seconds' entre
+    vueltas. Con fetch=get_stock_data es el comportamiento original del
+    productor; los errores de la API (None) se saltan.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        delay_seconds: float,
+        fetch: Callable[[str], Optional[StockData]] = get_stock_data,
+    ) -> None:
+        self.symbols = symbols
+        self.delay_seconds = delay_seconds
+        self.fetch = fetch
+        self._stopped = threading.Event()
+
+    def stream(self) -> Iterator[StockData]:
+        while not self._stopped.is_set():
+            for symbol in self.symbols:
+                with metrics.timer("FetchLatency"):
+                    stock_data: Optional[StockData] = self.fetch(symbol)
+                if stock_data is None:
+                    log.warning("Skipping symbol due to API/data error", source="polling", symbol=symbol)
+                    continue
+                yield stock_data
+            # wait() en lugar de sleep(): close() corta la espera
+            self._stopped.wait(self.delay_seconds)
+
+    def close(self) -> None:
+        self._stopped.set()
+
+
+# ==============================
+# 2) Streaming (WebSocket)
+# ==============================
+
+def quote_to_stock_data(message: Dict[str, Any]) -> Optional[StockData]:
+    """
+    Normaliza un mensaje de cotización del feed a StockData.
+
+    Campos esperados: symbol, price, previous_close y opcionalmente open,
+    high, low, volume, timestamp_ms. Mensajes que no son cotizaciones
+    (heartbeats, acks de suscripción) retornan None.
+    """
+    if message.get("type", "quote") != "quote" or "symbol" not in message:
+        return None
+
+    price: float = float(message["price"])
+    prev_close: float = float(message.get("previous_close", price))
+    change: float = price - prev_close
+    change_percent: float = (change / prev_close) * 100 if prev_close != 0 else 0.0
+    epoch_ms: int = int(message.get("timestamp_ms") or time.time() * 1000)
+
+    return {
+        "symbol": str(message["symbol"]),
+        "open": round(float(message.get("open", price)), 2),
+        "high": round(float(message.get("high", price)), 2),
+        "low": round(float(message.get("low", price)), 2),
+        "price": round(price, 2),
+        "previous_close": round(prev_close, 2),
+        "change": round(change, 2),
+        "change_percent": round(change_percent, 2),
+        "volume": int(message.get("volume", 0)),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch_ms / 1000)),
+        "timestamp_ms": epoch_ms,
+    }
+
+
+class WebSocketQuoteSource(MarketDataSource):
+    """
+    Cliente de un feed de cotizaciones por WebSocket.
+
+    Protocolo:
+    - al conectar envía {"action": "subscribe", "symbols": [...]}
+    - recibe un mensaje JSON por cotización (ver quote_to_stock_data)
+
+    Para otro proveedor basta con pasar `subscribe_message` y `parse`
+    propios. Si la conexión se cae, reconecta con backoff exponencial.
+    Un mensaje malformado (JSON inválido, sin precio) se registra, se cuenta
+    en `malformed` y se salta, sin cerrar la conexión.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        symbols: List[str],
+        subscribe_message: Optional[Dict[str, Any]] = None,
+        parse: Callable[[Dict[str, Any]], Optional[StockData]] = quote_to_stock_data,
+        max_backoff_seconds: float = 30.0,
+    ) -> None:
+        self.url = url
+        self.symbols = symbols
+        self.subscribe_message = subscribe_message or {"action": "subscribe", "symbols": symbols}
+        self.parse = parse
+        self.max_backoff_seconds = max_backoff_seconds
+        self._stopped = threading.Event()
+        self._connection: Any = None
+        self.malformed: int = 0
+
+    def stream(self) -> Iterator[StockData]:
+        # Import diferido: websockets solo es necesario para este backend
+        from websockets.exceptions import ConnectionClosed
+        from websockets.sync.client import connect
+
+        backoff: float = 0.5
+        while not self._stopped.is_set():
+            try:
+                with connect(self.url, open_timeout=10) as connection:
+                    self._connection = connection
+                    connection.send(json.dumps(self.subscribe_message))
+                    backoff = 0.5
+                    for raw in connection:
+                        try:
+                            stock_data: Optional[StockData] = self.parse(json.loads(raw))
+                        except (ValueError, KeyError, TypeError) as e:
+                            self.malformed += 1
+                            metrics.count("MalformedMessages")
+                            log.warning("Skipping malformed message", url=self.url, error=str(e),
+                                        raw=str(raw)[:200])
+                            continue
+                        if stock_data is not None:
+                            yield stock_data
+            except (OSError, TimeoutError, ConnectionClosed) as e:
+                if self._stopped.is_set():
+                    break
+                log.warning("WebSocket connection lost, reconnecting", url=self.url, error=str(e),
+                            retry_in_seconds=round(backoff, 1))
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_seconds)
+            finally:
+                self._connection = None
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._connection is not None:
+            self._connection.close()
+
+
+# ==============================
+# 3) Envío a Kinesis
+# ==============================
+
+def send_source_to_kinesis(
+    source: MarketDataSource,
+    kinesis_client: Any,
+    stream_name: str,
+    max_events: Optional[int] = None,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    spool_dir: Optional[str] = None,
+    partitioner: Optional[PartitionStrategy] = None,
+    spool: Optional[Spool] = None,
+) -> Dict[str, int]:
+    """
+    Envía cada evento de la fuente a Kinesis en cuanto llega.
+    PartitionKey = símbolo del evento (orden por símbolo, igual que antes),
+    salvo que se pase un 'partitioner' (ver partitioning.py).
+    Los throttles se absorben con el rate limiter por partition key.
+    Con 'spool_dir' los eventos pasan por el spool durable (spool.py) y se
+    drenan en lotes PutRecords en segundo plano. Un 'spool' ya abierto se
+    usa tal cual: su drainer y su cierre quedan a cargo del llamador.
+    Se detiene con CTRL+C, tras 'max_events' envíos o cuando la fuente termina.
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter()
+    stats: Dict[str, int] = {"sent": 0, "failed": 0}
+
+    drainer: Optional[SpoolDrainer] = None
+    if spool is None and spool_dir is not None:
+        spool = Spool(spool_dir)
+        drainer = SpoolDrainer(
+            spool, kinesis_client, stream_name, rate_limiter=rate_limiter, partitioner=partitioner
+        ).start()
+
+    try:
+        for stock_data in source.stream():
+            if spool is not None:
+                spool.append(stock_data["symbol"], json.dumps(start_trace(stock_data)).encode("utf-8"))
+                stats["sent"] += 1
+                if stats["sent"] % METRICS_LOG_EVERY == 0:
+                    log_producer_metrics(rate_limiter)
+                if max_events is not None and stats["sent"] >= max_events:
+                    break
+                continue
+            partition_key, explicit_hash_key = (
+                partitioner.route(stock_data["symbol"]) if partitioner else (stock_data["symbol"], None)
+            )
+            try:
+                with metrics.timer("KinesisPutLatency"):
+                    response: Dict[str, Any] = put_record_to_kinesis(
+                        kinesis_client=kinesis_client,
+                        stream_name=stream_name,
+                        partition_key=partition_key,
+                        payload=stock_data,
+                        rate_limiter=rate_limiter,
+                        explicit_hash_key=explicit_hash_key,
+                    )
+                stats["sent"] += 1
+                log.sample(
+                    "Sent to Kinesis",
+                    event=stock_data,
+                    shard_id=response.get("ShardId"),
+                    sequence_number=response.get("SequenceNumber"),
+                )
+            except Exception as e:
+                log.error("Error sending event", symbol=stock_data["symbol"], error=str(e))
+                stats["failed"] += 1
+            if (stats["sent"] + stats["failed"]) % METRICS_LOG_EVERY == 0:
+                log_producer_metrics(rate_limiter)
+            if max_events is not None and stats["sent"] + stats["failed"] >= max_events:
+                break
+    except KeyboardInterrupt:
+        log.info("Stopped by user (CTRL+C)")
+    finally:
+        source.close()
+        if drainer is not None and spool is not None:
+            drainer.stop()
+            spool.close()
+    log_producer_metrics(rate_limiter)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream market data into Kinesis")
+    parser.add_argument("--source", choices=["polling", "websocket"], default="polling")
+    parser.add_argument("--symbols", nargs="+", default=["AAPL"])
+    parser.add_argument("--delay", type=float, default=10.0, help="polling interval in seconds")
+    parser.add_argument("--url", default="ws://localhost:8765", help="WebSocket quote feed")
+    parser.add_argument("--max-events", type=int, default=None)
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--stream", default="stock-market-stream")
+    parser.add_argument("--spool-dir", default=None, help="buffer events in a durable on-disk spool")
+    parser.add_argument("--partition-mode", choices=["symbol", "salted", "explicit"], default="symbol")
+    parser.add_argument("--salts", type=int, default=4, help="salts per symbol in salted mode")
+    parser.add_argument("--ordered-symbols", nargs="*", default=[], help="symbols that keep strict order in salted mode")
+    parser.add_argument("--local", action="store_true", help="send to the in-memory Kinesis stand-in")
+    args = parser.parse_args()
+
+    source: MarketDataSource
+    if args.source == "websocket":
+        source = WebSocketQuoteSource(args.url, args.symbols)
+    else:
+        source = PollingSource(args.symbols, args.delay)
+
+    if args.local:
+        from local_aws import LocalKinesis
+        kinesis_client: Any = LocalKinesis(stream_name=args.stream)
+    else:
+        kinesis_client = build_kinesis_client(args.region)
+
+    partitioner = build_partitioner(
+        args.partition_mode, kinesis_client, args.stream, salts=args.salts, ordered_symbols=args.ordered_symbols
+    )
+
+    print(f"=== Streaming {args.symbols} from {args.source} source ===")
+    print(json.dumps(send_source_to_kinesis(
+        source, kinesis_client, args.stream, args.max_events,
+        spool_dir=args.spool_dir, partitioner=partitioner,
+    ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
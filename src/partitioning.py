@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# ==============================
+# Estrategias de partition key
+# ==============================
+#
+# Kinesis asigna cada registro al shard cuyo rango contiene
+# MD5(PartitionKey), o ExplicitHashKey si se envía. Con PartitionKey =
+# símbolo, unos pocos tickers calientes pueden caer en el mismo shard y
+# throttlear mientras otros shards quedan ociosos.
+#
+# Modos:
+#   - "symbol":   PartitionKey = símbolo. Orden total por símbolo; la carga
+#                 depende del azar del hash.
+#   - "salted":   PartitionKey = "símbolo#n", n en [0, salts). Reparte un
+#                 símbolo caliente en varios shards; se PIERDE el orden por
+#                 símbolo (salvo para los símbolos en `ordered_symbols`).
+#   - "explicit": cada símbolo se fija a un shard con ExplicitHashKey
+#                 (punto medio del rango del shard). La asignación se
+#                 recalcula con las tasas observadas por símbolo (bin packing
+#                 greedy). Orden por símbolo preservado entre rebalanceos.
+#
+# El partitioner se aplica al enviar (route(symbol)), así el spool y los
+# lotes PutRecords siguen guardando solo el símbolo.
+
+MAX_HASH_KEY: int = 2 ** 128 - 1
+
+PartitionRoute = Tuple[str, Optional[str]]  # (PartitionKey, ExplicitHashKey)
+
+
+class PartitionStrategy(ABC):
+    @abstractmethod
+    def route(self, symbol: str) -> PartitionRoute:
+        ...
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": type(self).__name__}
+
+
+class SymbolPartitioner(PartitionStrategy):
+    """
+    Comportamiento original: PartitionKey = símbolo.
+    """
+
+    def route(self, symbol: str) -> PartitionRoute:
+        return symbol, None
+
+
+class SaltedPartitioner(PartitionStrategy):
+    """
+    Símbolo + sal aleatoria. Los símbolos en `ordered_symbols` mantienen la
+    clave sin sal (y por lo tanto su orden).
+    """
+
+    def __init__(self, salts: int = 4, ordered_symbols: Iterable[str] = ()) -> None:
+        if salts < 1:
+            raise ValueError("salts must be >= 1")
+        self.salts = salts
+        self.ordered_symbols: FrozenSet[str] = frozenset(ordered_symbols)
+
+    def route(self, symbol: str) -> PartitionRoute:
+        if symbol in self.ordered_symbols or self.salts == 1:
+            return symbol, None
+        return f"{symbol}#{random.randrange(self.salts)}", None
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": "salted", "salts": self.salts, "ordered_symbols": sorted(self.ordered_symbols)}
+
+
+def even_hash_ranges(shard_count: int) -> List[Tuple[int, int]]:
+    """
+    Rangos de hash de un stream con shards uniformes (lo que crea Kinesis
+    al aprovisionar `shard_count` shards sin resharding).
+    """
+    step: int = (MAX_HASH_KEY + 1) // shard_count
+    return [
+        (index * step, MAX_HASH_KEY if index == shard_count - 1 else (index + 1) * step - 1)
+        for index in range(shard_count)
+    ]
+
+
+def hash_ranges_from_stream(kinesis_client: Any, stream_name: str) -> List[Tuple[int, int]]:
+    """
+    Rangos de los shards abiertos del stream (ListShards).
+    """
+    ranges: List[Tuple[int, int]] = []
+    kwargs: Dict[str, Any] = {"StreamName": stream_name}
+    while True:
+        response: Dict[str, Any] = kinesis_client.list_shards(**kwargs)
+        for shard in response["Shards"]:
+            if "EndingSequenceNumber" in shard.get("SequenceNumberRange", {}):
+                continue  # shard cerrado por un resharding
+            hash_range = shard["HashKeyRange"]
+            ranges.append((int(hash_range["StartingHashKey"]), int(hash_range["EndingHashKey"])))
+        if not response.get("NextToken"):
+            break
+        kwargs = {"NextToken": response["NextToken"]}
+    return sorted(ranges)
+
+
+class ExplicitHashPartitioner(PartitionStrategy):
+    """
+    Fija cada símbolo a un shard y balancea con las tasas observadas.
+
+    - route(symbol) cuenta el evento y devuelve el ExplicitHashKey del shard
+      asignado (símbolos nuevos van al shard menos cargado)
+    - cada 'rebalance_interval_seconds' se estima la tasa por símbolo (EWMA)
+      y, si el shard más cargado supera en 'imbalance_threshold' al
+      promedio, se reasigna con bin packing greedy (mayor tasa primero al
+      shard menos cargado)
+
+    Un rebalanceo mueve símbolos de shard: los eventos de un símbolo movido
+    que aún estén en el shard viejo pueden leerse después de los nuevos.
+    Por eso solo se rebalancea ante un desbalance real.
+    """
+
+    def __init__(
+        self,
+        hash_ranges: List[Tuple[int, int]],
+        rebalance_interval_seconds: float = 60.0,
+        imbalance_threshold: float = 1.25,
+        smoothing: float = 0.5,
+    ) -> None:
+        if not hash_ranges:
+            raise ValueError("at least one shard hash range is required")
+        self.hash_keys: List[str] = [str((start + end) // 2) for start, end in hash_ranges]
+        self.rebalance_interval_seconds = rebalance_interval_seconds
+        self.imbalance_threshold = imbalance_threshold
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._assignment: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+        self._rates: Dict[str, float] = {}
+        self._window_start: float = time.monotonic()
+        self.rebalances: int = 0
+
+    @classmethod
+    def for_stream(cls, kinesis_client: Any, stream_name: str, **kwargs: Any) -> "ExplicitHashPartitioner":
+        return cls(hash_ranges_from_stream(kinesis_client, stream_name), **kwargs)
+
+    def _shard_loads(self) -> List[float]:
+        # Símbolos sin tasa medida todavía cuentan como un símbolo promedio
+        default_rate: float = sum(self._rates.values()) / len(self._rates) if self._rates else 1.0
+        loads: List[float] = [0.0] * len(self.hash_keys)
+        for symbol, shard in self._assignment.items():
+            loads[shard] += self._rates.get(symbol, default_rate)
+        return loads
+
+    def route(self, symbol: str) -> PartitionRoute:
+        with self._lock:
+            now: float = time.monotonic()
+            if now - self._window_start >= self.rebalance_interval_seconds:
+                self._update_rates(now)
+                self._maybe_rebalance()
+
+            self._counts[symbol] = self._counts.get(symbol, 0) + 1
+            shard: Optional[int] = self._assignment.get(symbol)
+            if shard is None:
+                loads = self._shard_loads()
+                shard = loads.index(min(loads))
+                self._assignment[symbol] = shard
+            return symbol, self.hash_keys[shard]
+
+    def _update_rates(self, now: float) -> None:
+        elapsed: float = now - self._window_start
+        for symbol in set(self._rates) | set(self._counts):
+            observed: float = self._counts.get(symbol, 0) / elapsed
+            previous: Optional[float] = self._rates.get(symbol)
+            self._rates[symbol] = observed if previous is None else (
+                self.smoothing * observed + (1 - self.smoothing) * previous
+            )
+        self._counts = {}
+        self._window_start = now
+
+    def _maybe_rebalance(self) -> None:
+        loads: List[float] = self._shard_loads()
+        mean: float = sum(loads) / len(loads)
+        if mean == 0 or max(loads) <= mean * self.imbalance_threshold:
+            return
+        self._assignment = self.plan(self._rates, len(self.hash_keys))
+        self.rebalances += 1
+
+    @staticmethod
+    def plan(rates: Dict[str, float], shard_count: int) -> Dict[str, int]:
+        """
+        Bin packing greedy (LPT): símbolos por tasa descendente, cada uno al
+        shard con menor carga acumulada.
+        """
+        loads: List[float] = [0.0] * shard_count
+        assignment: Dict[str, int] = {}
+        for symbol, rate in sorted(rates.items(), key=lambda item: (-item[1], item[0])):
+            shard: int = loads.index(min(loads))
+            assignment[symbol] = shard
+            loads[shard] += rate
+        return assignment
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "explicit",
+                "shards": len(self.hash_keys),
+                "rebalances": self.rebalances,
+                "shard_loads": [round(load, 1) for load in self._shard_loads()],
+            }
+
+
+def build_partitioner(
+    mode: str,
+    kinesis_client: Any = None,
+    stream_name: Optional[str] = None,
+    salts: int = 4,
+    ordered_symbols: Iterable[str] = (),
+    shard_count: Optional[int] = None,
+) -> PartitionStrategy:
+    """
+    Construye la estrategia desde flags de línea de comandos. En modo
+    explicit los rangos salen de ListShards, o de 'shard_count' shards
+    uniformes si se indica.
+    """
+    if mode == "symbol":
+        return SymbolPartitioner()
+    if mode == "salted":
+        return SaltedPartitioner(salts=salts, ordered_symbols=ordered_symbols)
+    if mode == "explicit":
+        if shard_count is not None:
+            return ExplicitHashPartitioner(even_hash_ranges(shard_count))
+        if kinesis_client is None or stream_name is None:
+            raise ValueError("explicit mode needs a Kinesis client and stream name (or shard_count)")
+        return ExplicitHashPartitioner.for_stream(kinesis_client, stream_name)
+    raise ValueError(f"Unknown partition mode: {mode!r} (expected symbol, salted or explicit)")
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+
+from read_cache import TTLCache
+
+# Lectura compartida con las Lambdas (pipeline_core vive junto a los handlers)
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+
+from pipeline_core.indicators import rolling_indicators  # noqa: E402
+from pipeline_core.keys import KeyScheme, item_epoch_ms, query_symbol_latest  # noqa: E402
+from pipeline_core.quotes import get_latest_quotes  # noqa: E402
+from pipeline_core.timestamps import format_iso  # noqa: E402
+
+# ==============================
+# API de consulta en tiempo real
+# ==============================
+#
+# Servicio HTTP de solo lectura sobre las tablas del pipeline, para
+# dashboards y para inspeccionar el mercado sin pasar por Athena:
+#
+#   GET /quote/<symbol>                  último precio (tabla latest-quote)
+#   GET /quotes?symbols=AAPL,MSFT        últimos precios de varios símbolos
+#   GET /ticks/<symbol>?n=50             últimos N ticks, del más viejo al más nuevo
+#   GET /indicators/<symbol>?window=20   SMA, EMA, min/max, desvío, momentum
+#   GET /stats                           contadores del cache
+#
+# Todas las lecturas pasan por TTLCache (read_cache.py): un dashboard que
+# refresca cada segundo desde muchas pestañas cuesta una lectura por
+# símbolo y TTL, no una por petición.
+#
+# Uso:
+#   python src/query_api.py --local --symbols AAPL MSFT GOOG        # datos sintéticos en memoria
+#   python src/query_api.py --table stock-market-data-v2 --sort-key-format epoch_ms
+
+DEFAULT_REGION: str = "us-east-1"
+DEFAULT_PORT: int = 8080
+
+# Tope de ticks por petición (una Query con Limit por partición)
+MAX_TICKS: int = 500
+
+
+# ==============================
+# 1) Configuración
+# ==============================
+
+@dataclass(frozen=True)
+class QueryConfig:
+    tick_table: str
+    latest_table: str
+    key_scheme: KeyScheme
+    cache_ttl_seconds: float = 1.0
+    cache_max_entries: int = 4096
+
+
+# ==============================
+# 2) Servicio
+# ==============================
+
+def _tick_view(item: Dict[str, Any]) -> Dict[str, Any]:
+    epoch_ms: int = item_epoch_ms(item)
+    return {
+        "ts": epoch_ms,
+        "timestamp": format_iso(epoch_ms),
+        "price": item.get("price"),
+        "previous_close": item.get("previous_close"),
+        "change": item.get("change"),
+        "moving_average": item.get("moving_average"),
+    }
+
+
+class MarketQueryService:
+    """
+    Lecturas del estado del mercado con cache.
+
+    `dynamodb_client` es un cliente de bajo nivel (Query, thread-safe) y
+    `dynamodb` el service resource (BatchGetItem de la tabla latest-quote);
+    en modo local son los stand-ins de local_aws.py.
+    """
+
+    def __init__(self, config: QueryConfig, dynamodb_client: Any, dynamodb: Any) -> None:
+        self.config = config
+        self.dynamodb_client = dynamodb_client
+        self.dynamodb = dynamodb
+        self.cache = TTLCache(max_entries=config.cache_max_entries, ttl_seconds=config.cache_ttl_seconds)
+
+    def latest_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        key: Tuple[str, ...] = tuple(sorted(set(symbols)))
+        return self.cache.get_or_load(
+            ("quotes", key),
+            lambda: get_latest_quotes(self.dynamodb, self.config.latest_table, key),
+        )
+
+    def latest_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        return self.latest_quotes([symbol]).get(symbol)
+
+    def recent_ticks(self, symbol: str, n: int) -> List[Dict[str, Any]]:
+        n = max(1, min(n, MAX_TICKS))
+        return self.cache.get_or_load(
+            ("ticks", symbol, n),
+            lambda: [
+                _tick_view(item)
+                for item in query_symbol_latest(
+                    self.dynamodb_client, self.config.tick_table, self.config.key_scheme, symbol, n
+                )
+            ],
+        )
+
+    def indicators(self, symbol: str, window: int) -> Dict[str, Any]:
+        ticks: List[Dict[str, Any]] = self.recent_ticks(symbol, window)
+        return {
+            "symbol": symbol,
+            "window": window,
+            "as_of": ticks[-1]["timestamp"] if ticks else None,
+            **rolling_indicators([tick["price"] for tick in ticks], window),
+        }
+
+
+# ==============================
+# 3) HTTP
+# ==============================
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _int_param(query: Dict[str, List[str]], name: str, default: int) -> int:
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        return default
+
+
+def make_handler(service: MarketQueryService) -> type:
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Any) -> None:
+            payload: bytes = json.dumps(body, default=_json_default).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:  # noqa: N802 (nombre de BaseHTTPRequestHandler)
+            url = urlparse(self.path)
+            parts: List[str] = [p for p in url.path.split("/") if p]
+            query: Dict[str, List[str]] = parse_qs(url.query)
+            try:
+                if parts == ["stats"]:
+                    return self._send(200, service.cache.snapshot())
+                if parts == ["quotes"]:
+                    symbols = [s.upper() for s in ",".join(query.get("symbols", [])).split(",") if s]
+                    return self._send(200, service.latest_quotes(symbols))
+                if len(parts) == 2:
+                    resource, symbol = parts[0], parts[1].upper()
+                    if resource == "quote":
+                        quote = service.latest_quote(symbol)
+                        return self._send(200 if quote else 404, quote or {"error": f"no quote for {symbol}"})
+                    if resource == "ticks":
+                        return self._send(200, service.recent_ticks(symbol, _int_param(query, "n", 50)))
+                    if resource == "indicators":
+                        window: int = max(1, min(_int_param(query, "window", 20), MAX_TICKS))
+                        return self._send(200, service.indicators(symbol, window))
+                self._send(404, {"error": "not found"})
+            except Exception as exc:
+                self._send(500, {"error": str(exc)})
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            # Sin una línea por petición: los dashboards consultan cada segundo
+            pass
+
+    return QueryHandler
+
+
+# ==============================
+# 4) Modo local
+# ==============================
+
+def start_local_pipeline(args: argparse.Namespace) -> Tuple[Any, QueryConfig]:
+    """
+    Levanta el pipeline local (local_pipeline.py) en un hilo aparte, con el
+    productor sintético, y devuelve sus tablas en memoria: la API ve los
+    ticks a medida que el processor los escribe.
+    """
+    from local_pipeline import LATEST_TABLE, TICK_TABLE, LocalPipeline, LocalPipelineConfig
+
+    pipeline = LocalPipeline(
+        LocalPipelineConfig(
+            symbols=args.symbols,
+            events_per_symbol=args.events,
+            producer_delay_seconds=args.delay,
+            key_scheme=args.key_scheme,
+            write_shards=args.write_shards,
+        )
+    )
+    threading.Thread(target=pipeline.run, daemon=True).start()
+    config = QueryConfig(
+        tick_table=TICK_TABLE,
+        latest_table=LATEST_TABLE,
+        key_scheme=KeyScheme(mode=args.key_scheme, write_shards=args.write_shards, sort_key_format="epoch_ms"),
+        cache_ttl_seconds=args.cache_ttl,
+    )
+    return pipeline.dynamodb, config
+
+
+# ==============================
+# 5) Punto de entrada
+# ==============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Read API over recent ticks, latest quotes and indicators")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-ttl", type=float, default=1.0, help="seconds a cached read stays fresh")
+    parser.add_argument("--key-scheme", choices=["symbol", "sharded"], default="symbol")
+    parser.add_argument("--write-shards", type=int, default=1)
+    # AWS
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--table", default="stock-market-data-v2", help="DynamoDB tick table")
+    parser.add_argument("--latest-table", default="stock-market-latest", help="DynamoDB latest-quote table")
+    parser.add_argument("--sort-key-format", choices=["iso", "epoch_ms"], default="epoch_ms")
+    # Local
+    parser.add_argument("--local", action="store_true", help="serve an in-memory pipeline fed by synthetic ticks")
+    parser.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "GOOG"], help="symbols of --local")
+    parser.add_argument("--events", type=int, default=100_000, help="events per symbol of --local")
+    parser.add_argument("--delay", type=float, default=0.05, help="producer delay of --local, in seconds")
+    args = parser.parse_args()
+
+    if args.local:
+        local_dynamodb, config = start_local_pipeline(args)
+        service = MarketQueryService(config, local_dynamodb.client(), local_dynamodb)
+    else:
+        config = QueryConfig(
+            tick_table=args.table,
+            latest_table=args.latest_table,
+            key_scheme=KeyScheme(
+                mode=args.key_scheme, write_shards=args.write_shards, sort_key_format=args.sort_key_format
+            ),
+            cache_ttl_seconds=args.cache_ttl,
+        )
+        service = MarketQueryService(
+            config,
+            boto3.client("dynamodb", region_name=args.region),
+            boto3.resource("dynamodb", region_name=args.region),
+        )
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Query API on http://{args.host}:{args.port} (tables: {config.tick_table}, {config.latest_table})",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# ==============================
+# Cache de lectura con TTL, LRU y coalescing
+# ==============================
+#
+# Los dashboards consultan los mismos símbolos cada pocos segundos. Sin
+# cache, N pestañas abiertas son N lecturas a DynamoDB por refresco:
+#
+#   - TTL: una entrada vale `ttl_seconds` (los datos son casi en tiempo
+#     real, así que el TTL es corto: 1-2 s)
+#   - LRU: como máximo `max_entries`; al llenarse se descarta la menos usada
+#   - Coalescing ("single flight"): si llegan varias peticiones por la misma
+#     clave mientras se está leyendo, solo la primera va a DynamoDB y las
+#     demás esperan su resultado. Un refresco simultáneo de 50 clientes
+#     cuesta una lectura, no 50.
+#
+# Los errores del loader no se cachean: se propagan a la petición que leyó
+# y a las que esperaban, y la siguiente vuelve a intentar.
+
+
+class _Flight:
+    """
+    Lectura en curso de una clave; los que esperan se bloquean en `done`.
+    """
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Cache thread-safe: LRU acotado, entradas con TTL y lecturas coalescidas.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self._clock = clock
+        # clave -> (expira_en, valor), en orden de uso (el último es el más reciente)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "errors": 0}
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Valor vigente de `key`; si no hay, lo carga con `loader()` (una sola
+        vez aunque lo pidan varios hilos a la vez).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+
+            flight: Optional[_Flight] = self._inflight.get(key)
+            leader: bool = flight is None
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as exc:
+            flight.error = exc
+            with self._lock:
+                self._stats["errors"] += 1
+                del self._inflight[key]
+            flight.done.set()
+            raise
+
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, flight.value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            del self._inflight[key]
+        flight.done.set()
+        return flight.value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Descarta `key`, o todo el cache si es None.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "inflight": len(self._inflight)}
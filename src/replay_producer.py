@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from stream_stock_data_refactoring import StockData, build_kinesis_client, put_record_to_kinesis
+
+# ==============================
+# Productor de replay histórico
+# ==============================
+#
+# Lee OHLCV histórico y lo envía a Kinesis por el mismo camino que el
+# productor en vivo (put_record_to_kinesis), respetando el espaciado
+# original entre eventos dividido por un factor de velocidad:
+#
+#   --speed 1     -> tiempo real
+#   --speed 100   -> 100x más rápido
+#   --speed 0     -> tan rápido como sea posible
+#
+# Fuentes soportadas:
+#   - archivo CSV / Parquet (columnas Open, High, Low, Close, Volume, una
+#     columna de fecha y opcionalmente Symbol)
+#   - el archivo raw de S3 (raw-data/<symbol>/, eventos ya en formato StockData):
+#     un evento JSON por objeto tal como lo escribe el processor, o varios
+#     por objeto (una línea cada uno) tras compactar con tools/compact_raw_prefix.py
+#
+# Cada símbolo se reproduce en su propio hilo, todos sobre el mismo reloj
+# de replay, así un día de mercado se reproduce siempre igual.
+#
+# Uso:
+#   python src/replay_producer.py --file aapl_1m.csv --symbol AAPL --speed 100
+#   python src/replay_producer.py --s3-bucket stock-market-raw-data-1996 --symbols AAPL MSFT --speed 0
+
+DATE_COLUMNS: List[str] = ["Datetime", "Date", "timestamp", "time"]
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    """
+    Configuración del replay.
+    - speed: factor de aceleración (0 = sin esperas)
+    - restamp: reemplaza el timestamp histórico por la hora de envío
+      (útil cuando la lógica downstream usa ventanas relativas a "ahora")
+    """
+    region_name: str = "us-east-1"
+    stream_name: str = "stock-market-stream"
+    speed: float = 1.0
+    restamp: bool = False
+
+
+# ==============================
+# 1) Carga de datos históricos
+# ==============================
+
+def _date_column(frame: pd.DataFrame) -> str:
+    for column in DATE_COLUMNS:
+        if column in frame.columns:
+            return column
+    raise ValueError(f"No date column found (expected one of {DATE_COLUMNS})")
+
+
+def ohlcv_to_events(frame: pd.DataFrame, symbol: str) -> List[StockData]:
+    """
+    Convierte filas OHLCV (ordenadas por fecha) en eventos StockData.
+    previous_close es el cierre de la fila anterior, como en get_stock_data.
+    """
+    frame = frame.sort_values(_date_column(frame))
+    times = pd.to_datetime(frame[_date_column(frame)], utc=True)
+
+    events: List[StockData] = []
+    prev_close: Optional[float] = None
+    for moment, row in zip(times, frame.itertuples(index=False)):
+        close: float = float(getattr(row, "Close"))
+        if prev_close is None:
+            # La primera fila solo aporta el previous_close de la siguiente
+            prev_close = close
+            continue
+
+        change: float = close - prev_close
+        change_percent: float = (change / prev_close) * 100 if prev_close != 0 else 0.0
+        epoch_ms: int = int(moment.timestamp() * 1000)
+        events.append({
+            "symbol": symbol,
+            "open": round(float(getattr(row, "Open")), 2),
+            "high": round(float(getattr(row, "High")), 2),
+            "low": round(float(getattr(row, "Low")), 2),
+            "price": round(close, 2),
+            "previous_close": round(prev_close, 2),
+            "change": round(change, 2),
+            "change_percent": round(change_percent, 2),
+            "volume": int(getattr(row, "Volume")),
+            "timestamp": moment.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "timestamp_ms": epoch_ms,
+        })
+        prev_close = close
+    return events
+
+
+def load_file(path: str, symbol: Optional[str]) -> Dict[str, List[StockData]]:
+    """
+    CSV o Parquet. Si el archivo trae columna Symbol, se separa por símbolo;
+    si no, todo el archivo corresponde a `symbol`.
+    """
+    frame: pd.DataFrame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+    if "Symbol" in frame.columns:
+        return {
+            str(sym): ohlcv_to_events(group.drop(columns=["Symbol"]), str(sym))
+            for sym, group in frame.groupby("Symbol")
+        }
+    if symbol is None:
+        raise ValueError("--symbol is required when the file has no Symbol column")
+    return {symbol: ohlcv_to_events(frame, symbol)}
+
+
+def load_s3_archive(
+    bucket: str, symbols: List[str], region_name: str, prefix: str = "raw-data", s3: Any = None
+) -> Dict[str, List[StockData]]:
+    """
+    Lee los eventos crudos que guardó el processor en S3, ordenados por timestamp.
+    Cada objeto es NDJSON: un evento por línea (los objetos sin compactar
+    tienen una sola línea).
+    """
+    if s3 is None:
+        import boto3
+
+        s3 = boto3.client("s3", region_name=region_name)
+    events: Dict[str, List[StockData]] = {}
+    for symbol in symbols:
+        loaded: List[StockData] = []
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=f"{prefix}/{symbol}/"):
+            for obj in page.get("Contents", []):
+                body = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+                loaded.extend(json.loads(line) for line in body.splitlines() if line.strip())
+        loaded.sort(key=event_time_ms)
+        events[symbol] = loaded
+    return events
+
+
+def event_time_ms(event: StockData) -> int:
+    if event.get("timestamp_ms") is not None:
+        return int(event["timestamp_ms"])
+    return int(pd.Timestamp(event["timestamp"]).timestamp() * 1000)
+
+
+# ==============================
+# 2) Replay
+# ==============================
+
+def replay_symbol(
+    kinesis_client: Any,
+    config: ReplayConfig,
+    symbol: str,
+    events: List[StockData],
+    replay_origin_ms: int,
+    wall_start: float,
+    stats: Dict[str, int],
+    lock: threading.Lock,
+) -> None:
+    """
+    Envía los eventos de un símbolo. El instante de envío de cada evento es
+    wall_start + (t_evento - replay_origin) / speed.
+    """
+    for event in events:
+        if config.speed > 0:
+            due: float = wall_start + (event_time_ms(event) - replay_origin_ms) / 1000 / config.speed
+            delay: float = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        payload: StockData = dict(event)  # type: ignore[assignment]
+        if config.restamp:
+            now: float = time.time()
+            payload["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+            payload["timestamp_ms"] = int(now * 1000)
+
+        try:
+            put_record_to_kinesis(
+                kinesis_client=kinesis_client,
+                stream_name=config.stream_name,
+                partition_key=symbol,
+                payload=payload,
+            )
+            with lock:
+                stats["sent"] += 1
+        except Exception as e:
+            print(f"[replay_symbol] {symbol}: error sending event: {e}")
+            with lock:
+                stats["failed"] += 1
+
+
+def replay(kinesis_client: Any, config: ReplayConfig, events: Dict[str, List[StockData]]) -> Dict[str, Any]:
+    """
+    Reproduce todos los símbolos en paralelo sobre un reloj común.
+    """
+    non_empty = {symbol: evs for symbol, evs in events.items() if evs}
+    if not non_empty:
+        return {"sent": 0, "failed": 0, "elapsed_seconds": 0.0}
+
+    origin_ms: int = min(event_time_ms(evs[0]) for evs in non_empty.values())
+    stats: Dict[str, int] = {"sent": 0, "failed": 0}
+    lock = threading.Lock()
+    wall_start: float = time.time()
+
+    threads = [
+        threading.Thread(
+            target=replay_symbol,
+            args=(kinesis_client, config, symbol, evs, origin_ms, wall_start, stats, lock),
+            daemon=True,
+        )
+        for symbol, evs in non_empty.items()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed: float = time.time() - wall_start
+    return {
+        **stats,
+        "symbols": len(non_empty),
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_second": round(stats["sent"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+# ==============================
+# 3) Punto de entrada
+# ==============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay historical OHLCV into Kinesis")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="CSV or Parquet file with OHLCV rows")
+    source.add_argument("--s3-bucket", help="raw archive bucket (raw-data/<symbol>/*.json)")
+    parser.add_argument("--symbol", help="symbol of --file when it has no Symbol column")
+    parser.add_argument("--symbols", nargs="+", default=["AAPL"], help="symbols to read from --s3-bucket")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed-up factor, 0 = as fast as possible")
+    parser.add_argument("--restamp", action="store_true", help="stamp events with the send time")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--stream", default="stock-market-stream")
+    parser.add_argument("--local", action="store_true", help="send to the in-memory Kinesis stand-in")
+    args = parser.parse_args()
+
+    config = ReplayConfig(
+        region_name=args.region,
+        stream_name=args.stream,
+        speed=args.speed,
+        restamp=args.restamp,
+    )
+
+    if args.file:
+        events = load_file(args.file, args.symbol)
+    else:
+        events = load_s3_archive(args.s3_bucket, args.symbols, args.region)
+
+    if args.local:
+        from local_aws import LocalKinesis
+        kinesis_client: Any = LocalKinesis(stream_name=args.stream)
+    else:
+        kinesis_client = build_kinesis_client(args.region)
+
+    print(f"=== Replaying {sum(len(e) for e in events.values())} events "
+          f"for {len(events)} symbols at speed {args.speed or 'max'} ===")
+    print(json.dumps(replay(kinesis_client, config, events), indent=2))
+
+
+if __name__ == "__main__":
+    main()
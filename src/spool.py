@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from partitioning import PartitionStrategy
+from stream_stock_data_refactoring import (
+    PUT_RECORDS_MAX_BATCH,
+    build_put_records_entry,
+    log,
+    metrics,
+    record_put_records_outcome,
+)
+from throttling import AdaptiveRateLimiter, backoff_delay
+
+# ==============================
+# Spool local durable del productor
+# ==============================
+#
+# El productor escribe cada evento primero en disco y un hilo aparte lo
+# drena a Kinesis con PutRecords. Si Kinesis no responde (red caída,
+# throttling sostenido) los eventos se acumulan en el spool y salen cuando
+# vuelve: una caída cuesta latencia, no datos.
+#
+# Formato:
+#   - segmentos de tamaño fijo (segment-<id>.log) preasignados y mapeados
+#     en memoria (mmap); solo se escribe al final (append-only)
+#   - registro = header <II H> (largo, crc32, largo de la partition key)
+#                + partition key + data
+#     El header se escribe DESPUÉS del cuerpo: un registro a medio escribir
+#     tiene largo 0 o crc inválido y se descarta al recuperar.
+#   - checkpoint.json: (segmento, offset) del primer registro no confirmado
+#     por Kinesis. Se reemplaza atómicamente tras cada lote drenado.
+#
+# Recuperación tras un crash: se relee desde el checkpoint, así que a lo
+# sumo se reenvían los registros de los lotes en vuelo (entrega
+# at-least-once; el processor es idempotente). Las escrituras del mmap
+# sobreviven a un crash del proceso; ante un corte de energía se pierde
+# como máximo 'sync_interval_seconds' de eventos.
+
+_HEADER = struct.Struct("<IIH")
+DEFAULT_SEGMENT_BYTES: int = 16 * 1024 * 1024
+CHECKPOINT_FILE: str = "checkpoint.json"
+
+
+@dataclass(frozen=True)
+class SpoolRecord:
+    segment: int
+    offset: int
+    partition_key: str
+    data: bytes
+
+
+def _segment_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"segment-{segment:012d}.log")
+
+
+def _read_record(buffer: Any, offset: int, limit: int) -> Optional[Tuple[str, bytes, int]]:
+    """
+    Lee el registro en `offset`. Retorna (partition_key, data, siguiente offset)
+    o None si no hay un registro completo y válido.
+    """
+    if offset + _HEADER.size > limit:
+        return None
+    length, crc, key_length = _HEADER.unpack_from(buffer, offset)
+    body_start: int = offset + _HEADER.size
+    if length == 0 or key_length > length or body_start + length > limit:
+        return None
+    body: bytes = bytes(buffer[body_start:body_start + length])
+    if zlib.crc32(body) != crc:
+        return None
+    return body[:key_length].decode("utf-8"), body[key_length:], body_start + length
+
+
+class Spool:
+    """
+    Log append-only en segmentos mmap con un cursor de lectura y un checkpoint.
+    Thread-safe: el productor hace append() mientras el drainer hace read()/commit().
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self.appended = threading.Condition(self._lock)
+        self._maps: Dict[int, mmap.mmap] = {}
+        os.makedirs(directory, exist_ok=True)
+
+        segments: List[int] = sorted(
+            int(name[len("segment-"):-len(".log")])
+            for name in os.listdir(directory)
+            if name.startswith("segment-") and name.endswith(".log")
+        )
+        checkpoint: Tuple[int, int] = self._load_checkpoint() or ((segments[0], 0) if segments else (0, 0))
+        self._segments: List[int] = [s for s in segments if s >= checkpoint[0]] or [checkpoint[0]]
+        for stale in (s for s in segments if s < checkpoint[0]):
+            os.remove(_segment_path(directory, stale))
+
+        # Escritura: al final del último segmento válido
+        self._write_segment: int = self._segments[-1]
+        self._write_offset: int = self._recover_end(self._write_segment)
+        # Lectura: desde el checkpoint
+        self._read_segment, self._read_offset = checkpoint
+
+    # --- Segmentos ---
+
+    def _map(self, segment: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None:
+            path: str = _segment_path(self.directory, segment)
+            with open(path, "a+b") as f:
+                if os.path.getsize(path) < self.segment_bytes:
+                    f.truncate(self.segment_bytes)
+                mapped = mmap.mmap(f.fileno(), self.segment_bytes)
+            self._maps[segment] = mapped
+        return mapped
+
+    def _recover_end(self, segment: int) -> int:
+        """
+        Recorre el segmento hasta el primer registro inválido y limpia la cola
+        (un registro a medio escribir no debe parecer válido más adelante).
+        """
+        buffer = self._map(segment)
+        offset: int = 0
+        while (record := _read_record(buffer, offset, self.segment_bytes)) is not None:
+            offset = record[2]
+        if any(buffer[offset:offset + _HEADER.size]):
+            buffer[offset:] = bytes(self.segment_bytes - offset)
+        return offset
+
+    def _rotate(self) -> None:
+        self._write_segment += 1
+        self._write_offset = 0
+        self._segments.append(self._write_segment)
+        self._map(self._write_segment)
+
+    # --- Productor ---
+
+    def append(self, partition_key: str, data: bytes) -> None:
+        key: bytes = partition_key.encode("utf-8")
+        body: bytes = key + data
+        size: int = _HEADER.size + len(body)
+        if size > self.segment_bytes:
+            raise ValueError(f"record of {size} bytes does not fit in a {self.segment_bytes}-byte segment")
+
+        with self._lock:
+            if self._write_offset + size > self.segment_bytes:
+                self._rotate()
+            buffer = self._map(self._write_segment)
+            start: int = self._write_offset
+            buffer[start + _HEADER.size:start + size] = body
+            _HEADER.pack_into(buffer, start, len(body), zlib.crc32(body), len(key))
+            self._write_offset = start + size
+            self.appended.notify_all()
+
+    # --- Drainer ---
+
+    def read(self, max_records: int) -> List[SpoolRecord]:
+        """
+        Siguientes registros no leídos, en orden de escritura.
+        """
+        records: List[SpoolRecord] = []
+        with self._lock:
+            while len(records) < max_records:
+                at_writer: bool = self._read_segment == self._write_segment
+                limit: int = self._write_offset if at_writer else self.segment_bytes
+                record = _read_record(self._map(self._read_segment), self._read_offset, limit)
+                if record is None:
+                    if at_writer:
+                        break
+                    # Fin de un segmento cerrado: pasar al siguiente
+                    self._read_segment = self._segments[self._segments.index(self._read_segment) + 1]
+                    self._read_offset = 0
+                    continue
+                partition_key, data, next_offset = record
+                records.append(SpoolRecord(self._read_segment, self._read_offset, partition_key, data))
+                self._read_offset = next_offset
+        return records
+
+    def has_unread(self) -> bool:
+        with self._lock:
+            return (self._read_segment, self._read_offset) != (self._write_segment, self._write_offset)
+
+    def read_position(self) -> Tuple[int, int]:
+        with self._lock:
+            return self._read_segment, self._read_offset
+
+    def commit(self, position: Tuple[int, int]) -> None:
+        """
+        Confirma todo lo anterior a `position` y borra los segmentos ya drenados.
+        """
+        path: str = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            for segment in [s for s in self._segments if s < position[0]]:
+                self._segments.remove(segment)
+                mapped = self._maps.pop(segment, None)
+                if mapped is not None:
+                    mapped.close()
+                os.remove(_segment_path(self.directory, segment))
+
+    def _load_checkpoint(self) -> Optional[Tuple[int, int]]:
+        path: str = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            checkpoint: Dict[str, int] = json.load(f)
+        return int(checkpoint["segment"]), int(checkpoint["offset"])
+
+    def sync(self) -> None:
+        with self._lock:
+            self._maps[self._write_segment].flush()
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.flush()
+                mapped.close()
+            self._maps.clear()
+
+
+# ==============================
+# Drenado asíncrono a Kinesis
+# ==============================
+
+class SpoolDrainer:
+    """
+    Hilo que drena el spool con PutRecords (hasta 500 registros por lote).
+
+    Orden por partition key: si el registro i de una clave falla, se
+    retienen i y todos los posteriores de esa clave en el lote (aunque
+    hayan entrado) y se reenvían antes que cualquier registro nuevo. Así el
+    último valor que llega por clave respeta el orden de escritura; los
+    duplicados que esto genera los absorbe el processor idempotente.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        kinesis_client: Any,
+        stream_name: str,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        batch_size: int = PUT_RECORDS_MAX_BATCH,
+        linger_seconds: float = 0.05,
+        sync_interval_seconds: float = 1.0,
+        max_attempts_on_stop: int = 10,
+        partitioner: Optional[PartitionStrategy] = None,
+    ) -> None:
+        self.spool = spool
+        self.kinesis_client = kinesis_client
+        self.stream_name = stream_name
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.batch_size = min(batch_size, PUT_RECORDS_MAX_BATCH)
+        self.linger_seconds = linger_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self.max_attempts_on_stop = max_attempts_on_stop
+        self.partitioner = partitioner
+        self.stats: Dict[str, int] = {"batches": 0, "drained": 0, "retried": 0, "send_errors": 0}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SpoolDrainer":
+        self._thread = threading.Thread(target=self._run, name="spool-drainer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Termina de drenar lo pendiente (o hasta 'timeout') y detiene el hilo.
+        """
+        self._stopping.set()
+        with self.spool.appended:
+            self.spool.appended.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _send(self, batch: List[SpoolRecord]) -> List[SpoolRecord]:
+        """
+        Envía un lote y retorna los registros a retener (en orden).
+        """
+        # El spool guarda el símbolo; la ruta al shard se decide al enviar
+        entries: List[Dict[str, Any]] = [
+            build_put_records_entry(r.partition_key, r.data, self.partitioner) for r in batch
+        ]
+        # Cada reintento vuelve a pasar por aquí: también espera sus tokens
+        self.rate_limiter.acquire_entries(entries)
+        metrics.count("RecordsPerBatch", len(entries))
+        with metrics.timer("PutRecordsLatency"):
+            response: Dict[str, Any] = self.kinesis_client.put_records(StreamName=self.stream_name, Records=entries)
+        record_put_records_outcome(self.rate_limiter, entries, response)
+        if not response.get("FailedRecordCount"):
+            return []
+
+        failed_keys = set()
+        retained: List[SpoolRecord] = []
+        for record, result in zip(batch, response["Records"]):
+            if "ErrorCode" in result:
+                failed_keys.add(record.partition_key)
+            if record.partition_key in failed_keys:
+                retained.append(record)
+        return retained
+
+    def _run(self) -> None:
+        retained: List[SpoolRecord] = []
+        attempt: int = 0
+        last_sync: float = time.monotonic()
+
+        while True:
+            if time.monotonic() - last_sync >= self.sync_interval_seconds:
+                self.spool.sync()
+                last_sync = time.monotonic()
+
+            batch: List[SpoolRecord] = retained + self.spool.read(self.batch_size - len(retained))
+            if not batch:
+                if self._stopping.is_set():
+                    break
+                with self.spool.appended:
+                    self.spool.appended.wait(self.linger_seconds)
+                continue
+
+            try:
+                retained = self._send(batch)
+            except Exception as e:
+                # Kinesis inalcanzable: todo el lote queda retenido
+                log.warning("Spool drain PutRecords failed, will retry", error=str(e), retained=len(batch))
+                self.stats["send_errors"] += 1
+                retained = batch
+
+            drained: int = len(batch) - len(retained)
+            self.stats["batches"] += 1
+            self.stats["drained"] += drained
+            self.stats["retried"] += len(retained)
+            self.spool.commit((retained[0].segment, retained[0].offset) if retained else self.spool.read_position())
+
+            # El backoff crece solo mientras no hay progreso
+            attempt = 0 if drained else attempt + 1
+            if retained:
+                if self._stopping.is_set() and attempt >= self.max_attempts_on_stop:
+                    # Al cerrar no reintentamos indefinidamente: queda en disco
+                    break
+                time.sleep(backoff_delay(attempt))
+
+        self.spool.sync()
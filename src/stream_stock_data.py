@@ -18,6 +18,7 @@ def get_stock_data(symbol):
         if len(data) < 2:
             raise ValueError("Insufficient data to fetch previous close.")
 
+        now = time.time()
         stock_data = {
             "symbol": symbol,
             "open": round(data.iloc[-1]["Open"], 2),
@@ -28,7 +29,8 @@ def get_stock_data(symbol):
             "change": round(data.iloc[-1]["Close"] - data.iloc[-2]["Close"], 2),
             "change_percent": round(((data.iloc[-1]["Close"] - data.iloc[-2]["Close"]) / data.iloc[-2]["Close"]) * 100, 2),
             "volume": int(data.iloc[-1]["Volume"]),
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "timestamp_ms": int(now * 1000)
         }
         return stock_data
     except Exception as e:
@@ -1,13 +1,38 @@
 from __future__ import annotations
 
 import json
+import os
+import sys
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, TypedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, TypedDict
 
 import boto3
 import yfinance as yf
 
+from partitioning import PartitionStrategy
+from throttling import THROTTLE_ERROR_CODES, AdaptiveRateLimiter, backoff_delay
+
+if TYPE_CHECKING:
+    from spool import Spool
+
+# Logging estructurado compartido con las Lambdas (pipeline_core vive junto
+# a los handlers; se importa desde el árbol del repo, como en tools/)
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+from pipeline_core.logs import get_logger  # noqa: E402
+from pipeline_core.metrics import MetricsBuffer  # noqa: E402
+from pipeline_core.tracing import start_trace  # noqa: E402
+
+# Una línea JSON por evento; el detalle por tick se muestrea (LOG_SAMPLE_RATE)
+log = get_logger("producer")
+
+# Métricas EMF (FetchLatency, KinesisPutLatency, RecordsPerBatch...): se
+# acumulan en memoria y se escriben junto con log_producer_metrics
+metrics = MetricsBuffer("producer")
+
 # ==============================
 # 1) Tipos (Type Hints)
 # ==============================
@@ -22,6 +47,10 @@ class StockData(TypedDict):
     - change/change_percent: variación vs previous_close
     - volume: volumen del último día disponible
     - timestamp: timestamp en formato ISO-like UTC (Z)
+    - timestamp_ms: el mismo instante en epoch milisegundos (sort key numérica)
+
+    Al enviar se agregan trace_id y sent_ms (ver pipeline_core/tracing.py);
+    cada etapa posterior suma su propio timestamp.
     """
     symbol: str
     open: float
@@ -33,6 +62,7 @@ class StockData(TypedDict):
     change_percent: float
     volume: int
     timestamp: str
+    timestamp_ms: int
 
 # Clase inmutable para configuración
 @dataclass(frozen=True)
@@ -100,6 +130,9 @@ def get_stock_data(symbol: str) -> Optional[StockData]:
         # Evitamos división por cero por robustez
         change_percent: float = (change / prev_close) * 100 if prev_close != 0 else 0.0
 
+        # Un único instante para ambas representaciones del timestamp
+        now: float = time.time()
+
         stock_data: StockData = {
             "symbol": symbol,
             "open": round(float(last_row["Open"]), 2),
@@ -111,14 +144,15 @@ def get_stock_data(symbol: str) -> Optional[StockData]:
             "change_percent": round(change_percent, 2),
             "volume": int(last_row["Volume"]),
             # Timestamp en UTC con sufijo Z, similar a ISO 8601
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            # Epoch en milisegundos: se compara numéricamente en DynamoDB
+            "timestamp_ms": int(now * 1000),
         }
 
         return stock_data
 
     except Exception as e:
-        # En un proyecto real, esto iría a logs estructurados (CloudWatch, etc.)
-        print(f"[get_stock_data] Error fetching stock data for {symbol}: {e}")
+        log.warning("Error fetching stock data", symbol=symbol, error=str(e))
         return None
 
 # ==============================
@@ -130,85 +164,202 @@ def put_record_to_kinesis(
     stream_name: str,
     partition_key: str,
     payload: StockData,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    explicit_hash_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Envía un evento (payload) a Kinesis usando put_record.
 
-    - Data: debe ser bytes o string -> aquí usamos json.dumps(payload)
+    - Data: debe ser bytes o string -> aquí usamos json.dumps(payload),
+      con trace_id y sent_ms agregados (tracing de latencia)
     - PartitionKey: clave para enrutar a un shard (y mantener orden dentro de esa clave)
+    - rate_limiter: si se pasa, limita la tasa por partition key y reintenta
+      los throttles con backoff (ver throttling.py)
+    - explicit_hash_key: fija el shard sin depender del hash de la clave
+      (ver partitioning.py)
 
     Retorna:
     - el response dict de boto3 (incluye ShardId, SequenceNumber, ResponseMetadata, etc.)
     """
-    response: Dict[str, Any] = kinesis_client.put_record(
-        StreamName=stream_name,
-        Data=json.dumps(payload),
-        PartitionKey=partition_key,
+    data: str = json.dumps(start_trace(payload))
+    extra: Dict[str, str] = {"ExplicitHashKey": explicit_hash_key} if explicit_hash_key else {}
+
+    def send() -> Dict[str, Any]:
+        return kinesis_client.put_record(
+            StreamName=stream_name,
+            Data=data,
+            PartitionKey=partition_key,
+            **extra,
+        )
+
+    if rate_limiter is None:
+        return send()
+    return rate_limiter.call(partition_key, send)
+
+
+# PutRecords acepta como máximo 500 registros por llamada
+PUT_RECORDS_MAX_BATCH: int = 500
+
+
+def put_records_to_kinesis(
+    kinesis_client: Any,
+    stream_name: str,
+    records: List[Tuple[str, bytes]],
+    max_retries: int = 3,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    partitioner: Optional[PartitionStrategy] = None,
+) -> int:
+    """
+    Envía muchos eventos ya serializados con PutRecords (lotes de 500).
+
+    - records: lista de (partition_key, data)
+    - Los registros que Kinesis rechaza individualmente (FailedRecordCount > 0,
+      típicamente por throttling) se reintentan hasta 'max_retries' veces,
+      con backoff exponencial + jitter.
+    - rate_limiter: si se pasa, cada envío (y cada reintento) espera los
+      tokens de sus partition keys, y el resultado por clave ajusta la
+      tasa (AIMD) y cuenta éxitos/throttles en sus métricas.
+    - partitioner: traduce cada clave (símbolo) a PartitionKey/ExplicitHashKey.
+
+    Retorna:
+    - cantidad de registros que no se pudieron enviar
+    """
+    failed_total: int = 0
+    for start in range(0, len(records), PUT_RECORDS_MAX_BATCH):
+        pending: List[Dict[str, Any]] = [
+            build_put_records_entry(key, data, partitioner)
+            for key, data in records[start:start + PUT_RECORDS_MAX_BATCH]
+        ]
+        for attempt in range(max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire_entries(pending)
+            metrics.count("RecordsPerBatch", len(pending))
+            with metrics.timer("PutRecordsLatency"):
+                response: Dict[str, Any] = kinesis_client.put_records(StreamName=stream_name, Records=pending)
+            if rate_limiter is not None:
+                record_put_records_outcome(rate_limiter, pending, response)
+            if not response.get("FailedRecordCount"):
+                pending = []
+                break
+            # La respuesta mantiene el orden: nos quedamos solo con los que fallaron
+            pending = [
+                entry for entry, result in zip(pending, response["Records"])
+                if "ErrorCode" in result
+            ]
+            if attempt < max_retries:
+                if rate_limiter is not None:
+                    rate_limiter.metrics.increment("retries", len(pending))
+                time.sleep(backoff_delay(attempt))
+        failed_total += len(pending)
+    if rate_limiter is not None and failed_total:
+        rate_limiter.metrics.increment("errors", failed_total)
+    return failed_total
+
+
+def build_put_records_entry(
+    symbol: str, data: bytes, partitioner: Optional[PartitionStrategy] = None
+) -> Dict[str, Any]:
+    if partitioner is None:
+        return {"PartitionKey": symbol, "Data": data}
+    partition_key, explicit_hash_key = partitioner.route(symbol)
+    entry: Dict[str, Any] = {"PartitionKey": partition_key, "Data": data}
+    if explicit_hash_key is not None:
+        entry["ExplicitHashKey"] = explicit_hash_key
+    return entry
+
+
+def record_put_records_outcome(
+    rate_limiter: AdaptiveRateLimiter,
+    entries: List[Dict[str, Any]],
+    response: Dict[str, Any],
+) -> None:
+    """
+    Traduce el resultado por registro de PutRecords a contadores y AIMD.
+    """
+    succeeded: Dict[str, int] = {}
+    throttled_keys = set()
+    for entry, result in zip(entries, response["Records"]):
+        key: str = entry["PartitionKey"]
+        if "ErrorCode" not in result:
+            succeeded[key] = succeeded.get(key, 0) + 1
+        elif result["ErrorCode"] in THROTTLE_ERROR_CODES:
+            throttled_keys.add(key)
+            rate_limiter.metrics.increment("throttled")
+    rate_limiter.metrics.increment("success", sum(succeeded.values()))
+    for key, count in succeeded.items():
+        if key not in throttled_keys:
+            rate_limiter.on_success(key, count)
+    for key in throttled_keys:
+        rate_limiter.on_throttle(key)
+
+
+# Cada cuántos envíos se imprimen los contadores del productor
+METRICS_LOG_EVERY: int = 100
+
+
+def send_to_kinesis_loop(
+    config: AppConfig,
+    kinesis_client: Optional[Any] = None,
+    fetch_stock_data: Callable[[str], Optional[StockData]] = get_stock_data,
+    max_events: Optional[int] = None,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    spool: Optional[Spool] = None,
+    partitioner: Optional[PartitionStrategy] = None,
+) -> Dict[str, int]:
+    """
+    Loop infinito (productor continuo) para un símbolo:
+    - Cada 'delay_seconds' obtiene datos desde yfinance y los envía a Kinesis.
+
+    Es un PollingSource de un solo símbolo enviado con
+    send_source_to_kinesis (ver market_data_sources.py), que aplica el
+    rate limiter, el spool y el partitioner.
+
+    Se detiene con CTRL+C (KeyboardInterrupt), o tras 'max_events' envíos.
+
+    'kinesis_client' y 'fetch_stock_data' permiten inyectar stand-ins
+    (ver src/local_pipeline.py); por defecto se usan boto3 y yfinance.
+
+    Con 'spool' (ver spool.py) el evento se escribe en disco; quien lo pasa
+    es responsable de su SpoolDrainer.
+
+    Retorna los contadores de send_source_to_kinesis (sent / failed).
+    """
+    # Import diferido: market_data_sources importa este módulo
+    from market_data_sources import PollingSource, send_source_to_kinesis
+
+    if kinesis_client is None:
+        kinesis_client = build_kinesis_client(config.region_name)
+
+    log.info(
+        "Stock streaming started (CTRL+C to stop)",
+        region=config.region_name,
+        stream=config.stream_name,
+        symbol=config.stock_symbol,
+        delay_seconds=config.delay_seconds,
+    )
+    source = PollingSource([config.stock_symbol], config.delay_seconds, fetch=fetch_stock_data)
+    return send_source_to_kinesis(
+        source,
+        kinesis_client,
+        config.stream_name,
+        max_events=max_events,
+        rate_limiter=rate_limiter,
+        spool=spool,
+        partitioner=partitioner,
+    )
+
+
+def log_producer_metrics(rate_limiter: AdaptiveRateLimiter) -> None:
+    """
+    Exporta los contadores como una línea JSON (fácil de filtrar en logs)
+    y vacía el buffer de métricas EMF.
+    """
+    log.info(
+        "Producer metrics",
+        producer_metrics=rate_limiter.metrics.snapshot(),
+        rates_per_key=rate_limiter.rates(),
     )
-    return response
-
-
-def send_to_kinesis_loop(config: AppConfig) -> None:
-    """
-    Loop infinito (productor continuo):
-    - Cada 'delay_seconds':
-      1) Obtiene datos desde yfinance
-      2) Si ok, los serializa a JSON
-      3) Los envía a Kinesis
-      4) Imprime la respuesta para depuración
-
-    Se detiene con CTRL+C (KeyboardInterrupt).
-    """
-    kinesis_client: Any = build_kinesis_client(config.region_name)
-
-    print("=== Stock streaming started ===")
-    print(f"Region: {config.region_name}")
-    print(f"Stream: {config.stream_name}")
-    print(f"Symbol: {config.stock_symbol}")
-    print(f"Delay:  {config.delay_seconds}s")
-    print("Press CTRL+C to stop.\n")
-
-    while True:
-        try:
-            # 1) Obtener el evento stock desde Yahoo Finance
-            stock_data: Optional[StockData] = get_stock_data(config.stock_symbol)
-
-            # 2) Si no hay data (falló la API o data incompleta), esperamos y reintentamos
-            if stock_data is None:
-                print("\t[send_to_kinesis_loop] Skipping iteration due to API/data error.")
-                time.sleep(config.delay_seconds)
-                continue
-
-            # 3) Log local (solo para veamos el evento)
-            print(f"\n\n\t[send_to_kinesis_loop] Sending: {stock_data}")
-
-            # 4) Enviar a Kinesis
-            response: Dict[str, Any] = put_record_to_kinesis(
-                kinesis_client=kinesis_client,
-                stream_name=config.stream_name,
-                partition_key=config.stock_symbol,  # misma clave => orden para ese símbolo
-                payload=stock_data,
-            )
-
-            # 5) Revisar status HTTP de la respuesta
-            http_status: int = int(response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0))
-
-            if http_status == 200:
-                print(f"[send_to_kinesis_loop] Kinesis OK: ShardId={response.get('ShardId')} "
-                      f"Seq={response.get('SequenceNumber')}\n")
-            else:
-                print(f"\t[send_to_kinesis_loop] Kinesis ERROR response: {response}\n")
-
-            # 6) Esperar antes del siguiente evento
-            time.sleep(config.delay_seconds)
-
-        except KeyboardInterrupt:
-            # Esto ocurre cuando haces CTRL+C
-            print("\n=== Stopped by user (CTRL+C) ===")
-            break
-        except Exception as e:
-            print(f"[send_to_kinesis_loop] Unexpected error: {e}")
-            time.sleep(config.delay_seconds)
+    metrics.flush()
 
 
 # ==============================
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from stream_stock_data_refactoring import StockData, build_kinesis_client, put_records_to_kinesis
+from partitioning import PartitionStrategy, build_partitioner
+from throttling import AdaptiveRateLimiter
+
+# ==============================
+# Fuente sintética de ticks (carga alta)
+# ==============================
+#
+# yfinance entrega barras diarias: no alcanza para generar miles de eventos
+# distintos por segundo. Esta fuente simula un mercado con un movimiento
+# browniano geométrico (GBM) por símbolo:
+#
+#   S(t+dt) = S(t) * exp((mu - sigma^2 / 2) dt + sigma sqrt(dt) Z),  Z ~ N(0, 1)
+#
+# más saltos anómalos inyectados con probabilidad configurable (para que la
+# trend Lambda tenga algo que alertar).
+#
+# Dos formas de uso:
+#   1) market.fetch(symbol): misma firma que get_stock_data, se enchufa en
+#      send_to_kinesis_loop(fetch_stock_data=market.fetch)
+#   2) market.generate_batch(steps): genera `steps` ticks de TODOS los
+#      símbolos de una vez (numpy vectorizado) ya serializados, para
+#      enviarlos con PutRecords. Así un solo proceso supera 50k eventos/s.
+#
+# Uso:
+#   python src/synthetic_source.py --symbols 500 --rate 50000 --duration 10 --local
+
+# Segundos de mercado en un año (252 sesiones de 6.5 h): dt del GBM en años
+TRADING_SECONDS_PER_YEAR: float = 252 * 6.5 * 3600
+
+# Serialización con formato fijo: mismo JSON que json.dumps(start_trace(StockData))
+# pero sin construir un dict por evento
+_EVENT_TEMPLATE: str = (
+    '{"symbol": "%s", "open": %.2f, "high": %.2f, "low": %.2f, "price": %.2f, '
+    '"previous_close": %.2f, "change": %.2f, "change_percent": %.2f, '
+    '"volume": %d, "timestamp": "%s", "timestamp_ms": %d, "trace_id": "%s", "sent_ms": %d}'
+)
+
+
+@dataclass(frozen=True)
+class SyntheticMarketConfig:
+    """
+    - symbol_count / symbols: universo simulado (symbols tiene prioridad)
+    - tick_rate: eventos por segundo en total (todos los símbolos)
+    - mu / sigma: drift y volatilidad anualizados del GBM
+    - anomaly_probability: probabilidad por tick de un salto de precio
+    - anomaly_magnitude: tamaño relativo del salto (0.05 = ±5 %)
+    """
+    symbol_count: int = 100
+    symbols: Optional[Tuple[str, ...]] = None
+    tick_rate: float = 1000.0
+    mu: float = 0.05
+    sigma: float = 0.25
+    initial_price_min: float = 20.0
+    initial_price_max: float = 500.0
+    anomaly_probability: float = 0.0005
+    anomaly_magnitude: float = 0.05
+    seed: int = 42
+
+
+class SyntheticMarket:
+    """
+    Estado vectorizado del mercado: un arreglo por campo, una posición por símbolo.
+    previous_close es el precio inicial (la "sesión" simulada empieza al crear el mercado).
+    """
+
+    def __init__(self, config: SyntheticMarketConfig) -> None:
+        self.config = config
+        self.symbols: List[str] = list(config.symbols or (f"SYN{i:04d}" for i in range(config.symbol_count)))
+        self._index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._rng = np.random.default_rng(config.seed)
+        self._lock = threading.Lock()
+
+        n: int = len(self.symbols)
+        self.previous_close: np.ndarray = self._rng.uniform(config.initial_price_min, config.initial_price_max, n)
+        self.open: np.ndarray = self.previous_close.copy()
+        self.price: np.ndarray = self.previous_close.copy()
+        self.high: np.ndarray = self.previous_close.copy()
+        self.low: np.ndarray = self.previous_close.copy()
+        self.volume: np.ndarray = np.zeros(n, dtype=np.int64)
+
+        # Cada símbolo recibe tick_rate / n ticks por segundo
+        self.tick_interval_seconds: float = n / config.tick_rate
+        dt: float = self.tick_interval_seconds / TRADING_SECONDS_PER_YEAR
+        self._drift: float = (config.mu - 0.5 * config.sigma ** 2) * dt
+        self._diffusion: float = config.sigma * np.sqrt(dt)
+        self._clock_ms: float = time.time() * 1000
+        # Último timestamp_ms entregado por fetch(), por símbolo
+        self._last_fetch_ms: Dict[str, int] = {}
+
+    # --- GBM ---
+
+    def _log_returns(self, shape: Tuple[int, ...]) -> np.ndarray:
+        returns = self._drift + self._diffusion * self._rng.standard_normal(shape)
+        if self.config.anomaly_probability > 0:
+            jumps = self._rng.random(shape) < self.config.anomaly_probability
+            signs = np.where(self._rng.random(shape) < 0.5, -1.0, 1.0)
+            returns = returns + jumps * np.log1p(signs * self.config.anomaly_magnitude)
+        return returns
+
+    def generate_batch(self, steps: int) -> List[Tuple[str, bytes]]:
+        """
+        Avanza `steps` ticks para todos los símbolos y devuelve
+        [(partition_key, json_bytes), ...] en orden temporal.
+        """
+        n: int = len(self.symbols)
+        with self._lock:
+            # Trayectorias (steps, n) a partir del último precio
+            paths: np.ndarray = self.price * np.exp(np.cumsum(self._log_returns((steps, n)), axis=0))
+            highs: np.ndarray = np.maximum.accumulate(np.vstack([self.high, paths]), axis=0)[1:]
+            lows: np.ndarray = np.minimum.accumulate(np.vstack([self.low, paths]), axis=0)[1:]
+            volumes: np.ndarray = self.volume + np.cumsum(self._rng.integers(1, 500, (steps, n)), axis=0)
+
+            self.price, self.high, self.low, self.volume = paths[-1], highs[-1], lows[-1], volumes[-1]
+
+            step_ms: float = self.tick_interval_seconds * 1000
+            times_ms: np.ndarray = self._clock_ms + step_ms * np.arange(1, steps + 1)
+            self._clock_ms = float(times_ms[-1])
+
+        change: np.ndarray = paths - self.previous_close
+        change_percent: np.ndarray = change / self.previous_close * 100
+
+        records: List[Tuple[str, bytes]] = []
+        symbols: List[str] = self.symbols
+        # Se envía enseguida: sent_ms = momento de generación del lote
+        sent_ms: int = int(time.time() * 1000)
+        opens: List[float] = self.open.tolist()
+        prev_closes: List[float] = self.previous_close.tolist()
+        for step in range(steps):
+            epoch_ms: int = int(times_ms[step])
+            iso: str = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch_ms / 1000))
+            records.extend(
+                (
+                    symbol,
+                    (
+                        _EVENT_TEMPLATE
+                        % (symbol, o, h, lo, p, pc, c, cp, v, iso, epoch_ms, os.urandom(8).hex(), sent_ms)
+                    ).encode("utf-8"),
+                )
+                for symbol, o, h, lo, p, pc, c, cp, v in zip(
+                    symbols, opens, highs[step].tolist(), lows[step].tolist(), paths[step].tolist(),
+                    prev_closes, change[step].tolist(), change_percent[step].tolist(), volumes[step].tolist(),
+                )
+            )
+        return records
+
+    # --- Interfaz compatible con get_stock_data ---
+
+    def fetch(self, symbol: str) -> Optional[StockData]:
+        """
+        Un tick del símbolo, con la misma forma que get_stock_data.
+        Retorna None para símbolos desconocidos (igual que un error de la API).
+
+        timestamp_ms es estrictamente creciente por símbolo (a lo sumo se
+        adelanta 1 ms al reloj): dos ticks del mismo milisegundo tendrían la
+        misma clave en DynamoDB y el segundo pisaría al primero.
+        """
+        index: Optional[int] = self._index.get(symbol)
+        if index is None:
+            return None
+        with self._lock:
+            price = float(self.price[index] * np.exp(self._log_returns(())))
+            self.price[index] = price
+            self.high[index] = max(self.high[index], price)
+            self.low[index] = min(self.low[index], price)
+            self.volume[index] += int(self._rng.integers(1, 500))
+            high, low, volume = float(self.high[index]), float(self.low[index]), int(self.volume[index])
+            epoch_ms: int = max(int(time.time() * 1000), self._last_fetch_ms.get(symbol, 0) + 1)
+            self._last_fetch_ms[symbol] = epoch_ms
+
+        prev_close: float = float(self.previous_close[index])
+        change: float = price - prev_close
+        return {
+            "symbol": symbol,
+            "open": round(float(self.open[index]), 2),
+            "high": round(high, 2),
+            "low": round(low, 2),
+            "price": round(price, 2),
+            "previous_close": round(prev_close, 2),
+            "change": round(change, 2),
+            "change_percent": round(change / prev_close * 100, 2),
+            "volume": volume,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch_ms / 1000)),
+            "timestamp_ms": epoch_ms,
+        }
+
+
+# ==============================
+# Envío a alta tasa
+# ==============================
+
+def stream_synthetic(
+    kinesis_client: Any,
+    stream_name: str,
+    market: SyntheticMarket,
+    duration_seconds: float,
+    batch_interval_seconds: float = 0.1,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    partitioner: Optional[PartitionStrategy] = None,
+) -> Dict[str, Any]:
+    """
+    Genera y envía ticks a market.config.tick_rate durante 'duration_seconds'.
+    Cada 'batch_interval_seconds' se genera el lote correspondiente y se
+    envía con PutRecords; si el envío se atrasa, el siguiente lote lo compensa.
+    Los contadores de éxitos/throttles salen en el resultado ("producer_metrics").
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter()
+    n: int = len(market.symbols)
+    steps_per_second: float = market.config.tick_rate / n
+    started: float = time.time()
+    sent, failed, steps_done = 0, 0, 0
+
+    while True:
+        elapsed: float = time.time() - started
+        if elapsed >= duration_seconds:
+            break
+        target_steps: int = int(min(elapsed + batch_interval_seconds, duration_seconds) * steps_per_second)
+        steps: int = target_steps - steps_done
+        if steps <= 0:
+            time.sleep(batch_interval_seconds / 4)
+            continue
+
+        records = market.generate_batch(steps)
+        failed_now: int = put_records_to_kinesis(
+            kinesis_client, stream_name, records, rate_limiter=rate_limiter, partitioner=partitioner
+        )
+        sent += len(records) - failed_now
+        failed += failed_now
+        steps_done = target_steps
+
+    elapsed = time.time() - started
+    return {
+        "sent": sent,
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_second": round(sent / elapsed, 1) if elapsed else 0.0,
+        "producer_metrics": rate_limiter.metrics.snapshot(),
+        "partitioning": partitioner.describe() if partitioner else {"mode": "symbol"},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic GBM tick generator")
+    parser.add_argument("--symbols", type=int, default=500, help="number of simulated symbols")
+    parser.add_argument("--rate", type=float, default=50_000, help="total events per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--anomaly-probability", type=float, default=0.0005)
+    parser.add_argument("--anomaly-magnitude", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--stream", default="stock-market-stream")
+    parser.add_argument("--partition-mode", choices=["symbol", "salted", "explicit"], default="symbol")
+    parser.add_argument("--salts", type=int, default=4)
+    parser.add_argument("--local", action="store_true", help="send to the in-memory Kinesis stand-in")
+    parser.add_argument("--local-shards", type=int, default=4)
+    parser.add_argument("--local-shard-limit", type=int, default=None,
+                        help="simulated records/s per shard for --local (AWS: 1000)")
+    args = parser.parse_args()
+
+    market = SyntheticMarket(
+        SyntheticMarketConfig(
+            symbol_count=args.symbols,
+            tick_rate=args.rate,
+            anomaly_probability=args.anomaly_probability,
+            anomaly_magnitude=args.anomaly_magnitude,
+            seed=args.seed,
+        )
+    )
+
+    if args.local:
+        from local_aws import LocalKinesis
+        kinesis_client: Any = LocalKinesis(
+            stream_name=args.stream,
+            shard_count=args.local_shards,
+            shard_records_per_second=args.local_shard_limit,
+        )
+    else:
+        kinesis_client = build_kinesis_client(args.region)
+
+    partitioner = build_partitioner(args.partition_mode, kinesis_client, args.stream, salts=args.salts)
+    result: Dict[str, Any] = stream_synthetic(kinesis_client, args.stream, market, args.duration, partitioner=partitioner)
+    if args.local:
+        result["records_per_shard"] = {shard.shard_id: len(shard.records) for shard in kinesis_client.shards}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
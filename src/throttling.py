@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+# ==============================
+# Rate limiting y backoff adaptativo del productor
+# ==============================
+#
+# Un shard de Kinesis acepta ~1000 registros/s. Todas las escrituras de una
+# partition key caen en el mismo shard, así que limitamos por partition key:
+#
+#   - TokenBucket: tasa máxima por clave (bloquea hasta que haya token)
+#   - AIMD: cada éxito sube la tasa un poco (aditivo), cada throttle la
+#     reduce a la mitad (multiplicativo). La tasa converge al máximo que
+#     el shard sostiene, sin un sleep fijo.
+#   - Backoff exponencial con "full jitter" entre reintentos de un throttle,
+#     para que los productores no reintenten todos al mismo tiempo.
+#
+# ProducerMetrics lleva los contadores (éxitos, throttles, reintentos,
+# errores); `snapshot()` los exporta como dict para logs/métricas.
+
+THROTTLE_ERROR_CODES = frozenset({
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+})
+
+# Límite de escritura de un shard (registros por segundo)
+SHARD_RECORDS_PER_SECOND: float = 1000.0
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def backoff_delay(attempt: int, base_seconds: float = 0.05, cap_seconds: float = 5.0) -> float:
+    """
+    Full jitter: uniforme entre 0 y min(cap, base * 2^attempt).
+    """
+    return random.uniform(0, min(cap_seconds, base_seconds * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe. `rate` tokens por segundo, ráfaga máxima `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity if capacity is not None else max(1.0, rate)
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Bloquea hasta consumir `tokens`. Retorna los segundos esperados.
+        """
+        waited: float = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait: float = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    """
+    - initial_rate / min_rate / max_rate: registros/s por partition key
+    - additive_increase: registros/s que se suman por cada segundo de
+      envíos exitosos (incremento por registro = additive_increase / tasa)
+    - multiplicative_decrease: factor aplicado a la tasa en cada throttle
+    - max_attempts: intentos por registro antes de propagar el throttle
+    """
+    initial_rate: float = 100.0
+    min_rate: float = 1.0
+    max_rate: float = SHARD_RECORDS_PER_SECOND
+    additive_increase: float = 50.0
+    multiplicative_decrease: float = 0.5
+    max_attempts: int = 8
+    backoff_base_seconds: float = 0.05
+    backoff_cap_seconds: float = 5.0
+
+
+class ProducerMetrics:
+    """
+    Contadores del productor (thread-safe).
+    """
+
+    COUNTERS = ("success", "throttled", "retries", "errors", "rate_limited_wait_ms")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {name: 0 for name in self.COUNTERS}
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(value, 3) for name, value in self._counters.items()}
+
+
+class AdaptiveRateLimiter:
+    """
+    Un TokenBucket por partition key con ajuste AIMD, y ejecución de
+    llamadas a Kinesis con reintento ante throttling (`call`).
+    """
+
+    def __init__(self, config: RateLimitConfig = RateLimitConfig(), metrics: Optional[ProducerMetrics] = None) -> None:
+        self.config = config
+        self.metrics = metrics or ProducerMetrics()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, partition_key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(partition_key)
+            if bucket is None:
+                bucket = self._buckets[partition_key] = TokenBucket(self.config.initial_rate)
+            return bucket
+
+    def on_success(self, partition_key: str, records: int = 1) -> None:
+        bucket = self._bucket(partition_key)
+        rate = min(self.config.max_rate, bucket.rate + self.config.additive_increase * records / bucket.rate)
+        if rate != bucket.rate:
+            bucket.set_rate(rate)
+
+    def on_throttle(self, partition_key: str) -> None:
+        bucket = self._bucket(partition_key)
+        bucket.set_rate(max(self.config.min_rate, bucket.rate * self.config.multiplicative_decrease))
+
+    def rates(self) -> Dict[str, float]:
+        with self._lock:
+            return {key: round(bucket.rate, 1) for key, bucket in self._buckets.items()}
+
+    def acquire(self, partition_key: str, records: int = 1) -> None:
+        bucket = self._bucket(partition_key)
+        waited: float = 0.0
+        # De a lo sumo `capacity` tokens por vez: un lote más grande que la
+        # ráfaga del bucket nunca juntaría todos los tokens de una
+        while records > 0:
+            chunk: int = min(records, max(1, int(bucket.capacity)))
+            waited += bucket.acquire(chunk)
+            records -= chunk
+        if waited:
+            self.metrics.increment("rate_limited_wait_ms", waited * 1000)
+
+    def acquire_entries(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Tokens para un lote PutRecords: por cada PartitionKey, tantos como
+        registros lleva en el lote.
+        """
+        counts: Dict[str, int] = {}
+        for entry in entries:
+            counts[entry["PartitionKey"]] = counts.get(entry["PartitionKey"], 0) + 1
+        for partition_key, records in counts.items():
+            self.acquire(partition_key, records)
+
+    def call(self, partition_key: str, operation: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Ejecuta `operation` (p.ej. un put_record) respetando la tasa de la
+        clave. Ante throttle: baja la tasa, espera con jitter y reintenta
+        hasta max_attempts; después propaga el error. Otros errores se
+        propagan de inmediato.
+        """
+        for attempt in range(self.config.max_attempts):
+            self.acquire(partition_key)
+            try:
+                response: Dict[str, Any] = operation()
+            except Exception as e:
+                if not is_throttle_error(e):
+                    self.metrics.increment("errors")
+                    raise
+                self.metrics.increment("throttled")
+                self.on_throttle(partition_key)
+                if attempt == self.config.max_attempts - 1:
+                    self.metrics.increment("errors")
+                    raise
+                self.metrics.increment("retries")
+                time.sleep(backoff_delay(attempt, self.config.backoff_base_seconds, self.config.backoff_cap_seconds))
+                continue
+            self.metrics.increment("success")
+            self.on_success(partition_key)
+            return response
+        raise RuntimeError("unreachable")
@@ -0,0 +1,148 @@
+# tests/conftest.py
+"""
+Shared fixtures: the Lambda handlers and src/ modules run against the
+in-memory stand-ins of src/local_aws.py (no AWS account, no network).
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [
+    os.path.join(ROOT, "src"),
+    os.path.join(ROOT, "infra", "pulumi", "project", "lambdas"),
+]
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from local_aws import LocalDynamoDB, LocalKinesis, LocalSNS  # noqa: E402
+from local_pipeline import load_lambda_module  # noqa: E402
+from pipeline_core.timestamps import format_iso  # noqa: E402
+
+TICK_TABLE: str = "ticks"
+LATEST_TABLE: str = "latest"
+CHECKPOINT_TABLE: str = "checkpoints"
+
+
+class Clock:
+    """
+    Manual clock: a stand-in for time.monotonic / injected clocks; tests
+    move it by setting `now`.
+    """
+
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def kinesis() -> LocalKinesis:
+    return LocalKinesis(shard_count=1)
+
+
+@pytest.fixture
+def processor(monkeypatch: pytest.MonkeyPatch) -> Callable[..., Any]:
+    """
+    Factory: processor handler module for a sort key format, with its
+    tables in a fresh LocalDynamoDB (module.dynamodb).
+    """
+
+    def load(sort_key_format: str = "iso") -> Any:
+        for name, value in {
+            "KEY_SCHEME": "symbol",
+            "WRITE_SHARDS": "1",
+            "SORT_KEY_FORMAT": sort_key_format,
+            "DYNAMO_TABLE": TICK_TABLE,
+            "RAW_BUCKET": "",
+            "LATEST_TABLE": LATEST_TABLE,
+            "CHECKPOINT_TABLE": CHECKPOINT_TABLE,
+            "HOT_WINDOW_HOURS": "0",
+        }.items():
+            monkeypatch.setenv(name, value)
+        module = load_lambda_module(f"test_processor_{sort_key_format}", "kinesis_processor/handler.py", {})
+
+        dynamodb = LocalDynamoDB()
+        range_key: str = "ts" if sort_key_format == "epoch_ms" else "timestamp"
+        dynamodb.create_table(TICK_TABLE, "symbol", range_key, stream_enabled=True)
+        dynamodb.create_table(LATEST_TABLE, "symbol")
+        dynamodb.create_table(CHECKPOINT_TABLE, "checkpoint_id")
+        module.dynamodb = dynamodb
+        module.table = dynamodb.Table(TICK_TABLE)
+        module.latest_table = dynamodb.Table(LATEST_TABLE)
+        module.checkpoints = module.SequenceCheckpoints(dynamodb.Table(CHECKPOINT_TABLE))
+        return module
+
+    return load
+
+
+@pytest.fixture
+def trend(monkeypatch: pytest.MonkeyPatch) -> Callable[..., Any]:
+    """
+    Factory: a trend Lambda module (one per simulated container) in
+    scheduled mode over epoch_ms tables; containers built from the same
+    `dynamodb` and `sns` share the tables and the topic.
+    """
+    counter: List[int] = []
+
+    def load(dynamodb: LocalDynamoDB, sns: LocalSNS, interval_seconds: int = 60) -> Any:
+        for name, value in {
+            "KEY_SCHEME": "symbol",
+            "WRITE_SHARDS": "1",
+            "SORT_KEY_FORMAT": "epoch_ms",
+            "TABLE_NAME": TICK_TABLE,
+            "SNS_TOPIC_ARN": "arn:aws:sns:local:000000000000:alerts",
+            "LATEST_TABLE_NAME": LATEST_TABLE,
+            "CHECKPOINT_TABLE": CHECKPOINT_TABLE,
+            "EVALUATION_INTERVAL_SECONDS": str(interval_seconds),
+            "SETTLE_SECONDS": "0",
+        }.items():
+            monkeypatch.setenv(name, value)
+        counter.append(1)
+        module = load_lambda_module(f"test_trend_{len(counter)}", "trend_alert/app.py", {})
+        module.dynamodb = dynamodb
+        module.dynamodb_client = dynamodb.client()
+        module.sns = sns
+        return module
+
+    return load
+
+
+def tick(symbol: str, timestamp_ms: int, price: float = 100.0) -> Dict[str, Any]:
+    """
+    Producer payload (src/stream_stock_data_refactoring.py layout).
+    """
+    return {
+        "symbol": symbol,
+        "timestamp": format_iso(timestamp_ms),
+        "timestamp_ms": timestamp_ms,
+        "open": price,
+        "high": price,
+        "low": price,
+        "price": price,
+        "previous_close": 99.0,
+        "volume": 1,
+    }
+
+
+def put_ticks(
+    stream: LocalKinesis, payloads: List[Dict[str, Any]], partition_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Puts `payloads` and drains them as one Kinesis Lambda event.
+    """
+    for payload in payloads:
+        stream.put_record(StreamName=stream.stream_name, Data=json.dumps(payload),
+                          PartitionKey=partition_key or payload["symbol"])
+    records = [r for shard in stream.shards for r in stream.poll(shard, len(payloads))]
+    return stream.to_lambda_event(records)
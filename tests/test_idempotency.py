@@ -0,0 +1,94 @@
+# tests/test_idempotency.py
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from conftest import TICK_TABLE, put_ticks, tick
+from local_aws import LocalDynamoDB
+from pipeline_core.idempotency import SequenceCheckpoints, padded_sequence, record_position
+
+BASE_MS: int = 1_700_000_000_000
+
+
+def _counts(module: Any, event: Dict[str, Any]) -> Dict[str, int]:
+    stored: List[int] = []
+    original = module.put_item_once
+
+    def counting(table: Any, item: Dict[str, Any], sequence: str) -> bool:
+        written: bool = original(table, item, sequence)
+        stored.append(int(written))
+        return written
+
+    module.put_item_once = counting
+    try:
+        module.lambda_handler(event, None)
+    finally:
+        module.put_item_once = original
+    return {"attempted": len(stored), "written": sum(stored)}
+
+
+def test_same_second_ticks_are_not_replays(processor, kinesis) -> None:
+    # iso sort keys have second resolution: three ticks share one table key
+    module = processor("iso")
+    event = put_ticks(kinesis, [tick("AAPL", BASE_MS + n * 300, price=100.0 + n) for n in range(3)])
+
+    assert _counts(module, event) == {"attempted": 3, "written": 3}
+    items = module.dynamodb.Table(TICK_TABLE).scan()["Items"]
+    # Same key: the last tick overwrites the earlier ones, as plain puts did
+    assert len(items) == 1
+    assert float(items[0]["price"]) == 102.0
+
+
+def test_same_millisecond_ticks_are_not_replays(processor, kinesis) -> None:
+    module = processor("epoch_ms")
+    event = put_ticks(kinesis, [tick("AAPL", BASE_MS), tick("AAPL", BASE_MS, price=101.0)])
+
+    assert _counts(module, event) == {"attempted": 2, "written": 2}
+
+
+def test_redelivered_batch_is_skipped_by_checkpoint(processor, kinesis) -> None:
+    module = processor("epoch_ms")
+    event = put_ticks(kinesis, [tick("AAPL", BASE_MS + n * 1000) for n in range(3)])
+    module.lambda_handler(event, None)
+
+    assert _counts(module, event) == {"attempted": 0, "written": 0}
+    assert len(module.dynamodb.Table(TICK_TABLE).scan()["Items"]) == 3
+
+
+def test_record_past_checkpoint_is_not_written_twice(processor, kinesis) -> None:
+    # Crash between the tick write and the checkpoint update
+    module = processor("epoch_ms")
+    event = put_ticks(kinesis, [tick("AAPL", BASE_MS + n * 1000) for n in range(3)])
+    module.lambda_handler(event, None)
+    module.checkpoints = module.SequenceCheckpoints(module.dynamodb.create_table("lost", "checkpoint_id"))
+    table = module.dynamodb.Table(TICK_TABLE)
+    table.poll_stream(100)
+
+    assert _counts(module, event) == {"attempted": 3, "written": 0}
+    assert table.poll_stream(100) == []
+
+
+def test_checkpoint_never_moves_backwards() -> None:
+    dynamodb = LocalDynamoDB()
+    table = dynamodb.create_table("checkpoints", "checkpoint_id")
+    first, second = SequenceCheckpoints(table), SequenceCheckpoints(table)
+
+    first.advance("shard-0#AAPL", padded_sequence("200"))
+    # A slower invocation still holding an older position
+    second.advance("shard-0#AAPL", padded_sequence("150"))
+
+    stored = table.get_item(Key={"checkpoint_id": "shard-0#AAPL"})["Item"]["sequence_number"]
+    assert stored == padded_sequence("200")
+    assert second.already_processed("shard-0#AAPL", padded_sequence("199"))
+    assert not second.already_processed("shard-0#AAPL", padded_sequence("201"))
+
+
+def test_sequences_compare_numerically_across_lengths() -> None:
+    dynamodb = LocalDynamoDB()
+    checkpoints = SequenceCheckpoints(dynamodb.create_table("checkpoints", "checkpoint_id"))
+    checkpoints.advance("shard-0#AAPL", padded_sequence("9"))
+
+    assert not checkpoints.already_processed("shard-0#AAPL", padded_sequence("10"))
+    assert record_position(
+        {"eventID": "shardId-000000000001:10", "kinesis": {"partitionKey": "MSFT", "sequenceNumber": "10"}}
+    ) == ("shardId-000000000001#MSFT", padded_sequence("10"))
@@ -0,0 +1,86 @@
+# tests/test_keys.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+
+from local_aws import LocalDynamoDB
+from pipeline_core.keys import (
+    KeyScheme,
+    item_epoch_ms,
+    key_attributes,
+    partition_keys_for_range,
+    query_symbol_latest,
+    query_symbol_range,
+    query_symbol_range_dual_read,
+    shard_for,
+)
+
+# 2024-03-01T23:59:00Z: the ticks below cross midnight
+BASE_MS: int = 1_709_337_540_000
+SHARDED = KeyScheme(mode="sharded", write_shards=4, sort_key_format="epoch_ms")
+
+
+def _utc(epoch_ms: int) -> datetime:
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc)
+
+
+def _load(dynamodb: LocalDynamoDB, table: str, scheme: KeyScheme, timestamps: List[int]) -> None:
+    dynamodb.create_table(table, scheme.hash_key, scheme.range_key)
+    for ts in timestamps:
+        dynamodb.Table(table).put_item(Item={**key_attributes(scheme, "AAPL", ts), "price": 1})
+
+
+def test_shard_is_stable_per_record() -> None:
+    assert shard_for("AAPL", BASE_MS, 4) == shard_for("AAPL", BASE_MS, 4)
+    assert {shard_for("AAPL", BASE_MS + n, 4) for n in range(100)} == {0, 1, 2, 3}
+    item = key_attributes(SHARDED, "AAPL", BASE_MS)
+    assert item["pk"] == f"AAPL#2024-03-01#{shard_for('AAPL', BASE_MS, 4)}"
+    assert item["symbol"] == "AAPL" and item["ts"] == BASE_MS
+
+
+def test_range_fans_out_over_days_and_shards() -> None:
+    keys = partition_keys_for_range(SHARDED, "AAPL", _utc(BASE_MS), _utc(BASE_MS + 120_000))
+    assert len(keys) == 8
+    assert {key.split("#")[1] for key in keys} == {"2024-03-01", "2024-03-02"}
+
+
+def test_sharded_range_read_is_merged_in_order() -> None:
+    dynamodb = LocalDynamoDB()
+    timestamps: List[int] = [BASE_MS + n * 7_000 for n in range(20)]
+    _load(dynamodb, "ticks", SHARDED, timestamps)
+
+    items = query_symbol_range(dynamodb.client(), "ticks", SHARDED, "AAPL",
+                               _utc(BASE_MS + 7_000), _utc(BASE_MS + 70_000))
+    assert [item_epoch_ms(i) for i in items] == timestamps[1:11]
+
+
+def test_sharded_latest_read_crosses_midnight() -> None:
+    dynamodb = LocalDynamoDB()
+    timestamps: List[int] = [BASE_MS + n * 7_000 for n in range(20)]
+    _load(dynamodb, "ticks", SHARDED, timestamps)
+
+    items = query_symbol_latest(dynamodb.client(), "ticks", SHARDED, "AAPL", 15, now=_utc(timestamps[-1]))
+    assert [item_epoch_ms(i) for i in items] == timestamps[-15:]
+
+
+def test_dual_read_prefers_the_current_table() -> None:
+    dynamodb = LocalDynamoDB()
+    current = KeyScheme(sort_key_format="epoch_ms")
+    legacy = KeyScheme(sort_key_format="iso")
+    _load(dynamodb, "v2", current, [BASE_MS + 2_000, BASE_MS + 3_000])
+    _load(dynamodb, "v1", legacy, [BASE_MS, BASE_MS + 1_000, BASE_MS + 2_000])
+
+    items = query_symbol_range_dual_read(dynamodb.client(), "v2", current, "v1", legacy, "AAPL",
+                                         _utc(BASE_MS), _utc(BASE_MS + 5_000))
+    assert [item_epoch_ms(i) for i in items] == [BASE_MS + n * 1_000 for n in range(4)]
+    assert "ts" in items[2]
+
+
+def test_invalid_scheme_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        KeyScheme(mode="random")
+    with pytest.raises(ValueError):
+        KeyScheme(write_shards=0)
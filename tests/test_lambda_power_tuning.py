@@ -0,0 +1,30 @@
+# tests/test_lambda_power_tuning.py
+from __future__ import annotations
+
+import os
+import sys
+
+from conftest import ROOT, TICK_TABLE
+
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import lambda_power_tuning as tuning  # noqa: E402
+
+
+def test_every_round_is_stored_on_an_iso_stack(processor) -> None:
+    # Default stack: second-resolution sort keys
+    module = processor("iso")
+    ticks = tuning.build_ticks(batch_size=50, symbols=10, seed=1)
+    for round_index in range(3):
+        module.lambda_handler(tuning.kinesis_event(ticks, 10, round_index, 1_700_000_000_000), None)
+
+    assert len(module.dynamodb.Table(TICK_TABLE).scan()["Items"]) == 3 * 50
+
+
+def test_trend_events_match_the_sort_key_format() -> None:
+    ticks = tuning.build_ticks(batch_size=4, symbols=2, seed=1)
+    iso = tuning.dynamodb_stream_event(ticks, 2, 0, 1_700_000_000_000, "iso")["Records"][0]["dynamodb"]
+    epoch = tuning.dynamodb_stream_event(ticks, 2, 0, 1_700_000_000_000, "epoch_ms")["Records"][0]["dynamodb"]
+
+    assert iso["Keys"]["timestamp"] == {"S": "2023-11-14T22:13:20Z"} and "ts" not in iso["NewImage"]
+    assert epoch["Keys"]["ts"] == {"N": "1700000000000"}
@@ -0,0 +1,23 @@
+# tests/test_latency_report.py
+from __future__ import annotations
+
+import os
+import sys
+
+from conftest import ROOT, TICK_TABLE, put_ticks, tick
+
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from latency_report import traces_from_items  # noqa: E402
+
+BASE_MS: int = 1_700_000_000_000
+
+
+def test_produced_time_keeps_milliseconds_on_an_iso_table(processor, kinesis) -> None:
+    # iso sort key: 2023-11-14T22:13:20Z, the 250 ms are only in timestamp_ms
+    module = processor("iso")
+    module.lambda_handler(put_ticks(kinesis, [tick("AAPL", BASE_MS + 250)]), None)
+
+    traces = list(traces_from_items(module.dynamodb.Table(TICK_TABLE).scan()["Items"]))
+
+    assert [trace["timestamp_ms"] for trace in traces] == [BASE_MS + 250]
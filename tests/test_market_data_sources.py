@@ -0,0 +1,49 @@
+# tests/test_market_data_sources.py
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, List
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from websockets.sync.server import serve  # noqa: E402
+
+from market_data_sources import WebSocketQuoteSource  # noqa: E402
+
+MESSAGES: List[str] = [
+    "not json",
+    json.dumps({"type": "quote", "symbol": "AAPL"}),                    # no price
+    json.dumps({"type": "quote", "symbol": "AAPL", "price": None}),     # TypeError
+    json.dumps({"type": "quote", "symbol": "AAPL", "price": "n/a"}),    # ValueError
+    json.dumps({"type": "heartbeat"}),
+    json.dumps({"type": "quote", "symbol": "AAPL", "price": 101.5, "previous_close": 100.0}),
+]
+
+
+def test_malformed_messages_do_not_end_the_stream() -> None:
+    connections: List[int] = []
+
+    def handler(connection: Any) -> None:
+        connection.recv(timeout=5)  # subscribe
+        connections.append(1)
+        for message in MESSAGES:
+            connection.send(message)
+        connection.recv(timeout=5)  # held open until the client closes
+
+    with serve(handler, "localhost", 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port: int = server.socket.getsockname()[1]
+        source = WebSocketQuoteSource(f"ws://localhost:{port}", ["AAPL"])
+        try:
+            quote = next(iter(source.stream()))
+        finally:
+            source.close()
+        server.shutdown()
+
+    assert quote["symbol"] == "AAPL" and quote["price"] == 101.5
+    assert source.malformed == 4
+    # Same connection: no reconnect after the bad messages
+    assert connections == [1]
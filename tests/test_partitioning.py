@@ -0,0 +1,77 @@
+# tests/test_partitioning.py
+from __future__ import annotations
+
+from typing import Dict
+
+import pytest
+
+import partitioning
+from conftest import Clock
+from local_aws import LocalKinesis
+from partitioning import ExplicitHashPartitioner, SaltedPartitioner, even_hash_ranges
+
+
+@pytest.fixture
+def monotonic(clock: Clock, monkeypatch: pytest.MonkeyPatch) -> Clock:
+    monkeypatch.setattr(partitioning.time, "monotonic", clock)
+    return clock
+
+
+def _send(partitioner: ExplicitHashPartitioner, counts: Dict[str, int]) -> None:
+    for symbol, count in counts.items():
+        for _ in range(count):
+            partitioner.route(symbol)
+
+
+def test_explicit_hash_keys_land_on_their_shard() -> None:
+    kinesis = LocalKinesis(shard_count=4)
+    partitioner = ExplicitHashPartitioner.for_stream(kinesis, kinesis.stream_name)
+    for symbol in ("AAPL", "MSFT", "GOOG", "AMZN"):
+        key, explicit = partitioner.route(symbol)
+        response = kinesis.put_record(StreamName=kinesis.stream_name, Data=b"{}", PartitionKey=key,
+                                      ExplicitHashKey=explicit)
+        assert response["ShardId"] == kinesis.shards[partitioner.hash_keys.index(explicit)].shard_id
+    # New symbols go to the least loaded shard: one per shard
+    assert sorted(partitioner.describe()["shard_loads"]) == [1.0, 1.0, 1.0, 1.0]
+
+
+def test_hot_symbols_sharing_a_shard_are_split(monotonic: Clock) -> None:
+    partitioner = ExplicitHashPartitioner(even_hash_ranges(4), rebalance_interval_seconds=60)
+    _send(partitioner, {"A": 1, "B": 1, "C": 1, "D": 1, "E": 1})
+    assert partitioner.route("A")[1] == partitioner.route("E")[1]  # both on shard 0
+
+    _send(partitioner, {"A": 600, "E": 600, "B": 60, "C": 60, "D": 60})
+    monotonic.now = 60.0
+    partitioner.route("B")
+
+    assert partitioner.rebalances == 1
+    assert partitioner.route("A")[1] != partitioner.route("E")[1]
+    # Each hot symbol has a shard of its own; the cold ones share the rest
+    routes: Dict[str, str] = {symbol: partitioner.route(symbol)[1] for symbol in "ABCDE"}
+    assert [s for s in "BCD" if routes[s] in (routes["A"], routes["E"])] == []
+
+
+def test_balanced_load_is_not_moved(monotonic: Clock) -> None:
+    partitioner = ExplicitHashPartitioner(even_hash_ranges(2), rebalance_interval_seconds=60)
+    _send(partitioner, {"A": 100, "B": 100})
+    before = {symbol: partitioner.route(symbol) for symbol in ("A", "B")}
+    monotonic.now = 60.0
+    _send(partitioner, {"A": 100, "B": 100})
+
+    assert partitioner.rebalances == 0
+    assert {symbol: partitioner.route(symbol) for symbol in ("A", "B")} == before
+
+
+def test_plan_places_largest_rates_first() -> None:
+    assignment = ExplicitHashPartitioner.plan({"A": 10.0, "B": 6.0, "C": 5.0, "D": 1.0}, 2)
+    loads = [0.0, 0.0]
+    for symbol, shard in assignment.items():
+        loads[shard] += {"A": 10.0, "B": 6.0, "C": 5.0, "D": 1.0}[symbol]
+    assert sorted(loads) == [11.0, 11.0]
+
+
+def test_salted_keeps_ordered_symbols_unsalted() -> None:
+    partitioner = SaltedPartitioner(salts=4, ordered_symbols=["AAPL"])
+    assert {partitioner.route("AAPL") for _ in range(20)} == {("AAPL", None)}
+    keys = {partitioner.route("MSFT")[0] for _ in range(200)}
+    assert keys <= {f"MSFT#{n}" for n in range(4)} and len(keys) > 1
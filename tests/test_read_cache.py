@@ -0,0 +1,74 @@
+# tests/test_read_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import List
+
+import pytest
+
+from conftest import Clock
+from read_cache import TTLCache
+
+
+def test_concurrent_misses_are_coalesced() -> None:
+    cache = TTLCache(ttl_seconds=60)
+    release = threading.Event()
+    calls: List[int] = []
+
+    def loader() -> str:
+        calls.append(1)
+        release.wait(5)
+        return "quote"
+
+    results: List[str] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("AAPL", loader))) for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline: float = time.monotonic() + 5
+    while cache.snapshot()["coalesced"] < 19 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["quote"] * 20
+    assert cache.snapshot()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock: Clock) -> None:
+    cache = TTLCache(ttl_seconds=1.0, clock=clock)
+    values = iter(["old", "new"])
+
+    assert cache.get_or_load("k", lambda: next(values)) == "old"
+    clock.now = 0.5
+    assert cache.get_or_load("k", lambda: next(values)) == "old"
+    clock.now = 1.5
+    assert cache.get_or_load("k", lambda: next(values)) == "new"
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: 0)  # hit: "b" is now the oldest
+    cache.get_or_load("c", lambda: 3)
+
+    assert cache.get_or_load("a", lambda: -1) == 1
+    assert cache.get_or_load("b", lambda: -2) == -2
+    assert cache.snapshot()["evictions"] == 2
+
+
+def test_errors_are_not_cached() -> None:
+    cache = TTLCache(ttl_seconds=60)
+
+    def failing() -> int:
+        raise RuntimeError("throttled")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: 7) == 7
+    assert cache.snapshot()["errors"] == 1
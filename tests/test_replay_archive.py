@@ -0,0 +1,45 @@
+# tests/test_replay_archive.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+from conftest import ROOT, tick
+from local_aws import LocalS3
+
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import compact_raw_prefix  # noqa: E402
+from replay_producer import load_s3_archive  # noqa: E402
+
+BUCKET: str = "raw"
+BASE_MS: int = 1_700_000_000_000
+
+
+def _archive(s3: LocalS3) -> None:
+    # Same key layout as the processor: raw-data/<symbol>/<timestamp>-<sequence>.json
+    for n in range(6):
+        for symbol in ("AAPL", "MSFT"):
+            payload = tick(symbol, BASE_MS + n * 500, price=100.0 + n)
+            key = f"raw-data/{symbol}/{payload['timestamp'].replace(':', '-')}-{n + 1}.json"
+            s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps(payload))
+
+
+def test_replay_reads_compacted_ndjson() -> None:
+    s3 = LocalS3()
+    _archive(s3)
+    before = load_s3_archive(BUCKET, ["AAPL", "MSFT"], "local", s3=s3)
+
+    args = argparse.Namespace(
+        symbols=[], format="ndjson", target_mb=128, row_group_rows=100_000, min_objects=2,
+        concurrency=4, include_today=True, dry_run=False,
+    )
+    summary = compact_raw_prefix.run(s3, BUCKET, args)
+    assert summary["files_out"] == 2
+    assert all(key.endswith(".ndjson") for key in s3.buckets[BUCKET])
+
+    after = load_s3_archive(BUCKET, ["AAPL", "MSFT"], "local", s3=s3)
+    assert after == before
+    assert [event["timestamp_ms"] for event in after["AAPL"]] == [BASE_MS + n * 500 for n in range(6)]
@@ -0,0 +1,117 @@
+# tests/test_spool.py
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List
+
+from spool import CHECKPOINT_FILE, Spool, SpoolDrainer, _segment_path
+
+SEGMENT_BYTES: int = 4096
+
+
+def _fill(directory: str, count: int) -> List[bytes]:
+    spool = Spool(directory, segment_bytes=SEGMENT_BYTES)
+    payloads: List[bytes] = [f'{{"n": {n}}}'.encode("utf-8") for n in range(count)]
+    for payload in payloads:
+        spool.append("AAPL", payload)
+    spool.close()
+    return payloads
+
+
+def _read_all(spool: Spool) -> List[bytes]:
+    return [record.data for record in spool.read(1000)]
+
+
+def test_torn_record_is_skipped_on_reopen(tmp_path) -> None:
+    directory = str(tmp_path)
+    payloads = _fill(directory, 3)
+    # Crash while writing the third record: its body is only half on disk
+    spool = Spool(directory, segment_bytes=SEGMENT_BYTES)
+    third = spool.read(3)[2]
+    spool.close()
+    with open(_segment_path(directory, 0), "r+b") as f:
+        f.seek(third.offset + 12)
+        f.write(b"\x00" * 4)
+
+    reopened = Spool(directory, segment_bytes=SEGMENT_BYTES)
+    assert _read_all(reopened) == payloads[:2]
+    # New appends go where the torn record was, and are readable
+    reopened.append("AAPL", b'{"n": "new"}')
+    assert _read_all(reopened) == [b'{"n": "new"}']
+    reopened.close()
+
+
+def test_truncated_segment_is_recovered(tmp_path) -> None:
+    directory = str(tmp_path)
+    payloads = _fill(directory, 3)
+    spool = Spool(directory, segment_bytes=SEGMENT_BYTES)
+    third = spool.read(3)[2]
+    spool.close()
+    # File cut in the middle of the third record (e.g. copied while open)
+    with open(_segment_path(directory, 0), "r+b") as f:
+        f.truncate(third.offset + 8)
+
+    reopened = Spool(directory, segment_bytes=SEGMENT_BYTES)
+    assert _read_all(reopened) == payloads[:2]
+    assert os.path.getsize(_segment_path(directory, 0)) == SEGMENT_BYTES
+    reopened.close()
+
+
+def test_reopen_resumes_from_checkpoint(tmp_path) -> None:
+    directory = str(tmp_path)
+    spool = Spool(directory, segment_bytes=256)
+    payloads: List[bytes] = [f'{{"n": {n:04d}, "pad": "{"x" * 40}"}}'.encode("utf-8") for n in range(12)]
+    for payload in payloads:
+        spool.append("AAPL", payload)
+    assert len(spool.read(7)) == 7
+    spool.commit(spool.read_position())
+    spool.close()
+
+    reopened = Spool(directory, segment_bytes=256)
+    assert _read_all(reopened) == payloads[7:]
+    # Fully drained segments are gone
+    remaining = [name for name in os.listdir(directory) if name.startswith("segment-")]
+    assert len(remaining) < 12 // 3
+    assert os.path.exists(os.path.join(directory, CHECKPOINT_FILE))
+    reopened.close()
+
+
+class FlakyKinesis:
+    """
+    Fails every record of `failing_key` on the first PutRecords call.
+    """
+
+    def __init__(self, failing_key: str) -> None:
+        self.failing_key = failing_key
+        self.calls: List[List[Dict[str, Any]]] = []
+        self.lock = threading.Lock()
+
+    def put_records(self, StreamName: str, Records: List[Dict[str, Any]], **_: Any) -> Dict[str, Any]:
+        with self.lock:
+            first: bool = not self.calls
+            self.calls.append(Records)
+        results: List[Dict[str, Any]] = []
+        for entry in Records:
+            if first and entry["PartitionKey"] == self.failing_key:
+                results.append({"ErrorCode": "ProvisionedThroughputExceededException", "ErrorMessage": "slow down"})
+            else:
+                results.append({"ShardId": "shardId-000000000000", "SequenceNumber": "1"})
+        return {"FailedRecordCount": sum("ErrorCode" in r for r in results), "Records": results}
+
+
+def test_partial_failure_retries_only_failed_keys(tmp_path) -> None:
+    spool = Spool(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    for n in range(3):
+        spool.append("AAPL", f"a{n}".encode("utf-8"))
+        spool.append("MSFT", f"m{n}".encode("utf-8"))
+    kinesis = FlakyKinesis(failing_key="MSFT")
+    drainer = SpoolDrainer(spool, kinesis, "stream", linger_seconds=0.01).start()
+    drainer.stop(timeout=10)
+
+    first, retry = kinesis.calls[0], kinesis.calls[1]
+    assert len(first) == 6
+    assert [(e["PartitionKey"], e["Data"]) for e in retry] == [("MSFT", b"m0"), ("MSFT", b"m1"), ("MSFT", b"m2")]
+    assert drainer.stats["drained"] == 6
+    assert not spool.has_unread()
+    spool.close()
@@ -0,0 +1,68 @@
+# tests/test_throttling.py
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List
+
+from stream_stock_data_refactoring import put_records_to_kinesis
+from throttling import AdaptiveRateLimiter, RateLimitConfig
+
+HOT: str = "HOT"
+COLD: str = "COLD"
+
+
+class ThrottlingKinesis:
+    """
+    Rejects every HOT entry with a throttle for the first `throttled_calls`
+    calls, then accepts everything.
+    """
+
+    def __init__(self, throttled_calls: int) -> None:
+        self.throttled_calls = throttled_calls
+        self.calls: int = 0
+
+    def put_records(self, StreamName: str, Records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.calls += 1
+        throttle: bool = self.calls <= self.throttled_calls
+        results: List[Dict[str, Any]] = []
+        for entry in Records:
+            if throttle and entry["PartitionKey"] == HOT:
+                results.append({"ErrorCode": "ProvisionedThroughputExceededException"})
+            else:
+                results.append({"SequenceNumber": str(self.calls), "ShardId": "shardId-000000000000"})
+        failed: int = sum(1 for r in results if "ErrorCode" in r)
+        return {"FailedRecordCount": failed, "Records": results}
+
+
+def _send(kinesis: ThrottlingKinesis, limiter: AdaptiveRateLimiter, key: str, count: int) -> float:
+    started: float = time.monotonic()
+    failed: int = put_records_to_kinesis(kinesis, "ticks", [(key, b"{}")] * count, rate_limiter=limiter)
+    assert failed == 0
+    return time.monotonic() - started
+
+
+def test_throttled_key_is_slowed_down() -> None:
+    limiter = AdaptiveRateLimiter(RateLimitConfig(initial_rate=100, min_rate=20))
+    kinesis = ThrottlingKinesis(throttled_calls=3)
+
+    # Three throttles halve HOT down to the floor; the fourth attempt goes through
+    _send(kinesis, limiter, HOT, 1)
+    assert limiter.rates()[HOT] < 25
+
+    # HOT has ~20 tokens left at ~22/s: 40 more records wait ~0.9s
+    hot_seconds: float = _send(kinesis, limiter, HOT, 40)
+    cold_seconds: float = _send(kinesis, limiter, COLD, 40)
+
+    assert hot_seconds >= 0.6
+    assert cold_seconds < 0.1
+    assert limiter.metrics.snapshot()["rate_limited_wait_ms"] >= 600
+
+
+def test_batch_larger_than_bucket_capacity_is_paced() -> None:
+    limiter = AdaptiveRateLimiter(RateLimitConfig(initial_rate=20, min_rate=20))
+    kinesis = ThrottlingKinesis(throttled_calls=0)
+
+    # 30 records against a 20-token bucket: acquired in chunks, not deadlocked
+    seconds: float = _send(kinesis, limiter, HOT, 30)
+
+    assert 0.4 <= seconds < 2
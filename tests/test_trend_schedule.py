@@ -0,0 +1,102 @@
+# tests/test_trend_schedule.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import pytest
+
+from conftest import CHECKPOINT_TABLE, LATEST_TABLE, TICK_TABLE
+from local_aws import LocalDynamoDB, LocalSNS
+from pipeline_core.idempotency import WindowWatermark
+from pipeline_core.keys import KeyScheme, key_attributes
+
+NOW_MS: int = 1_700_000_000_000
+SCHEME = KeyScheme(mode="symbol", write_shards=1, sort_key_format="epoch_ms")
+
+
+@pytest.fixture
+def dynamodb() -> LocalDynamoDB:
+    dynamodb = LocalDynamoDB()
+    dynamodb.create_table(TICK_TABLE, "symbol", "ts")
+    dynamodb.create_table(LATEST_TABLE, "symbol")
+    dynamodb.create_table(CHECKPOINT_TABLE, "checkpoint_id")
+    return dynamodb
+
+
+def _write_spike(dynamodb: LocalDynamoDB, symbol: str, ts: int, processed_ms: Optional[int] = None) -> None:
+    # +5% against the previous close: always above the alert threshold
+    item: Dict[str, Any] = {**key_attributes(SCHEME, symbol, ts), "price": 105, "previous_close": 100}
+    if processed_ms is not None:
+        item["processed_ms"] = processed_ms
+    dynamodb.Table(TICK_TABLE).put_item(Item=item)
+    dynamodb.Table(LATEST_TABLE).put_item(Item={"symbol": symbol, "ts": ts})
+
+
+def _run_at(module: Any, at_ms: int) -> None:
+    module.now_ms = lambda: at_ms
+    module.lambda_handler({"mode": "scheduled"}, None)
+
+
+def test_windows_are_contiguous_across_containers(trend, dynamodb) -> None:
+    sns = LocalSNS()
+    first = trend(dynamodb, sns)
+    _write_spike(dynamodb, "AAPL", NOW_MS - 30_000)
+    _run_at(first, NOW_MS)
+    assert len(sns.messages) == 1
+
+    # New container, same instant: the window was already claimed
+    _run_at(trend(dynamodb, sns), NOW_MS)
+    assert len(sns.messages) == 1
+
+    # A tick more than one interval before the next (cold) run is not lost
+    _write_spike(dynamodb, "MSFT", NOW_MS + 10_000)
+    _run_at(trend(dynamodb, sns), NOW_MS + 200_000)
+    assert len(sns.messages) == 2
+    assert WindowWatermark(dynamodb.Table(CHECKPOINT_TABLE), first.WATERMARK_ID).load() == NOW_MS + 200_000
+
+
+def test_failed_pass_releases_its_window(trend, dynamodb) -> None:
+    sns = LocalSNS()
+    module = trend(dynamodb, sns)
+    _run_at(module, NOW_MS)
+    _write_spike(dynamodb, "AAPL", NOW_MS + 10_000)
+
+    def fail(*_: Any) -> Any:
+        raise RuntimeError("query failed")
+
+    original = module.evaluate_window
+    module.evaluate_window = fail
+    with pytest.raises(RuntimeError):
+        _run_at(module, NOW_MS + 60_000)
+    module.evaluate_window = original
+
+    _run_at(module, NOW_MS + 120_000)
+    assert len(sns.messages) == 1
+
+
+def test_late_tick_is_evaluated_by_the_next_pass(trend, dynamodb) -> None:
+    sns = LocalSNS()
+    module = trend(dynamodb, sns)
+    _write_spike(dynamodb, "AAPL", NOW_MS - 20_000, processed_ms=NOW_MS - 19_000)
+    _run_at(module, NOW_MS)
+    assert len(sns.messages) == 1
+
+    # Written after the window [.., NOW_MS) was evaluated: only the next
+    # pass can see it; the on-time tick is not evaluated twice
+    _write_spike(dynamodb, "MSFT", NOW_MS - 10_000, processed_ms=NOW_MS + 1_000)
+    _run_at(module, NOW_MS + 60_000)
+    assert len(sns.messages) == 2
+    assert "MSFT" in sns.messages[-1]["Message"]
+
+    _run_at(module, NOW_MS + 120_000)
+    assert len(sns.messages) == 2
+
+
+def test_claim_fails_when_the_watermark_moved(dynamodb) -> None:
+    watermark = WindowWatermark(dynamodb.Table(CHECKPOINT_TABLE), "job")
+    assert watermark.claim(None, 100)
+    assert not watermark.claim(None, 200)
+    assert watermark.claim(100, 200)
+    assert not watermark.claim(100, 300)
+    watermark.release(200, 300)  # not ours: no-op
+    assert watermark.load() == 200
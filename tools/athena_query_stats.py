@@ -0,0 +1,181 @@
+"""
+Athena query cost report.
+
+Pulls QueryExecution statistics for every named query registered in the
+pipeline workgroup and prints, per named query:
+
+- number of executions found
+- data scanned (avg / max)
+- engine execution time (avg)
+- queue time (avg)
+
+Use --csv to append one row per named query to a file and track scan
+efficiency over time.
+
+Usage:
+    python tools/athena_query_stats.py --workgroup stock-market-athena-wg
+    python tools/athena_query_stats.py --max-executions 500 --csv athena_stats.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import boto3
+
+DEFAULT_REGION: str = "us-east-1"
+DEFAULT_WORKGROUP: str = "stock-market-athena-wg"
+
+# batch_get_* APIs accept at most 50 ids per call
+BATCH_SIZE: int = 50
+
+
+@dataclass
+class QueryStats:
+    name: str
+    executions: int = 0
+    data_scanned_bytes: List[int] = field(default_factory=list)
+    engine_time_ms: List[int] = field(default_factory=list)
+    queue_time_ms: List[int] = field(default_factory=list)
+
+    def add(self, statistics: Dict[str, Any]) -> None:
+        self.executions += 1
+        self.data_scanned_bytes.append(int(statistics.get("DataScannedInBytes", 0)))
+        self.engine_time_ms.append(int(statistics.get("EngineExecutionTimeInMillis", 0)))
+        self.queue_time_ms.append(int(statistics.get("QueryQueueTimeInMillis", 0)))
+
+
+def _avg(values: List[int]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Whitespace/case/semicolon-insensitive form of a query, so an execution
+    started from the console matches its named query text.
+    """
+    return " ".join(query.strip().rstrip(";").split()).lower()
+
+
+def load_named_queries(athena: Any, workgroup: str) -> Dict[str, str]:
+    """
+    Returns {normalized_sql: named_query_name} for the workgroup.
+    """
+    ids: List[str] = []
+    for page in athena.get_paginator("list_named_queries").paginate(WorkGroup=workgroup):
+        ids.extend(page.get("NamedQueryIds", []))
+
+    by_sql: Dict[str, str] = {}
+    for chunk in _chunks(ids, BATCH_SIZE):
+        response = athena.batch_get_named_query(NamedQueryIds=chunk)
+        for named_query in response.get("NamedQueries", []):
+            by_sql[normalize_sql(named_query["QueryString"])] = named_query["Name"]
+    return by_sql
+
+
+def collect_stats(
+    athena: Any,
+    workgroup: str,
+    named_queries: Dict[str, str],
+    max_executions: int,
+) -> Dict[str, QueryStats]:
+    """
+    Walks the most recent executions of the workgroup and aggregates the
+    statistics of the ones whose SQL matches a named query.
+    Only SUCCEEDED and CANCELLED (scan cutoff) executions are counted.
+    """
+    execution_ids: List[str] = []
+    for page in athena.get_paginator("list_query_executions").paginate(WorkGroup=workgroup):
+        execution_ids.extend(page.get("QueryExecutionIds", []))
+        if len(execution_ids) >= max_executions:
+            break
+    execution_ids = execution_ids[:max_executions]
+
+    stats: Dict[str, QueryStats] = {
+        name: QueryStats(name=name) for name in named_queries.values()
+    }
+
+    for chunk in _chunks(execution_ids, BATCH_SIZE):
+        response = athena.batch_get_query_execution(QueryExecutionIds=chunk)
+        for execution in response.get("QueryExecutions", []):
+            state: str = execution.get("Status", {}).get("State", "")
+            if state not in ("SUCCEEDED", "CANCELLED"):
+                continue
+            name: Optional[str] = named_queries.get(normalize_sql(execution.get("Query", "")))
+            if name is None:
+                continue
+            stats[name].add(execution.get("Statistics", {}))
+
+    return stats
+
+
+def print_report(stats: Dict[str, QueryStats]) -> None:
+    header = f"{'query':<12}{'runs':>6}{'avg MB':>12}{'max MB':>12}{'engine ms':>12}{'queue ms':>12}"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(stats):
+        s = stats[name]
+        print(
+            f"{name:<12}{s.executions:>6}"
+            f"{_avg(s.data_scanned_bytes) / 1024 ** 2:>12.2f}"
+            f"{max(s.data_scanned_bytes, default=0) / 1024 ** 2:>12.2f}"
+            f"{_avg(s.engine_time_ms):>12.0f}"
+            f"{_avg(s.queue_time_ms):>12.0f}"
+        )
+
+
+def append_csv(path: str, workgroup: str, stats: Dict[str, QueryStats]) -> None:
+    new_file: bool = not os.path.exists(path)
+    captured_at: str = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    with open(path, "a", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        if new_file:
+            writer.writerow([
+                "captured_at", "workgroup", "query", "executions",
+                "avg_data_scanned_bytes", "max_data_scanned_bytes",
+                "avg_engine_time_ms", "avg_queue_time_ms",
+            ])
+        for name in sorted(stats):
+            s = stats[name]
+            writer.writerow([
+                captured_at, workgroup, name, s.executions,
+                int(_avg(s.data_scanned_bytes)), max(s.data_scanned_bytes, default=0),
+                int(_avg(s.engine_time_ms)), int(_avg(s.queue_time_ms)),
+            ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Athena named query cost report")
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--workgroup", default=DEFAULT_WORKGROUP)
+    parser.add_argument("--max-executions", type=int, default=200)
+    parser.add_argument("--csv", help="append results to this CSV file")
+    args = parser.parse_args()
+
+    athena = boto3.client("athena", region_name=args.region)
+
+    named_queries = load_named_queries(athena, args.workgroup)
+    if not named_queries:
+        print(f"No named queries found in workgroup {args.workgroup}")
+        return
+
+    stats = collect_stats(athena, args.workgroup, named_queries, args.max_executions)
+    print_report(stats)
+
+    if args.csv:
+        append_csv(args.csv, args.workgroup, stats)
+        print(f"\nAppended {len(stats)} rows to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Backfill for the iso -> epoch_ms sort key migration.
+
+Copies every item of the legacy table (sort key `timestamp`, ISO string)
+into the epoch_ms table (sort key `ts`, epoch milliseconds), re-deriving
+the key attributes with the target key scheme. The ISO string is dropped
+from the copied items, and each copy is marked `backfilled=true`: the
+target table has a stream, and the trend Lambda's event filter drops
+marked items so the copy does not re-fire old alerts.
+
+Run it while the stack keeps the legacy table (the default with
+dynamoSortKeyFormat=epoch_ms): the trend Lambda dual-reads both tables, so
+queries stay complete during the copy. Once the backfill has finished, set
+dynamoKeepLegacyTable=false and `pulumi up`; the legacy table is retained
+in AWS and has to be deleted by hand.
+
+The copy is idempotent (same source item -> same target key), so it can be
+re-run after an interruption.
+
+Usage:
+    python tools/backfill_epoch_timestamps.py \
+        --source stock-market-data --target stock-market-data-v2 \
+        --key-scheme symbol --segments 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+import boto3
+
+# pipeline_core is deployed next to the Lambda handlers; import it from the source tree
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+
+from pipeline_core.keys import (  # noqa: E402
+    BACKFILLED_ATTRIBUTE,
+    ISO_RANGE_KEY,
+    SHARDED_HASH_KEY,
+    SORT_KEY_EPOCH_MS,
+    KeyScheme,
+    key_attributes,
+)
+from pipeline_core.timestamps import parse_iso_ms  # noqa: E402
+
+
+def convert_item(item: Dict[str, Any], target: KeyScheme) -> Dict[str, Any]:
+    timestamp_ms: int = parse_iso_ms(item[ISO_RANGE_KEY])
+    converted: Dict[str, Any] = {
+        k: v for k, v in item.items() if k not in (ISO_RANGE_KEY, SHARDED_HASH_KEY)
+    }
+    converted.update(key_attributes(target, item["symbol"], timestamp_ms))
+    converted[BACKFILLED_ATTRIBUTE] = True
+    return converted
+
+
+def backfill_segment(
+    args: argparse.Namespace, target: KeyScheme, segment: int
+) -> Tuple[int, int]:
+    """
+    Scans one parallel-scan segment and writes its items. Each worker uses
+    its own session: boto3 resources are not thread-safe.
+    """
+    dynamodb = boto3.session.Session(region_name=args.region).resource("dynamodb")
+    source = dynamodb.Table(args.source)
+    destination = dynamodb.Table(args.target)
+
+    copied, skipped = 0, 0
+    scan_kwargs: Dict[str, Any] = {"Segment": segment, "TotalSegments": args.segments}
+
+    with destination.batch_writer(overwrite_by_pkeys=[target.hash_key, target.range_key]) as writer:
+        while True:
+            page = source.scan(**scan_kwargs)
+            for item in page.get("Items", []):
+                try:
+                    converted = convert_item(item, target)
+                except (KeyError, ValueError) as exc:
+                    print(f"[segment {segment}] skipping item {item.get('symbol')}: {exc}")
+                    skipped += 1
+                    continue
+                if not args.dry_run:
+                    writer.put_item(Item=converted)
+                copied += 1
+
+            last_key = page.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+    return copied, skipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill epoch-ms sort keys")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--source", default="stock-market-data")
+    parser.add_argument("--target", default="stock-market-data-v2")
+    parser.add_argument("--key-scheme", default="symbol", choices=["symbol", "sharded"])
+    parser.add_argument("--write-shards", type=int, default=1)
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    target = KeyScheme(
+        mode=args.key_scheme,
+        write_shards=args.write_shards,
+        sort_key_format=SORT_KEY_EPOCH_MS,
+    )
+
+    with ThreadPoolExecutor(max_workers=args.segments) as pool:
+        results = list(
+            pool.map(lambda segment: backfill_segment(args, target, segment), range(args.segments))
+        )
+
+    copied = sum(c for c, _ in results)
+    skipped = sum(s for _, s in results)
+    action = "would copy" if args.dry_run else "copied"
+    print(f"{action} {copied} items from {args.source} to {args.target} ({skipped} skipped)")
+
+
+if __name__ == "__main__":
+    main()
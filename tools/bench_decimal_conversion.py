@@ -0,0 +1,139 @@
+"""
+Micro-benchmark: Decimal conversion of processor items.
+
+Builds realistic tick payloads (prices moving in cents, constant
+previous_close per symbol) and converts the four numeric attributes the
+Kinesis processor writes (price, previous_close, change, moving_average)
+two ways:
+
+- baseline: Decimal(str(x)) per field, as the processor used to do
+- to_decimal: pipeline_core.decimals memo
+
+It checks that both paths produce identical Decimals (equal value and
+identical str(), so the same DynamoDB number) and prints the cost per
+record and the speedup. The first batch runs with a cold memo, like the
+first invocation of a new Lambda container.
+
+Usage:
+    python tools/bench_decimal_conversion.py
+    python tools/bench_decimal_conversion.py --symbols 500 --records 100000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+# pipeline_core is deployed next to the Lambda handlers; import it from the source tree
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+
+from pipeline_core.decimals import clear_cache, to_decimal  # noqa: E402
+
+FIELDS: List[str] = ["price", "previous_close", "change", "moving_average"]
+
+
+def generate_payloads(symbols: int, records: int, seed: int) -> List[Dict[str, float]]:
+    """
+    Random walk in cents per symbol, rounded like the producer does.
+    """
+    rng = random.Random(seed)
+    previous_close: List[float] = [round(rng.uniform(20, 500), 2) for _ in range(symbols)]
+    price: List[float] = list(previous_close)
+    high: List[float] = list(previous_close)
+    low: List[float] = list(previous_close)
+
+    payloads: List[Dict[str, float]] = []
+    for n in range(records):
+        i: int = n % symbols
+        price[i] = round(max(0.01, price[i] + rng.choice((-0.02, -0.01, 0.0, 0.01, 0.02))), 2)
+        high[i] = max(high[i], price[i])
+        low[i] = min(low[i], price[i])
+        payloads.append(
+            {
+                "open": previous_close[i],
+                "high": high[i],
+                "low": low[i],
+                "price": price[i],
+                "previous_close": previous_close[i],
+            }
+        )
+    return payloads
+
+
+def processor_values(payload: Dict[str, float]) -> List[float]:
+    """
+    The four numeric attributes, computed as in kinesis_processor/handler.py.
+    """
+    price_change: float = payload["price"] - payload["previous_close"]
+    moving_average: float = (payload["open"] + payload["high"] + payload["low"] + payload["price"]) / 4
+    return [payload["price"], payload["previous_close"], price_change, moving_average]
+
+
+def baseline(value: Any) -> Decimal:
+    return Decimal(str(value))
+
+
+def convert_all(rows: List[List[float]], convert: Callable[[Any], Decimal]) -> List[List[Decimal]]:
+    return [[convert(value) for value in row] for row in rows]
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started: float = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Decimal conversion of processor items")
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows: List[List[float]] = [
+        processor_values(payload) for payload in generate_payloads(args.symbols, args.records, args.seed)
+    ]
+
+    # Correctness: identical value and representation for every field
+    clear_cache()
+    expected: List[List[Decimal]] = convert_all(rows, baseline)
+    actual: List[List[Decimal]] = convert_all(rows, to_decimal)
+    mismatches: int = sum(
+        1
+        for expected_row, actual_row in zip(expected, actual)
+        for e, a in zip(expected_row, actual_row)
+        if e != a or str(e) != str(a)
+    )
+
+    clear_cache()
+    started: float = time.perf_counter()
+    convert_all(rows, to_decimal)
+    cold: float = time.perf_counter() - started
+
+    base: float = best_of(args.repeat, lambda: convert_all(rows, baseline))
+    warm: float = best_of(args.repeat, lambda: convert_all(rows, to_decimal))
+
+    per_record = lambda seconds: seconds / args.records * 1e6  # noqa: E731
+    print(f"records: {args.records}  symbols: {args.symbols}  fields/record: {len(FIELDS)}")
+    print(f"mismatches vs Decimal(str(x)): {mismatches}")
+    print(f"{'path':<24}{'µs/record':>12}{'speedup':>10}")
+    print(f"{'Decimal(str(x))':<24}{per_record(base):>12.3f}{1.0:>10.2f}")
+    print(f"{'to_decimal (cold memo)':<24}{per_record(cold):>12.3f}{base / cold:>10.2f}")
+    print(f"{'to_decimal (warm memo)':<24}{per_record(warm):>12.3f}{base / warm:>10.2f}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
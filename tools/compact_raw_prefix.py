@@ -0,0 +1,387 @@
+"""
+Compaction of the raw S3 archive.
+
+The processor writes one small JSON object per tick under
+raw-data/<symbol>/. Athena pays a request and an open per object, so the
+Glue JSON table gets slower with every tick archived. This worker merges
+each (symbol, day) partition into a few large files sorted by timestamp:
+
+- ndjson (default): raw-data/<symbol>/compacted-<day>-<digest>-<n>.ndjson,
+  read by the same Glue JSON table. Each file carries its record count and
+  min/max timestamp_ms as S3 object metadata.
+- parquet: raw-parquet/symbol=<symbol>/dt=<day>/compacted-<digest>-<n>.parquet,
+  read by the stock_data_parquet table (same layout as the Firehose archive).
+  Snappy, with row-group min/max statistics on timestamp_ms. Requires pyarrow.
+
+Objects of a partition are downloaded concurrently on a thread pool that
+shares one pooled S3 client (max_pool_connections = --concurrency).
+
+S3 cannot swap a set of objects atomically. The swap is ordered so that
+a query never misses a tick, and it is safe to interrupt:
+1. a journal (_compaction/journal/...) lists the outputs and their sources
+2. the outputs are written
+3. the sources are deleted with DeleteObjects (1000 keys per call)
+4. the journal is deleted
+Between 2 and 3 (milliseconds) a query can count a tick twice. A new run
+first completes or rolls back any journal left by an interrupted run.
+Output names derive from the source keys, so re-running is idempotent.
+
+Today's partitions are skipped by default: the processor is still writing
+them.
+
+Usage:
+    python tools/compact_raw_prefix.py --bucket stock-market-raw-data-123 --dry-run
+    python tools/compact_raw_prefix.py --bucket stock-market-raw-data-123 --format parquet --concurrency 64
+    python tools/compact_raw_prefix.py --local --symbols AAPL MSFT --events 500
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# pipeline_core is deployed next to the Lambda handlers; import it from the source tree
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+
+from pipeline_core.timestamps import event_epoch_ms  # noqa: E402
+
+DEFAULT_REGION: str = "us-east-1"
+
+RAW_PREFIX: str = "raw-data/"
+# Must match components/analytics/glue.py (PARQUET_PREFIX, STOCK_DATA_COLUMNS)
+PARQUET_PREFIX: str = "raw-parquet"
+PARQUET_COLUMNS: List[Tuple[str, str]] = [
+    ("timestamp", "string"),
+    ("timestamp_ms", "int64"),
+    ("open", "float64"),
+    ("high", "float64"),
+    ("low", "float64"),
+    ("price", "float64"),
+    ("previous_close", "float64"),
+    ("volume", "int32"),
+]
+
+JOURNAL_PREFIX: str = "_compaction/journal/"
+COMPACTED_PREFIX: str = "compacted-"
+DELETE_BATCH: int = 1000
+
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+# ============================================================
+# Listing
+# ============================================================
+
+@dataclass(frozen=True)
+class Partition:
+    symbol: str
+    day: str
+    keys: Tuple[str, ...]
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha1("\n".join(self.keys).encode("utf-8")).hexdigest()[:12]
+
+
+def list_keys(s3: Any, bucket: str, prefix: str) -> Iterable[Dict[str, Any]]:
+    kwargs: Dict[str, Any] = {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        yield from response.get("Contents", [])
+        if not response.get("IsTruncated"):
+            return
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+
+def list_partitions(
+    s3: Any, bucket: str, symbols: Optional[List[str]], include_today: bool
+) -> List[Partition]:
+    """
+    Per-tick objects grouped by (symbol, day). The day comes from the key
+    (raw-data/<symbol>/<YYYY-MM-DD>T...json); compacted files and keys
+    without a day are left alone.
+    """
+    today: str = datetime.now(timezone.utc).date().isoformat()
+    grouped: Dict[Tuple[str, str], List[str]] = {}
+    for prefix in [f"{RAW_PREFIX}{s}/" for s in symbols] if symbols else [RAW_PREFIX]:
+        for obj in list_keys(s3, bucket, prefix):
+            parts: List[str] = obj["Key"][len(RAW_PREFIX):].split("/")
+            if len(parts) != 2 or not parts[1].endswith(".json"):
+                continue
+            symbol, name = parts
+            match = _DAY.match(name)
+            if match is None or (match.group(0) >= today and not include_today):
+                continue
+            grouped.setdefault((symbol, match.group(0)), []).append(obj["Key"])
+    return [
+        Partition(symbol=symbol, day=day, keys=tuple(sorted(keys)))
+        for (symbol, day), keys in sorted(grouped.items())
+    ]
+
+
+# ============================================================
+# Merge
+# ============================================================
+
+def fetch_records(s3: Any, bucket: str, keys: Iterable[str], pool: ThreadPoolExecutor) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    for body in pool.map(lambda key: s3.get_object(Bucket=bucket, Key=key)["Body"].read(), keys):
+        records.extend(json.loads(line) for line in body.splitlines() if line.strip())
+    return records
+
+
+def encode_ndjson(records: List[Dict[str, Any]], target_bytes: int) -> List[Tuple[bytes, Dict[str, str]]]:
+    """
+    Sorted records -> NDJSON files of about `target_bytes`, with their
+    record count and timestamp range as object metadata.
+    """
+    files: List[Tuple[bytes, Dict[str, str]]] = []
+    lines: List[bytes] = []
+    size: int = 0
+    first: int = 0
+    for n, record in enumerate(records):
+        line: bytes = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        lines.append(line)
+        size += len(line)
+        if size >= target_bytes or n == len(records) - 1:
+            chunk = records[first:n + 1]
+            files.append(
+                (
+                    b"".join(lines),
+                    {
+                        "records": str(len(chunk)),
+                        "min-timestamp-ms": str(event_epoch_ms(chunk[0])),
+                        "max-timestamp-ms": str(event_epoch_ms(chunk[-1])),
+                    },
+                )
+            )
+            lines, size, first = [], 0, n + 1
+    return files
+
+
+def encode_parquet(records: List[Dict[str, Any]], row_group_rows: int) -> List[Tuple[bytes, Dict[str, str]]]:
+    """
+    Sorted records -> one Snappy Parquet file. Rows are sorted, so each row
+    group's min/max statistics on timestamp_ms are tight and let Athena
+    skip row groups outside a time filter.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("--format parquet requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(name, type_) for name, type_ in PARQUET_COLUMNS])
+    columns: Dict[str, List[Any]] = {name: [] for name, _ in PARQUET_COLUMNS}
+    for record in records:
+        for name, _ in PARQUET_COLUMNS:
+            columns[name].append(event_epoch_ms(record) if name == "timestamp_ms" else record.get(name))
+
+    buffer = io.BytesIO()
+    pq.write_table(
+        pa.table(columns, schema=schema),
+        buffer,
+        row_group_size=row_group_rows,
+        compression="snappy",
+        write_statistics=True,
+    )
+    return [(buffer.getvalue(), {"records": str(len(records))})]
+
+
+def output_keys(partition: Partition, fmt: str, count: int) -> List[str]:
+    if fmt == "parquet":
+        base: str = f"{PARQUET_PREFIX}/symbol={partition.symbol}/dt={partition.day}/{COMPACTED_PREFIX}{partition.digest}"
+        return [f"{base}-{n:03d}.parquet" for n in range(count)]
+    base = f"{RAW_PREFIX}{partition.symbol}/{COMPACTED_PREFIX}{partition.day}-{partition.digest}"
+    return [f"{base}-{n:03d}.ndjson" for n in range(count)]
+
+
+def journal_key(partition: Partition) -> str:
+    return f"{JOURNAL_PREFIX}{partition.symbol}/{partition.day}-{partition.digest}.json"
+
+
+# ============================================================
+# Swap
+# ============================================================
+
+def delete_keys(s3: Any, bucket: str, keys: List[str], pool: ThreadPoolExecutor) -> None:
+    batches: List[List[str]] = [keys[i:i + DELETE_BATCH] for i in range(0, len(keys), DELETE_BATCH)]
+    for response in pool.map(
+        lambda batch: s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        ),
+        batches,
+    ):
+        if response.get("Errors"):
+            raise RuntimeError(f"DeleteObjects failed for {len(response['Errors'])} keys: {response['Errors'][:3]}")
+
+
+def exists(s3: Any, bucket: str, key: str) -> bool:
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def recover(s3: Any, bucket: str, pool: ThreadPoolExecutor) -> int:
+    """
+    Finishes the swaps of an interrupted run. With every output written the
+    sources are deleted (roll forward); otherwise the partial outputs are
+    (roll back) and the partition is compacted again by this run.
+    """
+    recovered: int = 0
+    for obj in list(list_keys(s3, bucket, JOURNAL_PREFIX)):
+        journal: Dict[str, List[str]] = json.loads(s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read())
+        if all(exists(s3, bucket, key) for key in journal["outputs"]):
+            delete_keys(s3, bucket, journal["sources"], pool)
+        else:
+            delete_keys(s3, bucket, journal["outputs"], pool)
+        s3.delete_object(Bucket=bucket, Key=obj["Key"])
+        recovered += 1
+    return recovered
+
+
+def compact_partition(
+    s3: Any, bucket: str, partition: Partition, args: argparse.Namespace, pool: ThreadPoolExecutor
+) -> Dict[str, Any]:
+    records: List[Dict[str, Any]] = fetch_records(s3, bucket, partition.keys, pool)
+    records.sort(key=event_epoch_ms)
+
+    if args.format == "parquet":
+        files = encode_parquet(records, args.row_group_rows)
+    else:
+        files = encode_ndjson(records, args.target_mb * 1024 * 1024)
+    outputs: List[str] = output_keys(partition, args.format, len(files))
+
+    journal: str = journal_key(partition)
+    s3.put_object(
+        Bucket=bucket,
+        Key=journal,
+        Body=json.dumps({"outputs": outputs, "sources": list(partition.keys)}),
+        ContentType="application/json",
+    )
+    content_type: str = "application/octet-stream" if args.format == "parquet" else "application/x-ndjson"
+    list(
+        pool.map(
+            lambda item: s3.put_object(
+                Bucket=bucket, Key=item[0], Body=item[1][0], Metadata=item[1][1], ContentType=content_type
+            ),
+            zip(outputs, files),
+        )
+    )
+    delete_keys(s3, bucket, list(partition.keys), pool)
+    s3.delete_object(Bucket=bucket, Key=journal)
+
+    return {
+        "symbol": partition.symbol,
+        "day": partition.day,
+        "objects_in": len(partition.keys),
+        "records": len(records),
+        "files_out": len(files),
+        "bytes_out": sum(len(body) for body, _ in files),
+    }
+
+
+def run(s3: Any, bucket: str, args: argparse.Namespace) -> Dict[str, Any]:
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        recovered: int = 0 if args.dry_run else recover(s3, bucket, pool)
+        partitions: List[Partition] = list_partitions(s3, bucket, args.symbols or None, args.include_today)
+        partitions = [p for p in partitions if len(p.keys) >= args.min_objects]
+        if args.dry_run:
+            return {
+                "partitions": [
+                    {"symbol": p.symbol, "day": p.day, "objects": len(p.keys)} for p in partitions
+                ],
+            }
+        results: List[Dict[str, Any]] = [compact_partition(s3, bucket, p, args, pool) for p in partitions]
+    return {
+        "recovered_journals": recovered,
+        "partitions": len(results),
+        "objects_in": sum(r["objects_in"] for r in results),
+        "records": sum(r["records"] for r in results),
+        "files_out": sum(r["files_out"] for r in results),
+        "details": results,
+    }
+
+
+# ============================================================
+# Local mode
+# ============================================================
+
+def run_local(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Fills the LocalS3 raw bucket by running the local pipeline, compacts
+    it, and checks that every archived tick is still there exactly once.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+    from local_pipeline import RAW_BUCKET, LocalPipeline, LocalPipelineConfig
+
+    pipeline = LocalPipeline(LocalPipelineConfig(symbols=args.symbols or ["AAPL", "MSFT"], events_per_symbol=args.events))
+    pipeline.run()
+    s3 = pipeline.s3
+
+    def archived() -> List[Tuple[str, int]]:
+        keys: List[str] = [obj["Key"] for obj in list_keys(s3, RAW_BUCKET, RAW_PREFIX)]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            return sorted((r["symbol"], event_epoch_ms(r)) for r in fetch_records(s3, RAW_BUCKET, keys, pool))
+
+    before: List[Tuple[str, int]] = archived()
+    args.include_today = True
+    summary: Dict[str, Any] = run(s3, RAW_BUCKET, args)
+    summary.pop("details", None)
+    if args.format == "ndjson":
+        summary["ticks_preserved"] = archived() == before
+    summary["objects_after"] = len(s3.buckets[RAW_BUCKET])
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact per-tick raw objects into large sorted files")
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--bucket", help="raw data bucket")
+    parser.add_argument("--symbols", nargs="*", default=[], help="only these symbols (default: all)")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--target-mb", type=int, default=128, help="NDJSON output file size")
+    parser.add_argument("--row-group-rows", type=int, default=100_000, help="Parquet row group size")
+    parser.add_argument("--min-objects", type=int, default=2, help="skip partitions with fewer objects")
+    parser.add_argument("--concurrency", type=int, default=32, help="parallel S3 requests")
+    parser.add_argument("--include-today", action="store_true", help="also compact today's partitions")
+    parser.add_argument("--dry-run", action="store_true", help="only list the partitions to compact")
+    parser.add_argument("--local", action="store_true", help="run against the in-memory S3 stand-in")
+    parser.add_argument("--events", type=int, default=200, help="events per symbol of --local")
+    args = parser.parse_args()
+
+    if args.local:
+        print(json.dumps(run_local(args), indent=2))
+        return
+    if not args.bucket:
+        parser.error("--bucket is required (or --local)")
+
+    s3 = boto3.client(
+        "s3",
+        region_name=args.region,
+        config=Config(max_pool_connections=args.concurrency, retries={"max_attempts": 10, "mode": "adaptive"}),
+    )
+    print(json.dumps(run(s3, args.bucket, args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Lambda power tuning.
+
+Replays a fixed synthetic event set against a deployed pipeline Lambda at
+each memory size, and reports duration and cost per million records. Use
+the result to pick the memory_size of its performance profile
+(components/compute/profiles.py).
+
+For every memory size:
+1. update the function's MemorySize and wait for the update
+2. run --warmup invocations (cold start, discarded)
+3. run --invocations invocations with the same batch of --batch-size
+   records and read Billed Duration / Max Memory Used from the REPORT
+   line of the tail log
+
+The records are identical on every round (same symbols and prices, seeded).
+Only the timestamps and sequence numbers move forward: every tick of a
+symbol gets its own second, so no two ticks share a table key even with
+second-resolution iso sort keys, and the processor's idempotency guards
+do not turn later rounds into cheap replays. The trend events use the item
+layout of the function's SORT_KEY_FORMAT (iso or epoch_ms).
+
+The invocations really write to the stack's tables (and the trend Lambda
+really publishes alerts when a tick crosses the threshold): run it against
+a test stack. The original memory size is restored at the end.
+
+Usage:
+    python tools/lambda_power_tuning.py --function kinesis-processor --kind processor \
+        --memory 128 256 512 1024 1769 --batch-size 100 --invocations 10
+    python tools/lambda_power_tuning.py --function StockTrendAnalysis --kind trend --json
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import boto3
+
+DEFAULT_REGION: str = "us-east-1"
+
+# us-east-1 on-demand prices (USD)
+PRICE_PER_GB_SECOND: Dict[str, float] = {"x86_64": 0.0000166667, "arm64": 0.0000133334}
+PRICE_PER_REQUEST: float = 0.20 / 1_000_000
+
+_REPORT_FIELDS = {
+    "billed_ms": re.compile(r"Billed Duration: (\d+) ms"),
+    "duration_ms": re.compile(r"\tDuration: ([\d.]+) ms"),
+    "max_memory_mb": re.compile(r"Max Memory Used: (\d+) MB"),
+}
+
+
+# ============================================================
+# Synthetic event set
+# ============================================================
+
+@dataclass(frozen=True)
+class Tick:
+    symbol: str
+    price: float
+    previous_close: float
+    open: float
+    high: float
+    low: float
+    volume: int
+
+
+def build_ticks(batch_size: int, symbols: int, seed: int) -> List[Tick]:
+    rng = random.Random(seed)
+    closes: List[float] = [round(rng.uniform(20, 500), 2) for _ in range(symbols)]
+    ticks: List[Tick] = []
+    for n in range(batch_size):
+        close: float = closes[n % symbols]
+        price: float = round(close * (1 + rng.uniform(-0.003, 0.003)), 2)
+        ticks.append(
+            Tick(
+                symbol=f"TUNE{n % symbols:03d}",
+                price=price,
+                previous_close=close,
+                open=close,
+                high=max(close, price),
+                low=min(close, price),
+                volume=rng.randint(1_000, 1_000_000),
+            )
+        )
+    return ticks
+
+
+def tick_epoch_ms(n: int, batch_size: int, symbols: int, round_index: int, base_ms: int) -> int:
+    """
+    Timestamp of the n-th tick of a round: one second apart per symbol
+    (ticks of different symbols differ by milliseconds).
+    """
+    per_symbol: int = -(-batch_size // symbols)
+    return base_ms + (round_index * per_symbol + n // symbols) * 1000 + n % symbols
+
+
+def kinesis_event(ticks: List[Tick], symbols: int, round_index: int, base_ms: int) -> Dict[str, Any]:
+    """
+    Kinesis event source mapping payload. Each round moves timestamps and
+    sequence numbers forward so every record is new to the processor.
+    Sequence numbers follow the wall clock, so they also stay ahead of the
+    checkpoints left by an earlier run of this script.
+    """
+    records: List[Dict[str, Any]] = []
+    built_ns: int = time.time_ns()
+    for n, tick in enumerate(ticks):
+        ts: int = tick_epoch_ms(n, len(ticks), symbols, round_index, base_ms)
+        payload: Dict[str, Any] = {
+            "symbol": tick.symbol,
+            "open": tick.open,
+            "high": tick.high,
+            "low": tick.low,
+            "price": tick.price,
+            "previous_close": tick.previous_close,
+            "change": round(tick.price - tick.previous_close, 2),
+            "change_percent": round((tick.price - tick.previous_close) / tick.previous_close * 100, 2),
+            "volume": tick.volume,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts / 1000)),
+            "timestamp_ms": ts,
+        }
+        sequence: str = str(built_ns * 1_000_000 + n)
+        records.append(
+            {
+                "kinesis": {
+                    "kinesisSchemaVersion": "1.0",
+                    "partitionKey": tick.symbol,
+                    "sequenceNumber": sequence,
+                    "data": base64.b64encode(json.dumps(payload).encode("utf-8")).decode("ascii"),
+                    "approximateArrivalTimestamp": built_ns / 1e9,
+                },
+                "eventSource": "aws:kinesis",
+                "eventVersion": "1.0",
+                "eventID": f"shardId-000000000000:{sequence}",
+                "eventName": "aws:kinesis:record",
+                "awsRegion": DEFAULT_REGION,
+            }
+        )
+    return {"Records": records}
+
+
+def dynamodb_stream_event(
+    ticks: List[Tick], symbols: int, round_index: int, base_ms: int, sort_key_format: str = "iso"
+) -> Dict[str, Any]:
+    """
+    DynamoDB Streams INSERT payload with the item layout of `sort_key_format`:
+    {"ts": N epoch_ms} or {"timestamp": S iso}.
+    """
+    records: List[Dict[str, Any]] = []
+    created: float = time.time()
+    for n, tick in enumerate(ticks):
+        ts: int = tick_epoch_ms(n, len(ticks), symbols, round_index, base_ms)
+        sort_key: Dict[str, Any] = (
+            {"ts": {"N": str(ts)}}
+            if sort_key_format == "epoch_ms"
+            else {"timestamp": {"S": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts / 1000))}}
+        )
+        records.append(
+            {
+                "eventName": "INSERT",
+                "eventSource": "aws:dynamodb",
+                "dynamodb": {
+                    "ApproximateCreationDateTime": created,
+                    "Keys": {"symbol": {"S": tick.symbol}, **sort_key},
+                    "NewImage": {
+                        "symbol": {"S": tick.symbol},
+                        **sort_key,
+                        "price": {"N": str(tick.price)},
+                        "previous_close": {"N": str(tick.previous_close)},
+                    },
+                    "SequenceNumber": str(ts),
+                    "StreamViewType": "NEW_IMAGE",
+                },
+            }
+        )
+    return {"Records": records}
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+@dataclass
+class MemoryResult:
+    memory_mb: int
+    billed_ms: List[int] = field(default_factory=list)
+    duration_ms: List[float] = field(default_factory=list)
+    max_memory_mb: int = 0
+    errors: int = 0
+
+    def avg_billed_ms(self) -> float:
+        return sum(self.billed_ms) / len(self.billed_ms) if self.billed_ms else 0.0
+
+    def p95_billed_ms(self) -> float:
+        if not self.billed_ms:
+            return 0.0
+        ordered: List[int] = sorted(self.billed_ms)
+        return float(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))])
+
+    def cost_per_invocation(self, architecture: str) -> float:
+        gb_seconds: float = self.memory_mb / 1024 * self.avg_billed_ms() / 1000
+        return gb_seconds * PRICE_PER_GB_SECOND[architecture] + PRICE_PER_REQUEST
+
+
+def parse_report(log_tail: str) -> Dict[str, float]:
+    values: Dict[str, float] = {}
+    for name, pattern in _REPORT_FIELDS.items():
+        match = pattern.search(log_tail)
+        if match:
+            values[name] = float(match.group(1))
+    return values
+
+
+def invoke(client: Any, function_name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    response: Dict[str, Any] = client.invoke(
+        FunctionName=function_name,
+        InvocationType="RequestResponse",
+        LogType="Tail",
+        Payload=json.dumps(event).encode("utf-8"),
+    )
+    log_tail: str = base64.b64decode(response.get("LogResult", "")).decode("utf-8", "replace")
+    return {"error": "FunctionError" in response, **parse_report(log_tail)}
+
+
+def set_memory(client: Any, function_name: str, memory_mb: int) -> None:
+    client.update_function_configuration(FunctionName=function_name, MemorySize=memory_mb)
+    client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+
+
+def tune(args: argparse.Namespace, client: Any) -> Dict[str, Any]:
+    configuration: Dict[str, Any] = client.get_function_configuration(FunctionName=args.function)
+    original_memory: int = configuration["MemorySize"]
+    architecture: str = configuration.get("Architectures", ["x86_64"])[0]
+    sort_key_format: str = (
+        configuration.get("Environment", {}).get("Variables", {}).get("SORT_KEY_FORMAT", "iso")
+    )
+
+    ticks: List[Tick] = build_ticks(args.batch_size, args.symbols, args.seed)
+    symbols: int = min(args.symbols, args.batch_size)
+
+    # Ticks one second apart per symbol: start far enough back that the
+    # last round still ends before now
+    rounds: int = len(args.memory) * (args.warmup + args.invocations)
+    base_ms: int = int(time.time() * 1000) - rounds * -(-args.batch_size // symbols) * 1000
+    round_index: int = 0
+
+    def build_event(round_index: int) -> Dict[str, Any]:
+        if args.kind == "processor":
+            return kinesis_event(ticks, symbols, round_index, base_ms)
+        return dynamodb_stream_event(ticks, symbols, round_index, base_ms, sort_key_format)
+
+    results: List[MemoryResult] = []
+    try:
+        for memory_mb in args.memory:
+            set_memory(client, args.function, memory_mb)
+            result = MemoryResult(memory_mb=memory_mb)
+            for n in range(args.warmup + args.invocations):
+                outcome: Dict[str, Any] = invoke(client, args.function, build_event(round_index))
+                round_index += 1
+                if n < args.warmup:
+                    continue
+                if outcome["error"]:
+                    result.errors += 1
+                    continue
+                result.billed_ms.append(int(outcome.get("billed_ms", 0)))
+                result.duration_ms.append(outcome.get("duration_ms", 0.0))
+                result.max_memory_mb = max(result.max_memory_mb, int(outcome.get("max_memory_mb", 0)))
+            results.append(result)
+    finally:
+        set_memory(client, args.function, original_memory)
+
+    rows: List[Dict[str, Any]] = [
+        {
+            "memory_mb": r.memory_mb,
+            "avg_billed_ms": round(r.avg_billed_ms(), 1),
+            "p95_billed_ms": r.p95_billed_ms(),
+            "max_memory_used_mb": r.max_memory_mb,
+            "errors": r.errors,
+            "cost_per_million_records_usd": round(
+                r.cost_per_invocation(architecture) / args.batch_size * 1_000_000, 4
+            ),
+        }
+        for r in results
+        if r.billed_ms
+    ]
+    return {
+        "function": args.function,
+        "architecture": architecture,
+        "batch_size": args.batch_size,
+        "results": rows,
+        "cheapest_memory_mb": min(rows, key=lambda row: row["cost_per_million_records_usd"])["memory_mb"] if rows else None,
+        "fastest_memory_mb": min(rows, key=lambda row: row["avg_billed_ms"])["memory_mb"] if rows else None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['function']} ({report['architecture']}), {report['batch_size']} records per invocation")
+    header = f"{'memory MB':>10}{'avg ms':>10}{'p95 ms':>10}{'max mem':>10}{'errors':>8}{'$/M records':>14}"
+    print(header)
+    print("-" * len(header))
+    for row in report["results"]:
+        print(
+            f"{row['memory_mb']:>10}{row['avg_billed_ms']:>10.1f}{row['p95_billed_ms']:>10.0f}"
+            f"{row['max_memory_used_mb']:>10}{row['errors']:>8}{row['cost_per_million_records_usd']:>14.4f}"
+        )
+    print(f"\ncheapest: {report['cheapest_memory_mb']} MB   fastest: {report['fastest_memory_mb']} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure Lambda cost per million records at each memory size")
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--function", required=True, help="function name or ARN")
+    parser.add_argument("--kind", choices=["processor", "trend"], default="processor")
+    parser.add_argument("--memory", type=int, nargs="+", default=[128, 256, 512, 1024, 1769])
+    parser.add_argument("--batch-size", type=int, default=100, help="records per invocation")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--invocations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    client = boto3.client("lambda", region_name=args.region)
+    report: Dict[str, Any] = tune(args, client)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+End-to-end latency report.
+
+Rebuilds per-stage latency percentiles (p50 / p95 / p99) from the trace
+fields that the pipeline stamps on every event (see
+lambdas/pipeline_core/tracing.py):
+
+    produced -> sent -> arrived -> processed -> alerted
+
+Two sources, usable together:
+
+- DynamoDB tick items (--table): each item carries the trace up to
+  `processed`. It queries the last --minutes of ticks of each --symbols entry.
+- Log lines (--logs): JSON lines written by the Lambdas, exported from
+  CloudWatch Logs (e.g. `aws logs filter-log-events ... --output text`). Any
+  prefix before the JSON object is ignored. The trend Lambda's
+  "Alert published" lines carry the complete trace including `alerted`.
+
+Traces are joined on trace_id, so an alerted tick found in both sources is
+counted once.
+
+Usage:
+    python tools/latency_report.py --table stock-market-data-v2 \
+        --symbols AAPL MSFT --minutes 30 --sort-key-format epoch_ms
+    python tools/latency_report.py --logs trend-alert.log
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List
+
+import boto3
+
+# pipeline_core is deployed next to the Lambda handlers; import it from the source tree
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "infra", "pulumi", "project", "lambdas"),
+)
+
+from pipeline_core.keys import KeyScheme, item_epoch_ms, query_symbol_range  # noqa: E402
+from pipeline_core.tracing import STAGES, TRACE_ID, stage_latencies, trace_fields  # noqa: E402
+
+DEFAULT_REGION: str = "us-east-1"
+PERCENTILES: List[int] = [50, 95, 99]
+
+
+def percentile(values: List[int], pct: float) -> float:
+    """
+    Nearest-rank percentile of `values` (0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered: List[int] = sorted(values)
+    return float(ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)])
+
+
+def traces_from_items(items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Traces of DynamoDB tick items. The produced time comes from the sort
+    key when the item has no timestamp_ms attribute.
+    """
+    for item in items:
+        trace: Dict[str, Any] = trace_fields(item)
+        if "processed_ms" not in trace:
+            continue  # written before tracing existed
+        trace.setdefault("timestamp_ms", item_epoch_ms(item))
+        yield trace
+
+
+def traces_from_log_lines(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Traces of log lines that carry a `trace` object ("Alert published").
+    """
+    for line in lines:
+        start: int = line.find("{")
+        if start < 0:
+            continue
+        try:
+            record: Any = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and isinstance(record.get("trace"), dict):
+            yield trace_fields(record["trace"])
+
+
+def merge_traces(traces: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Joins traces on trace_id (later sources add stages). Traces without an
+    id are kept as they are.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    anonymous: List[Dict[str, Any]] = []
+    for trace in traces:
+        trace_id = trace.get(TRACE_ID)
+        if trace_id is None:
+            anonymous.append(trace)
+        else:
+            by_id.setdefault(trace_id, {}).update(trace)
+    return list(by_id.values()) + anonymous
+
+
+def summarize(traces: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    {interval: {"count", "p50", "p95", "p99", "max"}} over every trace that
+    has both ends of the interval.
+    """
+    samples: Dict[str, List[int]] = {}
+    for trace in traces:
+        for interval, value in stage_latencies(trace).items():
+            samples.setdefault(interval, []).append(value)
+
+    # Pipeline order: consecutive stages first, end_to_end last
+    order: List[str] = [stage for stage, _ in STAGES]
+
+    def sort_key(interval: str) -> Any:
+        if interval == "end_to_end":
+            return (len(order), len(order))
+        first, _, last = interval.partition("_to_")
+        return (order.index(first), order.index(last))
+
+    return {
+        interval: {
+            "count": len(values),
+            **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES},
+            "max": float(max(values)),
+        }
+        for interval, values in sorted(samples.items(), key=lambda entry: sort_key(entry[0]))
+    }
+
+
+def print_report(summary: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'interval (ms)':<26}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for interval, stats in summary.items():
+        print(
+            f"{interval:<26}{int(stats['count']):>8}"
+            f"{stats['p50']:>10.0f}{stats['p95']:>10.0f}{stats['p99']:>10.0f}{stats['max']:>10.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from pipeline traces")
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--table", help="DynamoDB tick table to read traces from")
+    parser.add_argument("--symbols", nargs="+", default=[], help="symbols to query in --table")
+    parser.add_argument("--minutes", type=int, default=15, help="look-back window for --table")
+    parser.add_argument("--key-scheme", choices=["symbol", "sharded"], default="symbol")
+    parser.add_argument("--write-shards", type=int, default=1)
+    parser.add_argument("--sort-key-format", choices=["iso", "epoch_ms"], default="epoch_ms")
+    parser.add_argument("--logs", nargs="*", default=[], help="files with exported Lambda log lines")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    if not args.logs and not (args.table and args.symbols):
+        parser.error("pass --logs and/or --table with --symbols")
+
+    traces: List[Dict[str, Any]] = []
+    if args.table:
+        client = boto3.client("dynamodb", region_name=args.region)
+        scheme = KeyScheme(
+            mode=args.key_scheme, write_shards=args.write_shards, sort_key_format=args.sort_key_format
+        )
+        end: datetime = datetime.now(timezone.utc)
+        start: datetime = end - timedelta(minutes=args.minutes)
+        for symbol in args.symbols:
+            items = query_symbol_range(client, args.table, scheme, symbol, start, end)
+            traces.extend(traces_from_items(items))
+    for path in args.logs:
+        with open(path, encoding="utf-8") as fh:
+            traces.extend(traces_from_log_lines(fh))
+
+    summary = summarize(merge_traces(traces))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()